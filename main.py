@@ -10,12 +10,16 @@ except Exception:
 
 try:
     # Try to import from the new structure first
+    from src.streamq.config import config
     from src.streamq.core.app import StreamQApp
+    from src.streamq.utils.stalls import monitor, start_from_environment
 except ImportError:
     # Fallback: if we can't import from src structure, try direct import
     # This allows gradual migration or running from either structure
     try:
+        from streamq.config import config
         from streamq.core.app import StreamQApp
+        from streamq.utils.stalls import monitor, start_from_environment
     except ImportError:
         messagebox.showerror(
             "Import Error", 
@@ -28,12 +32,16 @@ def main():
     """Main entry point for StreamQ application."""
     root = tb.Window(themename="flatly") if tb else tk.Tk()
     try:
+        config.load()
+        start_from_environment(root, config.profiles_dir)
         app = StreamQApp(root)
         root.mainloop()
     except Exception as error:
         messagebox.showerror("Error", str(error))
         root.destroy()
         sys.exit(1)
+    finally:
+        monitor.stop()
 
 
 if __name__ == "__main__":
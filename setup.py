@@ -57,6 +57,7 @@ setup(
     python_requires=">=3.8",
     install_requires=read_requirements(),
     extras_require={
+        "inbox": ["watchdog"],
         "dev": [
             "pytest>=7.0",
             "pytest-cov",
@@ -1,6 +1,8 @@
 """Entry point for StreamQ when run as a module."""
 
+import argparse
 import sys
+import time
 import tkinter as tk
 from tkinter import messagebox
 try:
@@ -8,13 +10,90 @@ try:
 except Exception:
     tb = None
 
-from .core.app import StreamQApp
 
+def variant_argument(text):
+    """Parse a --variant value for argparse."""
+    from .core.variants import parse_variant
+
+    try:
+        return parse_variant(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+
+
+def build_parser():
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(prog="streamq", description="Queue and download video/audio.")
+    parser.add_argument("--config", help="JSON config file (default: streamq.json)")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Override a setting, e.g. --set download_workers=3",
+    )
+    parser.add_argument("--profile", action="store_true", help="Write CPU and memory profiles")
+    parser.add_argument("--profile-dir", help="Directory for profile reports (default: profiles/)")
+    parser.add_argument("--stalls", action="store_true", help="Record GUI main-thread stalls")
+    parser.add_argument("--stall-threshold", type=int, default=100, metavar="MS", help="Latency counted as a stall")
+    commands = parser.add_subparsers(dest="command")
+
+    download = commands.add_parser("download", help="Download URLs without the GUI")
+    download.add_argument("--format", dest="format_type", choices=("audio", "video"), default="audio")
+    download.add_argument("--quality", help="Audio bitrate or video height")
+    download.add_argument(
+        "--variant",
+        dest="variants",
+        action="append",
+        type=variant_argument,
+        default=[],
+        metavar="FORMAT:QUALITY",
+        help="Output to produce, repeatable, e.g. --variant audio:192 --variant video:720",
+    )
+    download.add_argument("--workers", type=int, default=None, help="Concurrent downloads")
+    download.add_argument("--titles", action="store_true", help="Fetch titles and metadata before downloading")
+    download.add_argument("urls", nargs="+", help="URLs to download")
+
+    watch = commands.add_parser("watch", help="Download URLs from files dropped into an inbox directory")
+    watch.add_argument("--inbox", help="Directory to watch (default: the inbox_dir setting)")
+    watch.add_argument("--format", dest="format_type", choices=("audio", "video"), default="audio")
+    watch.add_argument("--quality", required=True, help="Audio bitrate or video height")
+    watch.add_argument("--workers", type=int, default=None, help="Concurrent downloads")
+
+    enqueue = commands.add_parser("enqueue", help="Add URLs to a shared job store")
+    enqueue.add_argument("--store", required=True, help="Path to the shared SQLite job store")
+    enqueue.add_argument("--format", dest="format_type", choices=("audio", "video"), default="audio")
+    enqueue.add_argument("--quality", required=True, help="Audio bitrate or video height")
+    enqueue.add_argument("urls", nargs="+", help="URLs to download")
+
+    worker = commands.add_parser("worker", help="Run headless workers against a shared job store")
+    worker.add_argument("--store", required=True, help="Path to the shared SQLite job store")
+    worker.add_argument("--workers", type=int, default=1, help="Concurrent workers in this process")
+    worker.add_argument("--lease", type=float, default=60.0, help="Job lease duration in seconds")
+    worker.add_argument("--exit-when-idle", action="store_true", help="Stop once no jobs are left")
+
+    titles = commands.add_parser("titles", help="Look up titles and time the lookups")
+    titles.add_argument("urls", nargs="+", help="URLs to look up")
+
+    stalls = commands.add_parser("stalls", help="Show a GUI stall report, optionally against a baseline")
+    stalls.add_argument("report", help="stalls-*.json report")
+    stalls.add_argument("baseline", nargs="?", help="Earlier report to compare against")
+
+    return parser
+
+
+def run_gui(args):
+    """Launch the Tkinter GUI."""
+    from .config import config
+    from .core.app import StreamQApp
+    from .utils.stalls import monitor, start_from_environment
 
-def main():
-    """Main entry point for StreamQ application."""
     # Prefer ttkbootstrap window if available
     root = tb.Window(themename="flatly") if tb else tk.Tk()
+    if args.stalls:
+        monitor.start(root, config.profiles_dir, threshold_ms=args.stall_threshold)
+    else:
+        start_from_environment(root, config.profiles_dir)
     try:
         app = StreamQApp(root)
         root.mainloop()
@@ -22,6 +101,166 @@ def main():
         messagebox.showerror("Error", str(error))
         root.destroy()
         sys.exit(1)
+    finally:
+        report = monitor.stop()
+        if report:
+            print(f"Stall report: {report}")
+
+
+def run_download(args):
+    """Download URLs headlessly through a DownloadQueue."""
+    from .config import config
+    from .core.adapters import HeadlessReporter
+    from .core.downloader import DownloadManager, DownloadQueue
+    from .core.progress import format_bytes
+    from .utils.ffmpeg import ensure_ffmpeg
+
+    config.ensure_directories()
+    config.start_watching()
+    download_queue = DownloadQueue(DownloadManager(ensure_ffmpeg()), max_workers=args.workers)
+    reporter = HeadlessReporter()
+    reporter.attach(download_queue)
+
+    for number, url in enumerate(args.urls, start=1):
+        download_queue.add_to_queue(url, number, fetch_title=args.titles, variants=args.variants)
+    download_queue.process_queue(args.format_type, args.quality)
+    reporter.wait()
+
+    for url, error in reporter.errors:
+        print(f"Failed: {url}: {error}", file=sys.stderr)
+    print(f"Completed {len(reporter.completed)} | Failed {len(reporter.errors)}")
+    records, per_thousand = download_queue.get_metadata_memory()
+    if records:
+        print(f"Metadata: {records} record(s), {format_bytes(per_thousand)} per 1000 entries")
+    start_gap = download_queue.get_lookahead_metrics()["start_gap"]
+    if start_gap["samples"]:
+        print(
+            f"Start gap: mean {start_gap['mean']:.2f}s, max {start_gap['max']:.2f}s "
+            f"over {start_gap['samples']} download(s)"
+        )
+    store = download_queue.download_manager.content_store
+    if store and store.deduplicated:
+        print(f"Deduplicated {store.deduplicated} output(s), saved {format_bytes(store.saved_bytes)}")
+    return 1 if reporter.errors else 0
+
+
+def run_watch(args):
+    """Feed URL files from an inbox directory into a DownloadQueue until interrupted."""
+    from .config import config
+    from .core.adapters import HeadlessReporter
+    from .core.downloader import DownloadManager, DownloadQueue
+    from .core.inbox import InboxWatcher
+    from .utils.ffmpeg import ensure_ffmpeg
+
+    directory = args.inbox or config.inbox_dir
+    if not directory:
+        print("streamq: no inbox directory; pass --inbox or set inbox_dir", file=sys.stderr)
+        return 2
+
+    config.ensure_directories()
+    config.start_watching()
+    download_queue = DownloadQueue(DownloadManager(ensure_ffmpeg()), max_workers=args.workers)
+    reporter = HeadlessReporter()
+    reporter.attach(download_queue)
+    watcher = InboxWatcher(directory, download_queue, args.format_type, args.quality)
+    watcher.start()
+    mode = "notifications" if watcher.notifications else "polling"
+    print(f"Watching {watcher.directory} ({mode}); press Ctrl+C to stop", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    # The backlog is left alone: unfinished URLs are queued again on the next start
+    watcher.stop()
+    print(f"Queued {watcher.queued} URL(s) from the inbox")
+    if watcher.unfinished:
+        print(f"{len(watcher.unfinished)} URL(s) unfinished; they are queued again on the next start")
+    return 0
+
+
+def run_titles(args):
+    """Look up titles with metadata_workers in parallel, as the queue does."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .config import config
+    from .core.downloader import DownloadManager
+
+    download_manager = DownloadManager(None)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(config.metadata_workers) as pool:
+        records = pool.map(download_manager.fetch_title, args.urls)
+        for url, record in zip(args.urls, records):
+            print(f"{record.title if record else 'Title unavailable'}\t{url}", flush=True)
+    elapsed = time.perf_counter() - started
+    mode = "title-only" if config.fast_titles else "full extraction"
+    print(f"{len(args.urls)} title(s) in {elapsed:.2f}s ({mode})")
+    return 0
+
+
+def configure_profiling(args):
+    """Enable profiling from the --profile flag or the STREAMQ_PROFILE variable."""
+    from .config import config
+    from .utils.profiling import enable_from_environment, profiler
+
+    if args.profile or args.profile_dir:
+        profiler.enable(args.profile_dir or config.profiles_dir)
+    else:
+        enable_from_environment(config.profiles_dir)
+
+
+def main(argv=None):
+    """Main entry point for StreamQ application."""
+    args = build_parser().parse_args(argv)
+
+    from .config import ConfigError, config
+
+    try:
+        config.load(args.config, args.set)
+    except ConfigError as error:
+        if args.command:
+            print(f"streamq: {error}", file=sys.stderr)
+        else:
+            messagebox.showerror("Configuration error", str(error))
+        sys.exit(2)
+    configure_profiling(args)
+
+    if args.command == "download":
+        if not args.quality and not args.variants:
+            print("streamq: download needs --quality or at least one --variant", file=sys.stderr)
+            sys.exit(2)
+        sys.exit(run_download(args))
+    elif args.command == "watch":
+        sys.exit(run_watch(args))
+    elif args.command == "enqueue":
+        from .core.jobstore import JobStore
+
+        store = JobStore(args.store)
+        for url in args.urls:
+            job_id = store.enqueue(url, args.format_type, args.quality)
+            print(f"[{job_id}] {url}")
+    elif args.command == "worker":
+        from .core.worker import run_workers
+        from .utils.ffmpeg import ensure_ffmpeg
+
+        config.ensure_directories()
+        config.start_watching()
+        run_workers(
+            args.store,
+            ensure_ffmpeg(),
+            workers=args.workers,
+            lease_seconds=args.lease,
+            exit_when_idle=args.exit_when_idle,
+        )
+    elif args.command == "titles":
+        sys.exit(run_titles(args))
+    elif args.command == "stalls":
+        from .utils.stalls import format_report, load_report
+
+        baseline = load_report(args.baseline) if args.baseline else None
+        print(format_report(load_report(args.report), baseline))
+    else:
+        run_gui(args)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,16 @@
 """Configuration management for StreamQ."""
 
+import json
 import os
+import re
 import sys
+import threading
 from pathlib import Path
 
+ENV_PREFIX = "STREAMQ_"
+CONFIG_FILE_ENV = "STREAMQ_CONFIG"
+CONFIG_FILE_NAME = "streamq.json"
+
 
 def get_project_root():
     """
@@ -24,6 +31,138 @@ def get_project_root():
     return str(current_file.parent)
 
 
+class ConfigError(ValueError):
+    """Raised when a configuration value or file is invalid."""
+
+
+def parse_int(text):
+    """Parse an integer knob value."""
+    if isinstance(text, bool):
+        raise ValueError("expected an integer")
+    if isinstance(text, int):
+        return text
+    try:
+        return int(str(text).strip())
+    except ValueError:
+        raise ValueError("expected an integer") from None
+
+
+def parse_bytes(text):
+    """
+    Parse a byte count such as ``500K``, ``2.5M`` or ``1G``.
+
+    Returns:
+        int: Number of bytes
+    """
+    if isinstance(text, bool):
+        raise ValueError("expected a byte count")
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError("expected a byte count such as 500K, 2M or 1G")
+    multiplier = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[match.group(2).upper()]
+    return int(float(match.group(1)) * multiplier)
+
+
+def parse_bool(text):
+    """Parse an on/off knob value."""
+    if isinstance(text, bool):
+        return text
+    value = str(text).strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError("expected true or false")
+
+
+def parse_path(text):
+    """Parse a directory path knob value."""
+    text = str(text).strip()
+    if not text:
+        raise ValueError("expected a path")
+    return os.path.abspath(os.path.expanduser(text))
+
+
+def parse_endpoint(text):
+    """Parse an HTTP(S) URL template containing ``{url}``."""
+    text = str(text).strip()
+    if not text.startswith(("http://", "https://")) or "{url}" not in text:
+        raise ValueError("expected an http(s) URL containing {url}")
+    return text
+
+
+class Knob:
+    """A tunable configuration value with validation."""
+    
+    def __init__(self, default, parser, minimum=None, maximum=None, hot=False, help=""):
+        """
+        Initialize the knob.
+        
+        Args:
+            default: Default value
+            parser (callable): Converts raw values from files, env or CLI
+            minimum: Smallest accepted value
+            maximum: Largest accepted value
+            hot (bool): Whether the value may change while the queue is running
+            help (str): One-line description
+        """
+        self.default = default
+        self.parser = parser
+        self.minimum = minimum
+        self.maximum = maximum
+        self.hot = hot
+        self.help = help
+    
+    def parse(self, name, value, source):
+        """
+        Convert and validate a raw value.
+        
+        Raises:
+            ConfigError: If the value is malformed or out of range
+        """
+        try:
+            parsed = self.parser(value)
+        except ValueError as error:
+            raise ConfigError(f"Invalid value {value!r} for '{name}' from {source}: {error}") from None
+        if self.minimum is not None and parsed < self.minimum:
+            raise ConfigError(f"Invalid value {value!r} for '{name}' from {source}: must be at least {self.minimum}")
+        if self.maximum is not None and parsed > self.maximum:
+            raise ConfigError(f"Invalid value {value!r} for '{name}' from {source}: must be at most {self.maximum}")
+        return parsed
+
+
+# Tunable settings. Layers: defaults < config file < STREAMQ_* environment < CLI.
+KNOBS = {
+    "download_dir": Knob(None, parse_path, help="Root output directory (default: Output/)"),
+    "download_workers": Knob(1, parse_int, 1, 32, hot=True, help="Concurrent downloads"),
+    "metadata_workers": Knob(4, parse_int, 1, 64, help="Concurrent title fetches"),
+    "adaptive_concurrency": Knob(False, parse_bool, hot=True, help="Tune concurrency from throughput and errors"),
+    "adaptive_min_workers": Knob(1, parse_int, 1, 32, hot=True, help="Fewest downloads in adaptive mode"),
+    "adaptive_max_workers": Knob(8, parse_int, 1, 32, hot=True, help="Most downloads in adaptive mode"),
+    "lookahead": Knob(2, parse_int, 0, 32, hot=True, help="Queued downloads resolved ahead of a free slot"),
+    "rate_limit": Knob(0, parse_bytes, 0, hot=True, help="Total bandwidth cap in bytes/s (0 = unlimited)"),
+    "concurrent_fragments": Knob(1, parse_int, 1, 32, hot=True, help="Parallel fragments per DASH/HLS download"),
+    "stream_transcode": Knob(False, parse_bool, hot=True, help="Encode MP3 while audio downloads"),
+    "inbox_dir": Knob(None, parse_path, help="Directory watched for URL files (default: off)"),
+    "inbox_batch_size": Knob(50, parse_int, 1, 10000, hot=True, help="URLs queued per inbox batch"),
+    "inbox_max_backlog": Knob(200, parse_int, 1, 1000000, hot=True, help="Pending entries at which inbox reading pauses"),
+    "direct_http": Knob(True, parse_bool, hot=True, help="Fetch plain media URLs without yt-dlp"),
+    "http_connections": Knob(4, parse_int, 1, 16, hot=True, help="Parallel ranged requests per direct download"),
+    "disk_admission": Knob(True, parse_bool, hot=True, help="Start downloads only when their size fits on disk"),
+    "disk_min_free": Knob(512 * 1024 ** 2, parse_bytes, 0, hot=True, help="Free space always left on the output volume"),
+    "disk_headroom_percent": Knob(100, parse_int, 0, 1000, hot=True, help="Extra space reserved for merge and transcode files"),
+    "disk_default_estimate": Knob(256 * 1024 ** 2, parse_bytes, 1, hot=True, help="Size assumed for downloads of unknown size"),
+    "content_store": Knob(False, parse_bool, hot=True, help="Deduplicate outputs by content hash"),
+    "ydl_pool_size": Knob(2, parse_int, 0, 32, hot=True, help="Idle yt-dlp instances kept per option profile"),
+    "fast_titles": Knob(True, parse_bool, hot=True, help="Look up titles without resolving formats"),
+    "title_endpoint": Knob(None, parse_endpoint, hot=True, help="oEmbed URL template used for every title lookup"),
+    "title_cache_size": Knob(512, parse_int, 0, 1000000, hot=True, help="Fetched metadata records kept in memory"),
+    "ui_refresh_ms": Knob(50, parse_int, 10, 5000, hot=True, help="Delay between GUI update ticks"),
+}
+
+
 class Config:
     """Configuration settings for StreamQ."""
     
@@ -35,6 +174,7 @@ class Config:
         self.audio_dir = os.path.join(self.download_dir, "audio")
         self.video_dir = os.path.join(self.download_dir, "video")
         self.ffmpeg_dir = os.path.join(self.project_root, "ffmpeg_support")
+        self.profiles_dir = os.path.join(self.project_root, "profiles")
         
         # Quality options
         self.audio_qualities = ["64", "128", "192", "256", "320"]
@@ -52,6 +192,183 @@ class Config:
         self.default_font_family = "Segoe UI"
         self.default_font_size = 10
         
+        # Tunable knobs, overridden by load()
+        self.config_file = os.environ.get(CONFIG_FILE_ENV) or os.path.join(self.project_root, CONFIG_FILE_NAME)
+        self.overrides = {}
+        self._listeners = []
+        self._watcher = None
+        self._file_mtime = None
+        self._defaults = {name: knob.default for name, knob in KNOBS.items()}
+        self._defaults["download_dir"] = self.download_dir
+        self._apply(self._defaults)
+    
+    def load(self, config_file=None, overrides=None):
+        """
+        Apply defaults, the config file, environment variables and CLI overrides.
+        
+        Args:
+            config_file (str): JSON config file; defaults to ``streamq.json``
+                in the project root or the ``STREAMQ_CONFIG`` variable
+            overrides (list): ``name=value`` strings from the command line
+            
+        Raises:
+            ConfigError: If any layer holds an invalid value
+        """
+        previous = (self.config_file, self.overrides)
+        if config_file:
+            self.config_file = config_file
+        if overrides is not None:
+            self.overrides = self._parse_overrides(overrides)
+        try:
+            values = self._resolve()
+        except ConfigError:
+            # Keep the previous layers so a later reload still works
+            self.config_file, self.overrides = previous
+            raise
+        self._apply(values)
+    
+    def reload(self):
+        """
+        Re-read the config file and environment while the queue is running.
+        
+        Only hot knobs change; other changes are reported as requiring a restart.
+        
+        Returns:
+            tuple: (dict of applied changes, list of knob names needing a restart)
+            
+        Raises:
+            ConfigError: If the new values are invalid; the old values stay active
+        """
+        values = self._resolve()
+        changes = {}
+        restart = []
+        for name, value in values.items():
+            if getattr(self, name) == value:
+                continue
+            if KNOBS[name].hot:
+                changes[name] = value
+            else:
+                restart.append(name)
+        self._apply(changes)
+        if changes:
+            for listener in list(self._listeners):
+                listener(changes)
+        return changes, restart
+    
+    def add_listener(self, callback):
+        """
+        Register a callback for hot-reloaded knobs.
+        
+        Args:
+            callback (callable): Called with a dict of changed knob values
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Unregister a hot reload callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def start_watching(self, interval=2.0):
+        """Reload the config file in the background whenever it changes."""
+        if self._watcher is not None:
+            return
+        self._file_mtime = self._config_mtime()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="streamq-config", daemon=True)
+        self._watcher.start()
+    
+    def _watch(self, interval):
+        """Poll the config file's modification time."""
+        stop = threading.Event()
+        while not stop.wait(interval):
+            mtime = self._config_mtime()
+            if mtime == self._file_mtime:
+                continue
+            self._file_mtime = mtime
+            try:
+                _, restart = self.reload()
+            except ConfigError as error:
+                print(f"StreamQ: config reload rejected: {error}", file=sys.stderr)
+                continue
+            if restart:
+                print(f"StreamQ: restart required to apply: {', '.join(restart)}", file=sys.stderr)
+    
+    def _config_mtime(self):
+        """Return the config file's modification time, or None if it is missing."""
+        try:
+            return os.path.getmtime(self.config_file)
+        except OSError:
+            return None
+    
+    def _resolve(self):
+        """
+        Merge every layer into validated knob values.
+        
+        Returns:
+            dict: Knob name to value
+        """
+        values = dict(self._defaults)
+        for name, raw in self._read_file().items():
+            values[name] = KNOBS[name].parse(name, raw, self.config_file)
+        for name, knob in KNOBS.items():
+            env_name = ENV_PREFIX + name.upper()
+            if env_name in os.environ:
+                values[name] = knob.parse(name, os.environ[env_name], f"${env_name}")
+        for name, raw in self.overrides.items():
+            values[name] = KNOBS[name].parse(name, raw, "the command line")
+        if values["adaptive_min_workers"] > values["adaptive_max_workers"]:
+            raise ConfigError(
+                f"Invalid settings: 'adaptive_min_workers' ({values['adaptive_min_workers']}) "
+                f"exceeds 'adaptive_max_workers' ({values['adaptive_max_workers']})"
+            )
+        return values
+    
+    def _read_file(self):
+        """
+        Read knob values from the JSON config file.
+        
+        Returns:
+            dict: Raw values keyed by knob name (empty if the file is missing)
+        """
+        if not os.path.isfile(self.config_file):
+            return {}
+        try:
+            with open(self.config_file, "r", encoding="utf-8") as config_file:
+                data = json.load(config_file)
+        except (OSError, ValueError) as error:
+            raise ConfigError(f"Cannot read config file {self.config_file}: {error}") from None
+        if not isinstance(data, dict):
+            raise ConfigError(f"Config file {self.config_file} must contain a JSON object")
+        unknown = sorted(set(data) - set(KNOBS))
+        if unknown:
+            raise ConfigError(
+                f"Unknown setting(s) in {self.config_file}: {', '.join(unknown)}. "
+                f"Valid settings: {', '.join(sorted(KNOBS))}"
+            )
+        return data
+    
+    @staticmethod
+    def _parse_overrides(overrides):
+        """Split ``name=value`` command line overrides."""
+        parsed = {}
+        for item in overrides:
+            name, separator, value = item.partition("=")
+            name = name.strip().replace("-", "_")
+            if not separator:
+                raise ConfigError(f"Invalid override {item!r}: expected name=value")
+            if name not in KNOBS:
+                raise ConfigError(f"Unknown setting {name!r}. Valid settings: {', '.join(sorted(KNOBS))}")
+            parsed[name] = value
+        return parsed
+    
+    def _apply(self, values):
+        """Set validated knob values and keep derived paths in sync."""
+        for name, value in values.items():
+            setattr(self, name, value)
+        if "download_dir" in values:
+            self.audio_dir = os.path.join(self.download_dir, "audio")
+            self.video_dir = os.path.join(self.download_dir, "video")
+    
     def get_download_dir(self, format_type):
         """
         Get the download directory for a specific format type.
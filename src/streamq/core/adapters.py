@@ -0,0 +1,133 @@
+"""Adapters that connect the asyncio engine to the Tk GUI and headless runs."""
+
+import queue
+import threading
+import time
+
+from ..utils.profiling import profiled
+from .concurrency import describe_decision
+from .diskspace import describe_wait
+
+
+class TkDispatcher:
+    """
+    Marshals callbacks from engine and worker threads onto the Tk main loop.
+
+    Tk is not thread-safe, so other threads only post work here. The Tk side
+    drains the posted work on a fixed ``after`` interval, which batches many
+    updates into a single UI tick. Posts made with a key are coalesced so
+    only the latest value for that key is applied per tick.
+    """
+
+    def __init__(self, master, interval_ms=50):
+        """
+        Initialize the dispatcher and start draining.
+
+        Args:
+            master: The root Tkinter window
+            interval_ms (int): Delay between drains of posted work
+        """
+        self.master = master
+        self.interval_ms = interval_ms
+        self._pending = queue.SimpleQueue()
+        self._latest = {}
+        self._latest_lock = threading.Lock()
+        self.master.after(self.interval_ms, self._drain)
+
+    def post(self, callback, *args):
+        """Run ``callback(*args)`` on the Tk thread during the next tick."""
+        self._pending.put((callback, args))
+
+    def post_latest(self, key, callback, *args):
+        """Like :meth:`post`, but drop older unapplied posts with the same key."""
+        with self._latest_lock:
+            self._latest[key] = (callback, args)
+
+    def wrap(self, callback, key=None):
+        """
+        Build a thread-safe proxy for a Tk-side callback.
+
+        Args:
+            callback (callable): Function to run on the Tk thread
+            key (str): Coalescing key; when given only the latest call is kept
+
+        Returns:
+            callable: Function that may be called from any thread
+        """
+        if key is None:
+            return lambda *args: self.post(callback, *args)
+        return lambda *args: self.post_latest(key, callback, *args)
+
+    @profiled("tick")
+    def _drain(self):
+        """Apply posted work on the Tk thread and reschedule."""
+        try:
+            while True:
+                try:
+                    callback, args = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                callback(*args)
+            with self._latest_lock:
+                latest, self._latest = self._latest, {}
+            for callback, args in latest.values():
+                callback(*args)
+        finally:
+            self.master.after(self.interval_ms, self._drain)
+
+
+class HeadlessReporter:
+    """Prints queue activity to the console and lets the caller wait for a batch."""
+
+    def __init__(self, progress_interval=1.0):
+        """
+        Initialize the reporter.
+
+        Args:
+            progress_interval (float): Minimum seconds between progress lines
+        """
+        self.progress_interval = progress_interval
+        self.errors = []
+        self.completed = []
+        self._last_progress = 0.0
+        self._done = threading.Event()
+
+    def attach(self, download_queue):
+        """Register this reporter's callbacks on a queue and its manager."""
+        download_queue.set_status_callback(self.on_status)
+        download_queue.set_completion_callback(self.on_complete)
+        download_queue.download_manager.set_progress_callback(self.on_progress)
+
+    def on_status(self, update_type, entry):
+        """Print status and title changes."""
+        if update_type == "status_changed":
+            print(f"[{entry['item_id']}] {entry['status']}: {entry['url']}", flush=True)
+        elif update_type == "title_updated":
+            print(f"[{entry['item_id']}] Title: {entry['title']}", flush=True)
+        elif update_type == "concurrency_changed":
+            print(describe_decision(entry), flush=True)
+        elif update_type == "disk_wait":
+            print(describe_wait(entry) if entry else "Disk space available, resuming", flush=True)
+
+    def on_progress(self, percent_value, message):
+        """Print throttled progress messages."""
+        now = time.monotonic()
+        if percent_value < 100.0 and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        print(message, flush=True)
+
+    def on_complete(self, format_type, errors, completed):
+        """Record the batch result and release :meth:`wait`."""
+        self.errors = errors
+        self.completed = completed
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Block until the batch finishes.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        return self._done.wait(timeout)
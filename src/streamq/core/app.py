@@ -11,7 +11,12 @@ from urllib.parse import urlparse
 
 from ..config import config
 from ..utils.ffmpeg import ensure_ffmpeg
+from ..utils.profiling import profiled
+from .adapters import TkDispatcher
+from .concurrency import describe_decision
+from .diskspace import describe_wait
 from .downloader import DownloadManager, DownloadQueue
+from .inbox import InboxWatcher
 
 
 class StreamQApp:
@@ -31,6 +36,11 @@ class StreamQApp:
         self.download_manager = DownloadManager(self.ffmpeg_dir)
         self.download_queue = DownloadQueue(self.download_manager)
         
+        # Route engine callbacks onto the Tk main loop
+        self.dispatcher = TkDispatcher(master, interval_ms=config.ui_refresh_ms)
+        config.add_listener(self._on_config_changed)
+        config.start_watching()
+        
         # Set up callbacks
         self.download_manager.set_progress_callback(self._on_progress_update)
         self.download_queue.set_status_callback(self._on_status_update)
@@ -42,12 +52,17 @@ class StreamQApp:
         self.format_var = tk.StringVar(value="audio")
         self.quality_var = tk.StringVar()
         
+        # Queue entries keyed by Treeview item ID
+        self.entries_by_item = {}
+        
         # Status tag mapping
         self.status_tags = {
             "Pending": "status-pending",
             "Downloading": "status-downloading", 
+            "Paused": "status-paused",
             "Completed": "status-completed",
             "Failed": "status-failed",
+            "Cancelled": "status-cancelled",
         }
         
         # Configure and build the UI
@@ -57,6 +72,17 @@ class StreamQApp:
         
         # Ensure directories exist
         config.ensure_directories()
+        
+        # Pick up URL files dropped into the inbox directory, if configured
+        self.inbox = None
+        if config.inbox_dir:
+            self.inbox = InboxWatcher(
+                config.inbox_dir,
+                self.download_queue,
+                fetch_titles=True,
+                on_queued=self._on_inbox_queued,
+            )
+            self.inbox.start()
     
     def _configure_window(self):
         """Configure the main window appearance and styling."""
@@ -211,8 +237,10 @@ class StreamQApp:
         tag_colors = {
             "status-pending": "#616161",
             "status-downloading": "#005FB8",
+            "status-paused": "#CA5010",
             "status-completed": "#107C10",
             "status-failed": "#D13438",
+            "status-cancelled": "#8A8886",
         }
         for tag, color in tag_colors.items():
             self.queue_display.tag_configure(tag, foreground=color)
@@ -276,7 +304,23 @@ class StreamQApp:
         """Build the action buttons section."""
         actions_frame = ttk.Frame(container, padding=(12, 8, 12, 8))
         actions_frame.grid(row=6, column=0, sticky="ew", pady=(0, 8))
-        actions_frame.columnconfigure(0, weight=1)
+        actions_frame.columnconfigure(6, weight=1)
+        
+        # Controls for the selected entry
+        self.pause_button = ttk.Button(actions_frame, text="Pause", command=self._pause_selected)
+        self.pause_button.grid(row=0, column=0, sticky="w", padx=(0, 8))
+        self.resume_button = ttk.Button(actions_frame, text="Resume", command=self._resume_selected)
+        self.resume_button.grid(row=0, column=1, sticky="w", padx=(0, 8))
+        self.cancel_button = ttk.Button(actions_frame, text="Cancel", command=self._cancel_selected)
+        self.cancel_button.grid(row=0, column=2, sticky="w", padx=(0, 16))
+        
+        # Controls for the whole queue
+        self.pause_all_button = ttk.Button(actions_frame, text="Pause All", command=self.download_queue.pause_all)
+        self.pause_all_button.grid(row=0, column=3, sticky="w", padx=(0, 8))
+        self.resume_all_button = ttk.Button(actions_frame, text="Resume All", command=self.download_queue.resume_all)
+        self.resume_all_button.grid(row=0, column=4, sticky="w", padx=(0, 8))
+        self.cancel_all_button = ttk.Button(actions_frame, text="Cancel All", command=self.download_queue.cancel_all)
+        self.cancel_all_button.grid(row=0, column=5, sticky="w")
         
         self.download_button = ttk.Button(
             actions_frame,
@@ -284,7 +328,7 @@ class StreamQApp:
             command=self._start_download,
             style="primary.TButton",
         )
-        self.download_button.grid(row=0, column=0, sticky="e")
+        self.download_button.grid(row=0, column=6, sticky="e")
     
     def _update_quality_options(self):
         """Update quality options based on selected format."""
@@ -314,12 +358,32 @@ class StreamQApp:
         )
         
         entry = self.download_queue.add_to_queue(url, item_id)
+        self.entries_by_item[item_id] = entry
         
         pending_total = self.download_queue.get_pending_count()
         self.status_var.set(f"Added to queue. Pending items: {pending_total}.")
         
         self.url_entry.delete(0, tk.END)
 
+    def _on_inbox_queued(self, entries):
+        """Show entries queued from the inbox (called from the inbox thread)."""
+        self.dispatcher.post(self._add_inbox_rows, entries)
+    
+    @profiled("tick")
+    def _add_inbox_rows(self, entries):
+        """Add Treeview rows for entries queued from the inbox."""
+        for entry in entries:
+            item_id = self.queue_display.insert(
+                "",
+                "end",
+                values=(entry["status"], entry["url"], entry.get("title") or "Fetching title..."),
+                tags=(self.status_tags.get(entry["status"], ""),),
+            )
+            entry["item_id"] = item_id
+            self.entries_by_item[item_id] = entry
+        pending_total = self.download_queue.get_pending_count()
+        self.status_var.set(f"Added {len(entries)} URL(s) from the inbox. Pending items: {pending_total}.")
+
     def _paste_and_add(self):
         """Paste URL from clipboard into entry and add to queue."""
         clip_text = ""
@@ -355,11 +419,7 @@ class StreamQApp:
         return bool(host)
     
     def _start_download(self):
-        """Start processing the download queue."""
-        if self.download_queue.is_downloading:
-            messagebox.showinfo("Info", "A download is already in progress.")
-            return
-        
+        """Start processing the download queue, or add pending items to the running batch."""
         pending_count = self.download_queue.get_pending_count()
         if pending_count == 0:
             messagebox.showwarning("Warning", "No pending items in the queue.")
@@ -371,34 +431,50 @@ class StreamQApp:
             messagebox.showwarning("Warning", "Please select a quality option.")
             return
         
-        self.progress_var.set(0.0)
-        self.status_var.set(f"Preparing {pending_count} download(s)...")
-        self._set_controls_state(disabled=True)
+        if self.download_queue.is_downloading:
+            self.status_var.set(f"Added {pending_count} item(s) to the running batch.")
+        else:
+            self.progress_var.set(0.0)
+            self.status_var.set(f"Preparing {pending_count} download(s)...")
         
         self.download_queue.process_queue(format_type, quality)
     
-    def _set_controls_state(self, disabled):
-        """Enable or disable UI controls."""
-        widgets = [
-            self.url_entry,
-            self.add_button,
-            self.download_button,
-            self.format_radio_audio,
-            self.format_radio_video,
-            self.quality_dropdown,
-        ]
-        for widget in widgets:
-            if disabled:
-                widget.state(["disabled"])
-            else:
-                widget.state(["!disabled"])
-        if not disabled:
-            self.url_entry.focus_set()
+    def _selected_entry(self):
+        """Return the queue entry for the selected Treeview row, if any."""
+        selection = self.queue_display.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select an item in the queue.")
+            return None
+        return self.entries_by_item.get(selection[0])
+    
+    def _pause_selected(self):
+        """Pause the selected queue entry."""
+        entry = self._selected_entry()
+        if entry:
+            self.download_queue.pause_entry(entry)
+    
+    def _resume_selected(self):
+        """Resume the selected queue entry."""
+        entry = self._selected_entry()
+        if entry:
+            self.download_queue.resume_entry(entry)
+    
+    def _cancel_selected(self):
+        """Cancel the selected queue entry."""
+        entry = self._selected_entry()
+        if entry:
+            self.download_queue.cancel_entry(entry)
+    
+    def _on_config_changed(self, changes):
+        """Apply hot-reloaded UI settings (called from the config watcher)."""
+        if "ui_refresh_ms" in changes:
+            self.dispatcher.interval_ms = changes["ui_refresh_ms"]
     
     def _on_progress_update(self, percent_value, message):
         """Handle progress updates from download manager."""
-        self.master.after(0, self._update_progress_ui, percent_value, message)
+        self.dispatcher.post_latest("progress", self._update_progress_ui, percent_value, message)
     
+    @profiled("tick")
     def _update_progress_ui(self, value, message):
         """Update progress UI elements."""
         self.progress_var.set(max(0.0, min(100.0, value)))
@@ -407,10 +483,16 @@ class StreamQApp:
     def _on_status_update(self, update_type, entry):
         """Handle status updates from download queue."""
         if update_type == "status_changed":
-            self.master.after(0, self._update_queue_status, entry)
+            self.dispatcher.post(self._update_queue_status, entry)
         elif update_type == "title_updated":
-            self.master.after(0, self._update_entry_title, entry)
+            self.dispatcher.post(self._update_entry_title, entry)
+        elif update_type == "concurrency_changed":
+            self.dispatcher.post(self.status_var.set, describe_decision(entry))
+        elif update_type == "disk_wait":
+            message = describe_wait(entry) if entry else "Disk space available, resuming downloads"
+            self.dispatcher.post(self.status_var.set, message)
     
+    @profiled("tick")
     def _update_queue_status(self, entry):
         """Update the status display for a queue entry."""
         status = entry["status"]
@@ -424,10 +506,12 @@ class StreamQApp:
         if tag:
             self.queue_display.item(item_id, tags=(tag,))
 
+    @profiled("tick")
     def _update_entry_title(self, entry):
         """Update the title for a queue entry."""
         item_id = entry.get("item_id")
-        if not item_id:
+        # Inbox entries get their row after queueing; the row picks up the title then
+        if item_id not in self.entries_by_item:
             return
         current_values = self.queue_display.item(item_id, "values") or ("", "", "")
         status = entry.get("status") or (current_values[0] if len(current_values) > 0 else "")
@@ -438,16 +522,15 @@ class StreamQApp:
     
     def _on_download_complete(self, format_type, errors, completed):
         """Handle download completion."""
-        self.master.after(0, self._handle_download_complete, format_type, errors, completed)
+        self.dispatcher.post(self._handle_download_complete, format_type, errors, completed)
     
+    @profiled("tick")
     def _handle_download_complete(self, format_type, errors, completed):
         """Handle download completion in the main thread."""
-        self._set_controls_state(disabled=False)
-        
         success_count = len(completed)
         failure_count = len(errors)
         counts = self.download_queue.get_status_counts()
-        pending_count = counts["Pending"]
+        pending_count = counts["Pending"] + counts["Paused"]
         
         if failure_count:
             details = "\n".join(f"- {url}: {error}" for url, error in errors[:3])
@@ -469,7 +552,12 @@ class StreamQApp:
                 self._open_download_folder(format_type)
             else:
                 self.progress_var.set(0.0)
-                self.status_var.set("No downloads were processed.")
+                if counts["Paused"] or counts["Cancelled"]:
+                    self.status_var.set(
+                        f"Stopped | Paused {counts['Paused']} | Cancelled {counts['Cancelled']}"
+                    )
+                else:
+                    self.status_var.set("No downloads were processed.")
     
     def _open_download_folder(self, format_type):
         """Open the download folder in the system file manager."""
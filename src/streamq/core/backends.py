@@ -0,0 +1,461 @@
+"""Download backends: a pluggable interface and a lean direct-HTTP engine."""
+
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import unquote, urljoin, urlparse
+
+import yt_dlp
+
+from ..config import config
+from .streaming import find_ffmpeg
+from .variants import ffmpeg_arguments, run_ffmpeg
+
+# File extensions served as-is by plain web servers
+MEDIA_EXTENSIONS = (
+    ".mp4", ".m4v", ".mkv", ".webm", ".mov", ".avi",
+    ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".wav",
+)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class DownloadBackend:
+    """
+    Interface for engines that :class:`DownloadManager` can route URLs to.
+
+    Backends are asked in registration order; yt-dlp handles every URL no
+    backend accepted.
+    """
+
+    name = "backend"
+
+    def accepts(self, url, format_type):
+        """
+        Cheaply decide whether to try this backend, without network access.
+
+        Returns:
+            bool: True to have :meth:`download` called
+        """
+        raise NotImplementedError
+
+    def download(self, url, format_type, quality, output_dir, progress_hook, control=None, rate_limit=0):
+        """
+        Download ``url`` into ``output_dir``.
+
+        Args:
+            url (str): URL accepted by :meth:`accepts`
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting
+            output_dir (str): Directory for the finished file
+            progress_hook (callable): Receives yt-dlp style progress dicts;
+                may raise to abort the download
+            control (JobControl): Optional interrupt flag
+            rate_limit (int): This download's share of the bandwidth cap in
+                bytes/s (0 = unlimited)
+
+        Returns:
+            str or None: Path of the finished file, or None if the backend
+                declined after probing (the URL then goes to yt-dlp)
+        """
+        raise NotImplementedError
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections reused across requests to the same host."""
+
+    def __init__(self, max_idle_per_host=8, timeout=30):
+        """
+        Initialize the pool.
+
+        Args:
+            max_idle_per_host (int): Idle connections kept per host
+            timeout (float): Socket timeout
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}  # (scheme, host, port) -> list of connections
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def request(self, method, url, headers=None, max_redirects=5):
+        """
+        Send a request, following redirects.
+
+        The connection goes back to the pool when the body was read to the
+        end without an error, and is closed otherwise.
+
+        Yields:
+            tuple: (http.client.HTTPResponse, final URL)
+        """
+        for _ in range(max_redirects + 1):
+            key, connection, response = self._send(method, url, headers or {})
+            if response.status not in REDIRECT_STATUSES or not response.getheader("Location"):
+                break
+            response.read()
+            self._release(key, connection, response)
+            url = urljoin(url, response.getheader("Location"))
+        else:
+            connection.close()
+            raise RuntimeError(f"Too many redirects for {url}")
+
+        healthy = False
+        try:
+            yield response, url
+            healthy = True
+        finally:
+            if healthy and response.isclosed():
+                self._release(key, connection, response)
+            else:
+                connection.close()
+
+    def _send(self, method, url, headers):
+        """Send one request on a pooled or new connection."""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        default_port = 443 if parsed.scheme == "https" else 80
+        key = (parsed.scheme, parsed.hostname, parsed.port or default_port)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        headers = dict(headers, **{"User-Agent": "StreamQ", "Connection": "keep-alive"})
+
+        connection = self._take(key)
+        if connection is not None:
+            try:
+                connection.request(method, path, headers=headers)
+                return key, connection, connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                # The server closed the idle connection; retry on a fresh one
+                connection.close()
+        if parsed.scheme == "https":
+            connection = http.client.HTTPSConnection(key[1], key[2], timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(key[1], key[2], timeout=self.timeout)
+        connection.request(method, path, headers=headers)
+        return key, connection, connection.getresponse()
+
+    def _take(self, key):
+        """Pop an idle connection for a host, if any."""
+        with self._lock:
+            idle = self._idle.get(key)
+            return idle.pop() if idle else None
+
+    def _release(self, key, connection, response):
+        """Return a connection whose response was fully read."""
+        if response.will_close:
+            connection.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def _url_digest(url):
+    """Short stable digest of a URL for file names."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+
+
+class _Stopped(Exception):
+    """Raised in a range worker because another range failed."""
+
+
+class _Transfer:
+    """Shared byte counters of one download, reported from several threads."""
+
+    def __init__(self, path, size, progress_hook, rate_limit):
+        self.path = path
+        self.size = size
+        self.progress_hook = progress_hook
+        self.rate_limit = rate_limit
+        self.downloaded = 0
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._session_bytes = 0
+
+    def advance(self, count):
+        """Count received bytes, report progress and apply the rate cap."""
+        with self._lock:
+            self.downloaded += count
+            self._session_bytes += count
+            self.progress_hook({
+                "status": "downloading",
+                "downloaded_bytes": self.downloaded,
+                "total_bytes": self.size,
+                "filename": self.path,
+                "info_dict": {},
+            })
+            delay = 0.0
+            if self.rate_limit:
+                delay = self._session_bytes / self.rate_limit - (time.monotonic() - self._started)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DirectHTTPBackend(DownloadBackend):
+    """
+    Downloads plain media files without the yt-dlp extractor stack.
+
+    A HEAD request (or a one-byte ranged GET where HEAD is refused) checks
+    that the URL really serves media and learns its size and range support.
+    Large files are fetched as several ranged GETs in parallel over pooled
+    keep-alive connections. Each range's progress is kept in a state file
+    next to the ``.part`` file, so an interrupted download resumes where it
+    stopped while the server's ETag/Last-Modified still match. A hidden
+    sidecar records the source of each finished file, so a re-run skips only
+    files from the same URL and a file that merely shares the name is saved
+    under a name with a short hash of its URL.
+
+    Audio requests for non-MP3 files are converted with FFmpeg afterwards.
+    """
+
+    name = "direct-http"
+
+    def __init__(self, ffmpeg_dir=None, chunk_size=256 * 1024, min_split_size=4 * 1024 * 1024):
+        """
+        Initialize the backend.
+
+        Args:
+            ffmpeg_dir (str): FFmpeg location for audio conversion
+            chunk_size (int): Bytes read per socket read
+            min_split_size (int): Files smaller than this use a single request
+        """
+        self.ffmpeg_dir = ffmpeg_dir
+        self.chunk_size = chunk_size
+        self.min_split_size = min_split_size
+        self.pool = ConnectionPool()
+
+    def accepts(self, url, format_type):
+        """Accept http(s) URLs whose path ends in a media file extension."""
+        if not config.direct_http:
+            return False
+        parsed = urlparse(url)
+        return parsed.scheme in ("http", "https") and parsed.path.lower().endswith(MEDIA_EXTENSIONS)
+
+    def download(self, url, format_type, quality, output_dir, progress_hook, control=None, rate_limit=0):
+        """Probe, download in parallel ranges and convert audio if needed."""
+        probe = self.probe(url)
+        if probe is None:
+            return None
+        name = yt_dlp.utils.sanitize_filename(probe["filename"]) or "download"
+        convert = format_type == "audio" and not name.lower().endswith(".mp3")
+        final_path = self._final_path(output_dir, name, convert)
+        if os.path.exists(final_path) and not self._same_source(final_path, probe):
+            # The name belongs to another file: keep both, told apart by their URLs
+            stem, extension = os.path.splitext(name)
+            name = f"{stem} [{_url_digest(probe['url'])}]{extension}"
+            final_path = self._final_path(output_dir, name, convert)
+        if os.path.exists(final_path) and self._same_source(final_path, probe):
+            # Already downloaded from this URL, like yt-dlp's own check
+            return final_path
+
+        path = os.path.join(output_dir, name)
+        self._fetch(probe, path, progress_hook, rate_limit)
+        if convert:
+            ffmpeg_path = find_ffmpeg(self.ffmpeg_dir)
+            if not ffmpeg_path:
+                raise RuntimeError("FFmpeg is required to convert audio")
+            run_ffmpeg(ffmpeg_path, ffmpeg_arguments("audio", quality, [path]), final_path)
+            os.remove(path)
+        self._save_source(final_path, probe)
+        return final_path
+
+    @staticmethod
+    def _final_path(output_dir, name, convert):
+        """Path of the finished file; converted audio ends in ``.mp3``."""
+        return os.path.join(output_dir, os.path.splitext(name)[0] + ".mp3" if convert else name)
+
+    @staticmethod
+    def _source_path(final_path):
+        """Hidden sidecar recording where a finished file came from."""
+        directory, name = os.path.split(final_path)
+        return os.path.join(directory, f".{name}.source.json")
+
+    def _same_source(self, final_path, probe):
+        """Whether a finished file was downloaded from the probed URL and version."""
+        try:
+            with open(self._source_path(final_path), "r", encoding="utf-8") as source_file:
+                source = json.load(source_file)
+        except (OSError, ValueError):
+            return False
+        return (
+            source.get("url") == probe["url"]
+            and source.get("size") == probe["size"]
+            and source.get("validator") == probe["validator"]
+        )
+
+    def _save_source(self, final_path, probe):
+        """Record the URL, size and validator a finished file was downloaded from."""
+        source = {"url": probe["url"], "size": probe["size"], "validator": probe["validator"]}
+        with open(self._source_path(final_path), "w", encoding="utf-8") as source_file:
+            json.dump(source, source_file)
+
+    def probe(self, url):
+        """
+        Find the final URL, size, validators and range support of a media URL.
+
+        Returns:
+            dict or None: Probe result, or None if the URL does not serve media
+        """
+        with self.pool.request("HEAD", url) as (response, final_url):
+            response.read()
+            status = response.status
+            headers = response.headers
+        ranged = False
+        if status in (403, 405, 501):
+            # Some servers refuse HEAD; a one-byte range tells the same.
+            # The body is not read: a server ignoring Range would send everything.
+            with self.pool.request("GET", url, {"Range": "bytes=0-0"}) as (response, final_url):
+                status = response.status
+                headers = response.headers
+            ranged = status == 206
+        if status >= 400:
+            raise RuntimeError(f"HTTP Error {status}: {final_url}")
+
+        content_type = (headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type.startswith("text/") or content_type in ("application/json", "application/xml"):
+            return None
+        size = None
+        content_range = headers.get("Content-Range") or ""
+        if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+            size = int(content_range.rsplit("/", 1)[1])
+        elif not ranged and (headers.get("Content-Length") or "").isdigit():
+            size = int(headers["Content-Length"])
+        return {
+            "url": final_url,
+            "size": size,
+            "ranges": ranged or headers.get("Accept-Ranges", "").lower() == "bytes",
+            "validator": headers.get("ETag") or headers.get("Last-Modified") or "",
+            "filename": self._filename(headers, final_url),
+        }
+
+    @staticmethod
+    def _filename(headers, url):
+        """Take the file name from Content-Disposition or the URL path."""
+        disposition = headers.get("Content-Disposition") or ""
+        match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+        if match:
+            return os.path.basename(unquote(match.group(1)))
+        return os.path.basename(unquote(urlparse(url).path))
+
+    def _fetch(self, probe, path, progress_hook, rate_limit=0):
+        """Download into a ``.part`` file and move it into place when complete."""
+        # Keyed by URL so two sources with the same file name never share partial data
+        part_path = f"{path}.{_url_digest(probe['url'])}.part"
+        state_path = part_path + ".state"
+        size = probe["size"]
+        segments = self._load_segments(state_path, probe)
+        if segments is None:
+            segments = self._plan_segments(size if probe["ranges"] else None)
+            with open(part_path, "wb") as part_file:
+                if size:
+                    part_file.truncate(size)
+
+        transfer = _Transfer(path, size, progress_hook, rate_limit)
+        transfer.downloaded = sum(segment[2] for segment in segments)
+        workers = min(len(segments), config.http_connections)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="streamq-http") as executor:
+            futures = [
+                executor.submit(self._fetch_segment, probe["url"], part_path, segment, transfer)
+                for segment in segments
+                if segment[1] is None or segment[0] + segment[2] <= segment[1]
+            ]
+            errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            if probe["ranges"]:
+                self._save_segments(state_path, probe, segments)
+            # Report the range that failed first, not the ones it stopped
+            raise next((error for error in errors if not isinstance(error, _Stopped)), errors[0])
+        if size is not None and transfer.downloaded < size:
+            raise RuntimeError(f"Download incomplete: {transfer.downloaded} of {size} bytes")
+
+        os.replace(part_path, path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        progress_hook({
+            "status": "finished",
+            "downloaded_bytes": transfer.downloaded,
+            "total_bytes": transfer.downloaded,
+            "filename": path,
+            "info_dict": {},
+        })
+
+    def _plan_segments(self, size):
+        """Split a file into [start, end, done] ranges, one per connection."""
+        if not size or size < self.min_split_size:
+            return [[0, size - 1 if size else None, 0]]
+        count = max(1, min(config.http_connections, size // self.min_split_size))
+        step = -(-size // count)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+    def _fetch_segment(self, url, part_path, segment, transfer):
+        """Download one range; any failure stops the other ranges too."""
+        try:
+            self._fetch_range(url, part_path, segment, transfer)
+        except BaseException:
+            transfer.stopped.set()
+            raise
+
+    def _fetch_range(self, url, part_path, segment, transfer):
+        """Download one range, resuming after the bytes it already has."""
+        start, end, done = segment
+        headers = {}
+        if end is not None:
+            headers["Range"] = f"bytes={start + done}-{end}"
+        with self.pool.request("GET", url, headers) as (response, _):
+            if response.status >= 400:
+                raise RuntimeError(f"HTTP Error {response.status}: {url}")
+            if end is not None and response.status != 206:
+                raise RuntimeError(f"Server ignored the range request for {url}")
+            with open(part_path, "r+b") as part_file:
+                part_file.seek(start + done)
+                while not transfer.stopped.is_set():
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    part_file.write(chunk)
+                    segment[2] += len(chunk)
+                    transfer.advance(len(chunk))
+            if transfer.stopped.is_set():
+                # Leave the rest of the body unread; the connection is closed
+                raise _Stopped()
+
+    @staticmethod
+    def _load_segments(state_path, probe):
+        """Read saved ranges if they belong to the same remote file."""
+        if not probe["ranges"] or not os.path.exists(state_path) or not os.path.exists(state_path[:-len(".state")]):
+            return None
+        try:
+            with open(state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        if state.get("size") != probe["size"] or state.get("validator") != probe["validator"]:
+            return None
+        return state.get("segments")
+
+    @staticmethod
+    def _save_segments(state_path, probe, segments):
+        """Persist range progress for a later resume."""
+        with open(state_path, "w", encoding="utf-8") as state_file:
+            json.dump({"size": probe["size"], "validator": probe["validator"], "segments": segments}, state_file)
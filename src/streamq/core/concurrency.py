@@ -0,0 +1,259 @@
+"""Adaptive (AIMD) download and metadata concurrency."""
+
+import asyncio
+import os
+import re
+import time
+from collections import deque
+
+from ..config import config
+from .progress import format_bytes
+
+
+# yt-dlp and urllib name the status in their messages, e.g. "HTTP Error 429: Too Many Requests"
+RATE_LIMITED_MESSAGE = re.compile(r"\bHTTP Error 429\b|\bToo Many Requests\b", re.IGNORECASE)
+
+
+def _http_status(error):
+    """HTTP status carried by an exception or the one yt-dlp wrapped in it, if any."""
+    wrapped = getattr(error, "exc_info", None) or (None, None)
+    for candidate in (error, wrapped[1], getattr(error, "__cause__", None)):
+        status = getattr(candidate, "status", None) or getattr(candidate, "code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_rate_limited(error):
+    """
+    Whether an error reports HTTP 429 throttling.
+
+    Args:
+        error (Exception or str): The failure or its message
+
+    Returns:
+        bool: True for a 429 status, or a message naming it; digits that
+            merely contain 429 (a video ID, a byte count, a port) do not count
+    """
+    status = _http_status(error)
+    if status is not None:
+        return status == 429
+    return bool(RATE_LIMITED_MESSAGE.search(str(error or "")))
+
+
+def describe_decision(decision):
+    """
+    Build a one-line message for a concurrency decision.
+
+    Returns:
+        str: e.g. ``Concurrency 4 downloads, 3 metadata (increase: all slots busy, 5.2 MiB/s)``
+    """
+    return (
+        f"Concurrency {decision['download_limit']} downloads, {decision['metadata_limit']} metadata "
+        f"({decision['action']}: {decision['reason']}, {format_bytes(decision['throughput'])}/s)"
+    )
+
+
+class AdjustableSemaphore:
+    """An asyncio semaphore whose limit can change while it is in use."""
+
+    def __init__(self, limit):
+        """
+        Initialize the semaphore; must be created on the engine thread.
+
+        Args:
+            limit (int): Holders allowed at the same time
+        """
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.active < self.limit)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def set_limit(self, limit):
+        """Change the limit and wake waiters that now fit."""
+        async with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+
+class AdaptiveController:
+    """
+    Adjusts download and metadata concurrency from what the queue observes.
+
+    Every ``interval`` seconds the controller looks at aggregate throughput,
+    the share of failed jobs, HTTP 429 responses and CPU load:
+
+    - Throttling, too many errors or a saturated CPU halve the limit
+      (multiplicative decrease).
+    - Otherwise, while every slot is busy and entries are waiting, the
+      limit grows by one (additive increase). If the last increase did not
+      raise throughput, the probe is undone and the limit holds for a while.
+
+    Limits stay within ``adaptive_min_workers`` and ``adaptive_max_workers``
+    for downloads and between 1 and ``metadata_workers`` for metadata.
+    """
+
+    def __init__(
+        self,
+        download_queue,
+        interval=5.0,
+        decrease=0.5,
+        error_threshold=0.2,
+        cpu_threshold=0.9,
+        plateau=0.05,
+        hold_intervals=6,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            download_queue (DownloadQueue): Queue whose limits are adjusted
+            interval (float): Seconds between decisions
+            decrease (float): Factor applied to a limit on congestion
+            error_threshold (float): Failed share of finished jobs treated as congestion
+            cpu_threshold (float): Load per CPU treated as saturation
+            plateau (float): Minimum relative throughput gain that justifies an increase
+            hold_intervals (int): Decisions to wait after an unproductive increase
+        """
+        self.download_queue = download_queue
+        self.interval = interval
+        self.decrease = decrease
+        self.error_threshold = error_threshold
+        self.cpu_threshold = cpu_threshold
+        self.plateau = plateau
+        self.hold_intervals = hold_intervals
+        self.decisions = deque(maxlen=50)
+        self._window = self._empty_window()
+        self._last_action = None
+        self._speed_before_increase = 0.0
+        self._hold = 0
+        self._cpu_sample = (time.monotonic(), time.process_time())
+        self._last = {}
+
+    @staticmethod
+    def _empty_window():
+        return {"finished": 0, "failed": 0, "rate_limited": 0, "metadata_rate_limited": 0}
+
+    def record(self, kind, error=None):
+        """
+        Count a finished job (engine thread only).
+
+        Args:
+            kind (str): 'download' or 'metadata'
+            error (Exception or str): The failure, or None on success
+        """
+        window = self._window
+        if kind == "download":
+            window["finished"] += 1
+            if error:
+                window["failed"] += 1
+        if error and is_rate_limited(error):
+            window["metadata_rate_limited" if kind == "metadata" else "rate_limited"] += 1
+
+    async def run(self):
+        """Make a decision every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.step()
+
+    def cpu_load(self):
+        """Load per CPU: the 1-minute load average, or this process's CPU share."""
+        cpus = os.cpu_count() or 1
+        if hasattr(os, "getloadavg"):
+            return os.getloadavg()[0] / cpus
+        now, cpu = time.monotonic(), time.process_time()
+        then, cpu_then = self._cpu_sample
+        self._cpu_sample = (now, cpu)
+        return (cpu - cpu_then) / max(now - then, 1e-6) / cpus
+
+    async def step(self):
+        """Make one decision and apply it (engine thread only)."""
+        queue = self.download_queue
+        window, self._window = self._window, self._empty_window()
+        speed = queue.download_manager.progress.snapshot()["speed"]
+        cpu = self.cpu_load()
+        error_rate = window["failed"] / window["finished"] if window["finished"] else 0.0
+        minimum = config.adaptive_min_workers
+        maximum = config.adaptive_max_workers
+        limit = queue.max_workers
+        metadata_limit = queue.metadata_slots_limit()
+
+        action, reason = "hold", "idle"
+        if window["rate_limited"]:
+            action, reason = "decrease", f"{window['rate_limited']} rate-limited (429)"
+        elif error_rate > self.error_threshold:
+            action, reason = "decrease", f"error rate {error_rate:.0%}"
+        elif cpu > self.cpu_threshold:
+            action, reason = "decrease", f"CPU load {cpu:.0%}"
+        elif self._hold:
+            self._hold -= 1
+            reason = "holding after an unproductive increase"
+        elif queue.has_waiting_downloads():
+            if self._last_action == "increase" and speed < self._speed_before_increase * (1 + self.plateau):
+                action, reason = "plateau", "throughput did not improve"
+                self._hold = self.hold_intervals
+            else:
+                action, reason = "increase", "all slots busy"
+
+        if action == "decrease":
+            new_limit = int(limit * self.decrease)
+        elif action == "plateau":
+            new_limit = limit - 1
+        elif action == "increase":
+            new_limit = limit + 1
+        else:
+            new_limit = limit
+        new_limit = max(minimum, min(maximum, new_limit))
+        if action == "increase" and new_limit == limit:
+            action, reason = "hold", "at the maximum"
+        elif action == "increase":
+            self._speed_before_increase = speed
+
+        # Metadata extraction is throttled separately from media downloads
+        metadata_max = config.metadata_workers
+        if window["metadata_rate_limited"] or window["rate_limited"]:
+            new_metadata = int(metadata_limit * self.decrease)
+        elif queue.has_waiting_metadata() and action != "decrease":
+            new_metadata = metadata_limit + 1
+        else:
+            new_metadata = metadata_limit
+        new_metadata = max(1, min(metadata_max, new_metadata))
+
+        self._last_action = action
+        self._last = {
+            "time": time.time(),
+            "action": action,
+            "reason": reason,
+            "download_limit": new_limit,
+            "metadata_limit": new_metadata,
+            "throughput": speed,
+            "error_rate": error_rate,
+            "rate_limited": window["rate_limited"] + window["metadata_rate_limited"],
+            "cpu_load": cpu,
+        }
+        if new_limit != limit or new_metadata != metadata_limit:
+            self.decisions.append(self._last)
+            await queue.apply_limits(new_limit, new_metadata, self._last)
+
+    def metrics(self):
+        """
+        Describe the controller's state.
+
+        Returns:
+            dict: Latest inputs and decision, plus the recent limit changes
+        """
+        return {"last": dict(self._last), "changes": list(self.decisions)}
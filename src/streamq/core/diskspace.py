@@ -0,0 +1,189 @@
+"""Disk-space reservations for admission control."""
+
+import os
+import shutil
+import threading
+import time
+
+from ..config import config
+from .progress import format_bytes
+
+
+def describe_wait(wait):
+    """
+    Build a one-line message for jobs held back by admission control.
+
+    Returns:
+        str: e.g. ``Waiting for disk space: 2 jobs, the smallest needs 1.5 GiB (900.0 MiB free)``
+    """
+    jobs = "1 job needs" if wait["waiting"] == 1 else f"{wait['waiting']} jobs, the smallest needs"
+    return f"Waiting for disk space: {jobs} {format_bytes(wait['needed'])} ({format_bytes(wait['free'])} free)"
+
+
+class _Reservation:
+    """Space held for one job on one volume."""
+
+    __slots__ = ("volume", "size", "written", "measured")
+
+    def __init__(self, volume, size):
+        self.volume = volume
+        self.size = size  # expected final bytes including headroom
+        self.written = 0  # bytes downloaded so far
+        self.measured = 0  # bytes already reflected in the cached free-space reading
+
+    @property
+    def outstanding(self):
+        """Bytes still to come out of the cached free-space reading."""
+        return max(0, self.size - self.measured)
+
+
+class DiskReservations:
+    """
+    Tracks free space per volume and the space promised to running jobs.
+
+    Before a job starts, the scheduler reserves its estimated size plus
+    ``disk_headroom_percent`` for merge and transcode temp files. A job is
+    admitted only if the volume's free space, minus what running jobs still
+    need and ``disk_min_free``, covers the reservation. Free space comes from
+    a cached ``disk_usage`` call refreshed at most every ``refresh_interval``
+    seconds; bytes a job wrote before a refresh stop counting against its
+    reservation, since the new reading already includes them. The
+    reservation follows the real size once the download reports it.
+    """
+
+    def __init__(self, refresh_interval=5.0):
+        """
+        Initialize the tracker.
+
+        Args:
+            refresh_interval (float): Seconds a free-space reading is reused
+        """
+        self.refresh_interval = refresh_interval
+        self._free = {}  # volume -> (timestamp, free bytes)
+        self._reservations = {}  # job key -> _Reservation
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _volume(path):
+        """Identify the volume of a path (its nearest existing ancestor)."""
+        path = os.path.abspath(path)
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return os.stat(path).st_dev, path
+
+    def free_bytes(self, path, refresh=False):
+        """
+        Free bytes on the volume holding ``path``, from the cache when fresh.
+
+        Returns:
+            int: Free bytes
+        """
+        volume, existing = self._volume(path)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._free.get(volume)
+            if cached and not refresh and now - cached[0] < self.refresh_interval:
+                return cached[1]
+        free = shutil.disk_usage(existing).free
+        with self._lock:
+            self._free[volume] = (now, free)
+            # Bytes written so far are now part of the measurement
+            for reservation in self._reservations.values():
+                if reservation.volume == volume:
+                    reservation.measured = reservation.written
+        return free
+
+    @staticmethod
+    def required(estimate):
+        """Bytes to reserve for a job of ``estimate`` bytes (or the default estimate)."""
+        estimate = estimate or config.disk_default_estimate
+        return int(estimate * (100 + config.disk_headroom_percent) / 100)
+
+    def available(self, path, refresh=False):
+        """
+        Bytes a new job may still reserve on the volume holding ``path``.
+
+        Args:
+            path (str): Directory on the volume
+            refresh (bool): Read free space now instead of from the cache
+
+        Returns:
+            int: Free space minus outstanding reservations and ``disk_min_free``
+        """
+        free = self.free_bytes(path, refresh)
+        volume, _ = self._volume(path)
+        with self._lock:
+            return free - self._promised(volume) - config.disk_min_free
+
+    def _promised(self, volume):
+        """Outstanding reserved bytes on a volume (lock held)."""
+        return sum(
+            reservation.outstanding
+            for reservation in self._reservations.values()
+            if reservation.volume == volume
+        )
+
+    def try_reserve(self, key, path, estimate, force=False):
+        """
+        Reserve space for a job if it fits.
+
+        Args:
+            key: Job identifier
+            path (str): Directory the job writes to
+            estimate (int): Expected download size in bytes, or None
+            force (bool): Reserve even if it does not fit, for a job started
+                on its own whose real size is not known yet
+
+        Returns:
+            bool: True if the job was admitted
+        """
+        needed = self.required(estimate)
+        free = self.free_bytes(path)
+        volume, _ = self._volume(path)
+        with self._lock:
+            if key in self._reservations:
+                return True
+            if not force and free - self._promised(volume) - config.disk_min_free < needed:
+                return False
+            self._reservations[key] = _Reservation(volume, needed)
+        return True
+
+    def adjust(self, key, size, written):
+        """
+        Update a reservation from download progress.
+
+        Args:
+            key: Job identifier
+            size (int): Actual or announced size of the download, if known
+            written (int): Bytes downloaded so far
+        """
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None:
+                return
+            if size:
+                reservation.size = self.required(size)
+            reservation.written = written
+
+    def release(self, key):
+        """Drop a job's reservation."""
+        with self._lock:
+            self._reservations.pop(key, None)
+
+    def summary(self):
+        """
+        Describe current reservations.
+
+        Returns:
+            dict: jobs holding space and total outstanding bytes
+        """
+        with self._lock:
+            return {
+                "jobs": len(self._reservations),
+                "reserved": sum(
+                    max(0, reservation.size - reservation.written) for reservation in self._reservations.values()
+                ),
+            }
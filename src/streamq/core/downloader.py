@@ -1,9 +1,70 @@
 """Download functionality for StreamQ using yt-dlp."""
 
+import asyncio
+import copy
 import os
+import shutil
 import threading
+import time
+from collections import OrderedDict, deque
+
 import yt_dlp
-from ..config import config
+from ..config import KNOBS, config
+from ..utils.profiling import profiled
+from .backends import DirectHTTPBackend
+from .concurrency import AdaptiveController, AdjustableSemaphore
+from .diskspace import DiskReservations
+from .engine import AsyncEngine
+from .metadata import MediaInfo, memory_per_thousand
+from .progress import ProgressAggregator, format_bytes
+from .store import OBJECTS_DIR_NAME, ContentStore
+from .streaming import StreamingFailed, StreamingTranscoder, can_stream, find_ffmpeg
+from .titles import TitleFetcher
+from .variants import ffmpeg_arguments, format_selector, output_name, run_ffmpeg
+from .ydl_pool import YoutubeDLPool
+
+
+# Ready entries examined for one that fits on disk when the head does not
+ADMISSION_WINDOW = 16
+
+# Resolved media URLs closer than this to expiry (seconds) are resolved again
+LOOKAHEAD_EXPIRY_MARGIN = 300
+
+# Slot-to-transfer gaps kept for the start gap metric
+START_GAP_SAMPLES = 200
+
+
+class DownloadInterrupted(yt_dlp.utils.DownloadCancelled):
+    """Raised from inside yt-dlp hooks when a download is paused or cancelled."""
+    
+    def __init__(self, status):
+        super().__init__(f"Download {status.lower()}")
+        self.status = status
+
+
+class JobControl:
+    """Thread-safe interrupt flag checked by a running download's hooks."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requested = None
+    
+    def interrupt(self, status):
+        """
+        Request that the download stops at its next progress tick.
+        
+        Args:
+            status (str): Status to report once stopped ('Paused' or 'Cancelled')
+        """
+        with self._lock:
+            # Cancelling wins over a pending pause request
+            if self.requested != "Cancelled":
+                self.requested = status
+    
+    def check(self):
+        """Raise DownloadInterrupted if an interrupt was requested."""
+        if self.requested:
+            raise DownloadInterrupted(self.requested)
 
 
 class DownloadManager:
@@ -19,6 +80,31 @@ class DownloadManager:
         self.ffmpeg_dir = ffmpeg_dir
         self.progress_callback = None
         self.status_callback = None
+        self.progress = ProgressAggregator()
+        self.disk = DiskReservations()
+        self.ydl_pool = YoutubeDLPool()
+        self.titles = TitleFetcher(self.ydl_pool)
+        # Created up front: outputs from several download threads reach it at once
+        self.content_store = ContentStore(os.path.join(config.download_dir, OBJECTS_DIR_NAME))
+        # Downloads running at once; DownloadQueue keeps it in sync with its slot limit
+        self.transfer_slots = 1
+        # Asked in order before yt-dlp; see register_backend()
+        self.backends = [DirectHTTPBackend(ffmpeg_dir)]
+        self._metadata_cache = OrderedDict()  # url -> MediaInfo
+        self._metadata_cache_lock = threading.Lock()
+    
+    def register_backend(self, backend, first=True):
+        """
+        Add a download backend.
+        
+        Args:
+            backend (DownloadBackend): Backend to route accepted URLs to
+            first (bool): Ask it before the existing backends
+        """
+        if first:
+            self.backends.insert(0, backend)
+        else:
+            self.backends.append(backend)
     
     def set_progress_callback(self, callback):
         """Set the progress update callback function."""
@@ -38,6 +124,69 @@ class DownloadManager:
         Returns:
             str: Video title or error message
         """
+        metadata = self.fetch_title(url)
+        return metadata.title if metadata else "Title unavailable"
+    
+    @profiled("job")
+    def fetch_title(self, url, raise_errors=False):
+        """
+        Fetch a record for display, as cheaply as possible.
+        
+        With ``fast_titles`` on, only the title is looked up (see
+        :class:`TitleFetcher`); formats are resolved by the download itself.
+        A cached record from an earlier full extraction is reused as is.
+        
+        Args:
+            url (str): Video URL
+            raise_errors (bool): Raise lookup errors instead of returning None
+            
+        Returns:
+            MediaInfo or None: The record, or None if the lookup failed
+        """
+        if not config.fast_titles:
+            # Already profiled as this call
+            return self._fetch_metadata(url, raise_errors)
+        with self._metadata_cache_lock:
+            if url in self._metadata_cache:
+                self._metadata_cache.move_to_end(url)
+                return self._metadata_cache[url]
+        
+        try:
+            metadata = self.titles.fetch(url)
+        except Exception:
+            if raise_errors:
+                raise
+            return None
+        
+        self._remember_metadata(url, metadata)
+        return metadata
+    
+    @profiled("job")
+    def fetch_metadata(self, url, raise_errors=False):
+        """
+        Fetch a compact metadata record for a video without downloading.
+        
+        The info dict is reduced to a :class:`MediaInfo` right away, so only
+        the record stays in memory.
+        
+        Args:
+            url (str): YouTube video URL
+            raise_errors (bool): Raise extraction errors instead of returning None
+            
+        Returns:
+            MediaInfo or None: The record, or None if extraction failed
+        """
+        return self._fetch_metadata(url, raise_errors)
+    
+    def _fetch_metadata(self, url, raise_errors):
+        """Run :meth:`fetch_metadata` without the profiling wrapper."""
+        with self._metadata_cache_lock:
+            cached = self._metadata_cache.get(url)
+            # A title-only record does not answer a full lookup
+            if cached is not None and cached.resolved:
+                self._metadata_cache.move_to_end(url)
+                return cached
+        
         options = {
             "quiet": True,
             "skip_download": True,
@@ -45,14 +194,73 @@ class DownloadManager:
         }
         
         try:
-            with yt_dlp.YoutubeDL(options) as ydl:
-                info = ydl.extract_info(url, download=False)
-            title = info.get("title") or "Unknown title"
-            return title.replace("\n", " ").strip() or "Unknown title"
+            with self.ydl_pool.checkout(options) as ydl:
+                metadata = MediaInfo.from_info(ydl.extract_info(url, download=False))
         except Exception:
-            return "Title unavailable"
+            if raise_errors:
+                raise
+            return None
+        
+        self._remember_metadata(url, metadata)
+        return metadata
+    
+    def _remember_metadata(self, url, metadata):
+        """Store a fetched record, evicting the least recently used beyond the cache size."""
+        with self._metadata_cache_lock:
+            cached = self._metadata_cache.get(url)
+            if cached is None or metadata.resolved or not cached.resolved:
+                self._metadata_cache[url] = metadata
+            self._metadata_cache.move_to_end(url)
+            # The size is hot-reloadable, so trim to whatever it is now
+            while len(self._metadata_cache) > config.title_cache_size:
+                self._metadata_cache.popitem(last=False)
+
+    
+    def needs_resolution(self, url, format_type):
+        """Whether a download goes through yt-dlp extraction (no backend accepts it)."""
+        return not any(backend.accepts(url, format_type) for backend in self.backends)
+    
+    @profiled("job")
+    def resolve(self, url, format_type, quality):
+        """
+        Extract a video and select its formats ahead of the download.
+        
+        The info dict can be passed to :meth:`download_video` as ``info`` so
+        the download starts transferring right away.
+        
+        Args:
+            url (str): Video URL
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting
+            
+        Returns:
+            tuple: (info dict, MediaInfo record of the selected formats)
+        """
+        options = {
+            "quiet": True,
+            "skip_download": True,
+            "no_warnings": True,
+            "format": format_selector(format_type, quality),
+        }
+        with self.ydl_pool.checkout(options) as ydl:
+            info = ydl.extract_info(url, download=False)
+        metadata = MediaInfo.from_info(info)
+        self._remember_metadata(url, metadata)
+        return info, metadata
     
-    def download_video(self, url, format_type, quality, index=1, total=1):
+    @profiled("job")
+    def download_video(
+        self,
+        url,
+        format_type,
+        quality,
+        index=1,
+        total=1,
+        archive_path=None,
+        control=None,
+        job_key=None,
+        info=None,
+    ):
         """
         Download a single video/audio from YouTube.
         
@@ -62,13 +270,22 @@ class DownloadManager:
             quality (str): Quality setting
             index (int): Current download index
             total (int): Total downloads in queue
+            archive_path (str): Optional yt-dlp download archive; videos already
+                recorded there are skipped, which makes re-runs idempotent
+            control (JobControl): Optional interrupt flag; partial ``.part``
+                files are kept so a later run resumes where this one stopped
+            job_key: Key for this job in the progress aggregator (default: url)
+            info (dict): Info dict from :meth:`resolve`; skips extraction
+                
+        Raises:
+            DownloadInterrupted: If ``control`` requested a pause or cancel
         """
         download_dir = config.get_download_dir(format_type)
         os.makedirs(download_dir, exist_ok=True)
         
         if format_type == "audio":
             ydl_opts = {
-                "format": f"bestaudio[abr<={quality}]/best",
+                "format": format_selector(format_type, quality),
                 "postprocessors": [
                     {
                         "key": "FFmpegExtractAudio",
@@ -76,78 +293,270 @@ class DownloadManager:
                         "preferredquality": quality,
                     }
                 ],
-                "outtmpl": os.path.join(download_dir, "%(title)s.%(ext)s"),
+                "outtmpl": os.path.join(download_dir, self._output_template()),
                 "ffmpeg_location": self.ffmpeg_dir,
             }
         else:
             ydl_opts = {
-                "format": f"bestvideo[height<={quality}]+bestaudio/best[height<={quality}]",
-                "outtmpl": os.path.join(download_dir, "%(title)s.%(ext)s"),
+                "format": format_selector(format_type, quality),
+                "outtmpl": os.path.join(download_dir, self._output_template()),
                 "ffmpeg_location": self.ffmpeg_dir,
                 "merge_output_format": "mp4",
             }
         
         def progress_hook(data):
-            self._handle_progress(data, url, index, total)
+            if control:
+                control.check()
+            self._handle_progress(data, url, index, total, job_key)
+        
+        def postprocessor_hook(data):
+            if control:
+                control.check()
         
-        ydl_opts["progress_hooks"] = [progress_hook]
+        self._apply_transfer_options(ydl_opts)
+        if config.content_store:
+            # Called with the final path once merging and extraction are done
+            ydl_opts["post_hooks"] = [self._store_output]
+        if archive_path:
+            ydl_opts["download_archive"] = archive_path
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        if control:
+            control.check()
+        for backend in self.backends:
+            if backend.accepts(url, format_type):
+                path = backend.download(
+                    url, format_type, quality, download_dir, progress_hook, control, self.job_rate_limit()
+                )
+                if path:
+                    self._store_output(path)
+                    return
+        if format_type == "audio" and config.stream_transcode:
+            streamed, info = self._stream_audio(url, ydl_opts, quality, progress_hook, info)
+            if streamed:
+                return
+        with self.ydl_pool.checkout(ydl_opts, progress_hook, postprocessor_hook) as ydl:
+            if info is not None:
+                # Formats are selected again from the resolved list, without network access
+                ydl.process_ie_result(info, download=True)
+            else:
+                ydl.download([url])
     
-    def _handle_progress(self, data, url, index, total):
-        """Handle progress updates from yt-dlp."""
-        if not self.progress_callback:
+    @staticmethod
+    def _output_template():
+        """Output file name template; the content store adds the video ID so equal titles never collide."""
+        if config.content_store:
+            return "%(title)s [%(id)s].%(ext)s"
+        return "%(title)s.%(ext)s"
+    
+    def _store_output(self, path):
+        """Hand a finished output to the content store, if it is enabled."""
+        if not config.content_store:
             return
+        self.content_store.ingest(path)
+    
+    def job_rate_limit(self):
+        """
+        This download's share of the queue-wide ``rate_limit``.
+        
+        Returns:
+            int: Bytes/s, or 0 when bandwidth is not capped
+        """
+        if not config.rate_limit:
+            return 0
+        # Split across the slots the queue actually runs, not the configured default
+        return max(1, config.rate_limit // max(1, self.transfer_slots))
+    
+    def _apply_transfer_options(self, ydl_opts):
+        """Set resume, fragment and bandwidth options shared by every download."""
+        ydl_opts["continuedl"] = True
+        ydl_opts["concurrent_fragment_downloads"] = config.concurrent_fragments
+        rate_limit = self.job_rate_limit()
+        if rate_limit:
+            ydl_opts["ratelimit"] = rate_limit
+    
+    @profiled("job")
+    def download_variants(self, url, variants, index=1, total=1, control=None, job_key=None):
+        """
+        Produce several outputs of one video from a single set of streams.
+        
+        The video is extracted once. Each variant's format selection runs
+        against that result, every distinct stream is downloaded once into
+        a work directory, and FFmpeg then encodes or remuxes each output
+        from the shared streams. The work directory is kept until every
+        output exists, so a paused job resumes its partial streams.
+        
+        Args:
+            url (str): YouTube video URL
+            variants (list): (format_type, quality) tuples
+            index (int): Current download index
+            total (int): Total downloads in queue
+            control (JobControl): Optional interrupt flag
+            job_key: Key for this job in the progress aggregator (default: url)
             
-        status = data.get("status")
-        if status == "downloading":
-            percent_value, percent_text = self._extract_percent(data)
-            speed_text = data.get("_speed_str") or ""
-            message_parts = [f"Downloading {index}/{total}", percent_text]
-            if speed_text:
-                message_parts.append(speed_text)
-            message = " | ".join(part for part in message_parts if part)
-            self.progress_callback(percent_value, message)
-        elif status == "finished":
-            message = f"Processing download {index}/{total}..."
-            self.progress_callback(100.0, message)
+        Raises:
+            DownloadInterrupted: If ``control`` requested a pause or cancel
+            RuntimeError: If FFmpeg is missing or fails
+        """
+        ffmpeg_path = find_ffmpeg(self.ffmpeg_dir)
+        if not ffmpeg_path:
+            raise RuntimeError("FFmpeg is required for multiple output variants")
+        
+        def progress_hook(data):
+            if control:
+                control.check()
+            self._handle_progress(data, url, index, total, job_key)
+        
+        base_opts = {"quiet": True, "no_warnings": True, "ffmpeg_location": self.ffmpeg_dir}
+        if control:
+            control.check()
+        with self.ydl_pool.checkout(base_opts) as ydl:
+            raw_info = ydl.extract_info(url, download=False, process=False)
+        if raw_info.get("_type", "video") != "video":
+            raise RuntimeError("Multiple output variants need a single video, not a playlist")
+        
+        # Select formats per variant without extracting again
+        plans = []
+        streams = {}
+        for format_type, quality in variants:
+            select_opts = dict(base_opts, format=format_selector(format_type, quality))
+            with self.ydl_pool.checkout(select_opts) as ydl:
+                info = ydl.process_ie_result(copy.deepcopy(raw_info), download=False)
+            formats = info.get("requested_formats") or [info]
+            plans.append((format_type, quality, [fmt["format_id"] for fmt in formats]))
+            for fmt in formats:
+                streams.setdefault(fmt["format_id"], fmt)
+        
+        sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in streams.values()]
+        if all(sizes):
+            self.progress.add(job_key if job_key is not None else url, int(sum(sizes)))
+        
+        work_dir = os.path.join(
+            config.download_dir, ".streamq-work", yt_dlp.utils.sanitize_filename(str(raw_info.get("id") or "video"))
+        )
+        os.makedirs(work_dir, exist_ok=True)
+        stream_paths = {}
+        for format_id in streams:
+            stream_opts = dict(
+                base_opts,
+                format=format_id,
+                outtmpl=os.path.join(work_dir, f"f{format_id}.%(ext)s"),
+            )
+            self._apply_transfer_options(stream_opts)
+            with self.ydl_pool.checkout(stream_opts, progress_hook) as ydl:
+                info = ydl.process_ie_result(copy.deepcopy(raw_info), download=True)
+                downloads = info.get("requested_downloads") or [{}]
+                stream_paths[format_id] = downloads[0].get("filepath") or ydl.prepare_filename(info)
+        
+        title = yt_dlp.utils.sanitize_filename(raw_info.get("title") or "video")
+        if config.content_store:
+            title = f"{title} [{yt_dlp.utils.sanitize_filename(str(raw_info.get('id') or ''))}]"
+        for format_type, quality, format_ids in plans:
+            if control:
+                control.check()
+            download_dir = config.get_download_dir(format_type)
+            os.makedirs(download_dir, exist_ok=True)
+            output_path = os.path.join(download_dir, output_name(title, format_type, quality, variants))
+            inputs = [stream_paths[format_id] for format_id in format_ids]
+            run_ffmpeg(ffmpeg_path, ffmpeg_arguments(format_type, quality, inputs), output_path)
+            self._store_output(output_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
     
-    @staticmethod
-    def _extract_percent(data):
-        """Extract percentage from yt-dlp progress data."""
-        percent_text = data.get("_percent_str")
-        if percent_text:
-            percent_text = percent_text.strip()
-            if percent_text.endswith("%"):
-                try:
-                    return float(percent_text[:-1]), percent_text
-                except ValueError:
-                    pass
-        total_bytes = data.get("total_bytes") or data.get("total_bytes_estimate")
-        downloaded_bytes = data.get("downloaded_bytes")
-        if total_bytes and downloaded_bytes:
-            percent_value = (downloaded_bytes / total_bytes) * 100
-            percent_value = max(0.0, min(100.0, percent_value))
-            return percent_value, f"{percent_value:.1f}%"
-        return 0.0, "0%"
+    def _stream_audio(self, url, ydl_opts, quality, progress_hook, info=None):
+        """
+        Encode an audio download to MP3 while it transfers.
+        
+        Returns:
+            tuple: (done, info). ``done`` is False if the chosen format cannot
+                be streamed (fragmented or merged formats, no FFmpeg, a source
+                FFmpeg cannot read from a pipe); the caller falls back to a
+                regular download followed by extraction, reusing ``info`` so
+                the URL is not extracted twice
+        """
+        ffmpeg_path = find_ffmpeg(self.ffmpeg_dir)
+        if not ffmpeg_path:
+            return False, info
+        with self.ydl_pool.checkout(ydl_opts) as ydl:
+            if info is None:
+                info = ydl.extract_info(url, download=False)
+            if ydl_opts.get("download_archive") and ydl.in_download_archive(info):
+                return True, info
+            if not can_stream(info):
+                return False, info
+            output_path = os.path.splitext(ydl.prepare_filename(info))[0] + ".mp3"
+            try:
+                StreamingTranscoder(ffmpeg_path, ydl.urlopen, rate_limit=self.job_rate_limit()).transcode(
+                    info, output_path, quality, progress_hook
+                )
+            except StreamingFailed:
+                # Nothing reached the output path: take the streamed bytes back and download normally
+                progress_hook({"status": "downloading", "downloaded_bytes": 0, "filename": output_path, "info_dict": info})
+                return False, info
+            self._store_output(output_path)
+            if ydl_opts.get("download_archive"):
+                ydl.record_download_archive(info)
+        return True, info
+    
+    @profiled("tick")
+    def _handle_progress(self, data, url, index, total, job_key=None):
+        """Feed raw byte counters from yt-dlp into the queue-wide aggregator."""
+        key = url if job_key is None else job_key
+        self.progress.update(key, data)
+        # The disk reservation follows the size once it is known
+        self.disk.adjust(key, *self.progress.job_bytes(key))
+        if not self.progress_callback:
+            return
+        
+        snapshot = self.progress.snapshot()
+        self.progress_callback(snapshot["percent"], self.progress.describe(snapshot))
 
 
 class DownloadQueue:
     """Manages the download queue and processing."""
     
-    def __init__(self, download_manager):
+    def __init__(self, download_manager, engine=None, max_workers=None, metadata_workers=None):
         """
         Initialize the download queue.
         
         Args:
             download_manager (DownloadManager): The download manager instance
+            engine (AsyncEngine): Engine to schedule work on; created if omitted
+            max_workers (int): Downloads allowed to run at the same time;
+                follows the hot-reloadable ``download_workers`` setting if omitted
+            metadata_workers (int): Title fetches allowed to run at the same time
         """
+        self.follow_config = max_workers is None
+        max_workers = max_workers or config.download_workers
+        metadata_workers = metadata_workers or config.metadata_workers
         self.download_manager = download_manager
-        self.queue = []  # list of dicts: url, item_id, status, title
+        # Size the pool for the largest worker count a hot reload may select
+        self.engine = engine or AsyncEngine(
+            max(max_workers, KNOBS["download_workers"].maximum) + metadata_workers
+        )
+        self.queue = []  # list of dicts: url, item_id, status, title, metadata
         self.is_downloading = False
         self.status_callback = None
         self.completion_callback = None
+        self.max_workers = max_workers
+        self.metadata_workers = metadata_workers
+        download_manager.transfer_slots = max_workers
+        
+        # Loop-bound primitives must be created on the engine thread
+        self._events = None
+        self._metadata_slots = None
+        self._batch = None
+        self.controller = None
+        self._controller_task = None
+        self._lookahead_counts = {"used": 0, "waited": 0, "missed": 0, "expired": 0, "failed": 0}
+        self._start_gaps = deque(maxlen=START_GAP_SAMPLES)
+        self.engine.call_soon(self._setup)
+        config.add_listener(self._on_config_changed)
+    
+    def _setup(self):
+        """Create loop-bound primitives and start the event dispatcher."""
+        self._events = asyncio.Queue()
+        self._metadata_slots = AdjustableSemaphore(self.metadata_workers)
+        self.engine.loop.create_task(self._dispatch_events())
+        self._set_adaptive(config.adaptive_concurrency)
     
     def set_status_callback(self, callback):
         """Set the status update callback function."""
@@ -157,13 +566,107 @@ class DownloadQueue:
         """Set the completion callback function."""
         self.completion_callback = callback
     
-    def add_to_queue(self, url, item_id):
+    def _on_config_changed(self, changes):
+        """Apply a hot-reloaded worker count (called from the config watcher)."""
+        if "adaptive_concurrency" in changes:
+            self.engine.call_soon(self._set_adaptive, changes["adaptive_concurrency"])
+        if self.follow_config and "download_workers" in changes:
+            self.engine.call_soon(self._set_fixed_workers, changes["download_workers"])
+    
+    def _set_fixed_workers(self, max_workers):
+        """Apply a configured worker count unless the adaptive controller owns it (engine thread only)."""
+        if self.controller is None:
+            self._set_max_workers(max_workers)
+    
+    def _set_adaptive(self, enabled):
+        """Start or stop the adaptive concurrency controller (engine thread only)."""
+        if enabled and self.controller is None:
+            self.controller = AdaptiveController(self)
+            self._controller_task = self.engine.loop.create_task(self.controller.run())
+        elif not enabled and self.controller is not None:
+            self._controller_task.cancel()
+            self.controller = None
+            self._controller_task = None
+            # Back to the configured limits
+            if self.follow_config:
+                self.metadata_workers = config.metadata_workers
+                self._set_max_workers(config.download_workers)
+            self.engine.loop.create_task(self._metadata_slots.set_limit(self.metadata_workers))
+    
+    async def apply_limits(self, download_limit, metadata_limit, decision):
+        """
+        Apply limits chosen by the adaptive controller and announce them (engine thread only).
+        
+        Args:
+            download_limit (int): Downloads allowed at the same time
+            metadata_limit (int): Metadata fetches allowed at the same time
+            decision (dict): The controller's inputs and reasoning
+        """
+        self._set_max_workers(download_limit)
+        await self._metadata_slots.set_limit(metadata_limit)
+        self._emit("concurrency_changed", decision)
+    
+    def metadata_slots_limit(self):
+        """Current metadata concurrency limit."""
+        return self._metadata_slots.limit
+    
+    def has_waiting_downloads(self):
+        """Whether every download slot is busy and entries are waiting (engine thread only)."""
+        batch = self._batch
+        return bool(batch and batch["ready"] and len(batch["active"]) >= self.max_workers)
+    
+    def has_waiting_metadata(self):
+        """Whether title fetches are waiting for a metadata slot."""
+        return self._metadata_slots.waiting > 0
+    
+    def _set_max_workers(self, max_workers):
+        """Resize the download slots and let a running batch use them (engine thread only)."""
+        self.max_workers = max_workers
+        self.download_manager.transfer_slots = max_workers
+        if self._batch is not None:
+            self._batch["wakeup"].set()
+    
+    def _emit(self, update_type, *args):
+        """Queue an event for the dispatcher (engine thread only)."""
+        self._events.put_nowait((update_type, args))
+    
+    async def _dispatch_events(self):
+        """Deliver queued events to the registered callbacks in order."""
+        while True:
+            update_type, args = await self._events.get()
+            try:
+                if update_type == "completed":
+                    if self.completion_callback:
+                        self.completion_callback(*args)
+                elif self.status_callback:
+                    self.status_callback(update_type, *args)
+            except Exception:
+                # A failing observer must not stop event delivery
+                pass
+    
+    def _set_status(self, entry, status):
+        """Update an entry's status and announce it (engine thread only)."""
+        entry["status"] = status
+        progress = self.download_manager.progress
+        if status == "Completed":
+            progress.complete(id(entry))
+        elif status == "Paused":
+            progress.stop(id(entry))
+        elif status in ("Failed", "Cancelled"):
+            progress.remove(id(entry))
+        self._emit("status_changed", entry)
+    
+    def add_to_queue(self, url, item_id, fetch_title=True, variants=None):
         """
         Add a URL to the download queue.
         
         Args:
             url (str): YouTube video URL
             item_id: Treeview item ID
+            fetch_title (bool): Whether to fetch the title in the background
+            variants (list): Optional (format_type, quality) outputs for this
+                entry, e.g. ``[("audio", "192"), ("video", "720")]``; shared
+                streams are downloaded once
             
         Returns:
             dict: The created queue entry
@@ -173,90 +676,594 @@ class DownloadQueue:
             "item_id": item_id,
             "status": "Pending",
             "title": None,
+            "metadata": None,
+            "variants": list(variants) if variants else None,
         }
         self.queue.append(entry)
         
         # Fetch title in background
-        threading.Thread(
-            target=self._fetch_title_for_entry,
-            args=(entry,),
-            daemon=True,
-        ).start()
+        if fetch_title:
+            self.engine.submit(self._fetch_title_for_entry(entry))
         
         return entry
     
-    def _fetch_title_for_entry(self, entry):
-        """Fetch title for a queue entry in background."""
-        title = self.download_manager.fetch_video_title(entry["url"])
-        entry["title"] = title
+    async def _fetch_title_for_entry(self, entry):
+        """Fetch the display record and title for a queue entry in background."""
+        error = None
+        async with self._metadata_slots:
+            try:
+                metadata = await self.engine.run_blocking(
+                    self.download_manager.fetch_title, entry["url"], raise_errors=True
+                )
+            except Exception as exc:
+                metadata = None
+                error = exc
+        if self.controller:
+            self.controller.record("metadata", error)
+        entry["metadata"] = metadata
+        entry["title"] = metadata.title if metadata else "Title unavailable"
         
         # Notify that title is available
-        if self.status_callback:
-            self.status_callback("title_updated", entry)
+        self._emit("title_updated", entry)
     
     def process_queue(self, format_type, quality):
         """
         Process all pending items in the queue.
         
+        Pending items are added to the running batch if there is one.
+        Entries that requested their own variants keep them.
+        
         Args:
             format_type (str): 'audio' or 'video'
             quality (str): Quality setting
         """
-        if self.is_downloading:
-            return
-        
-        pending_entries = [entry for entry in self.queue if entry["status"] == "Pending"]
+        pending_entries = [
+            entry for entry in self.queue
+            if entry["status"] == "Pending" and not entry.get("scheduled")
+        ]
         if not pending_entries:
             return
         
+        for entry in pending_entries:
+            if entry.get("variants"):
+                entry["format_type"], entry["quality"] = entry["variants"][0]
+            else:
+                entry["format_type"] = format_type
+                entry["quality"] = quality
         self.is_downloading = True
+        self.engine.call_soon(self._schedule, pending_entries, format_type)
+    
+    def _schedule(self, entries, format_type):
+        """Add entries to the running batch, starting one if needed (engine thread only)."""
+        if self._batch is None:
+            self.download_manager.progress.reset()
+            self._batch = {
+                "format_type": format_type,
+                "ready": deque(),
+                "active": set(),
+                "wakeup": asyncio.Event(),
+                "total": 0,
+                "errors": [],
+                "completed": [],
+            }
+            self.engine.loop.create_task(self._process_downloads(self._batch))
+        batch = self._batch
+        for entry in entries:
+            if entry.get("scheduled"):
+                continue
+            entry["scheduled"] = True
+            self.download_manager.progress.add(id(entry))
+            batch["ready"].append(entry)
+            batch["total"] += 1
+        batch["wakeup"].set()
+    
+    async def _process_downloads(self, batch):
+        """Start ready entries whenever one of the ``max_workers`` slots is free."""
+        ready = batch["ready"]
+        active = batch["active"]
+        wakeup = batch["wakeup"]
+        disk = self.download_manager.disk
+        index = 0
+        
+        while ready or active:
+            blocked = False
+            while ready and len(active) < self.max_workers:
+                entry = self._admit(ready)
+                if entry is None and not active:
+                    entry = self._admit_idle(batch, ready)
+                if entry is None:
+                    # Empty when the entries left were paused, cancelled or failed
+                    blocked = bool(ready)
+                    break
+                index += 1
+                entry["dispatched"] = time.monotonic()
+                task = self.engine.loop.create_task(self._run_batch_entry(batch, entry, index))
+                active.add(task)
+                task.add_done_callback(lambda done: (active.discard(done), wakeup.set()))
+            self._report_disk_wait(batch, ready if blocked else None)
+            if not ready and not active:
+                break
+            self._look_ahead(ready)
+            if blocked:
+                # Free space can also grow outside StreamQ; look again once the reading is stale
+                try:
+                    await asyncio.wait_for(wakeup.wait(), disk.refresh_interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await wakeup.wait()
+            wakeup.clear()
+        
+        self._batch = None
+        self.is_downloading = False
+        
+        # Notify completion after every queued status change
+        self._emit("completed", batch["format_type"], batch["errors"], batch["completed"])
+    
+    def _admit(self, ready):
+        """
+        Take the next ready entry whose disk reservation fits (engine thread only).
         
-        worker = threading.Thread(
-            target=self._process_downloads,
-            args=(pending_entries, format_type, quality),
-            daemon=True,
+        Entries paused or cancelled while waiting are dropped. A large entry
+        that does not fit yet lets smaller ones within the admission window
+        start ahead of it.
+        
+        Returns:
+            dict or None: Entry to start, or None if none of the window fits
+        """
+        disk = self.download_manager.disk
+        position = 0
+        while position < len(ready) and position < ADMISSION_WINDOW:
+            entry = ready[position]
+            if entry["status"] != "Pending":
+                del ready[position]
+                entry["scheduled"] = False
+                continue
+            if not config.disk_admission or disk.try_reserve(
+                id(entry), config.get_download_dir(entry["format_type"]), self._size_estimate(entry)
+            ):
+                del ready[position]
+                entry["scheduled"] = False
+                return entry
+            position += 1
+        return None
+    
+    def _admit_idle(self, batch, ready):
+        """
+        Pick an entry to start when no download is running (engine thread only).
+        
+        No reservation will be released, so waiting could never end. Free
+        space is read again first, in case it grew outside StreamQ. An entry
+        whose size is unknown waits for its lookahead resolution, if one is
+        coming, and otherwise starts on its own; its reservation follows the
+        real size once the download reports it. An entry whose known size
+        does not fit even on the idle volume fails.
+        
+        Returns:
+            dict or None: Entry to start, or None if none is left
+        """
+        disk = self.download_manager.disk
+        position = 0
+        while position < len(ready) and position < ADMISSION_WINDOW:
+            entry = ready[position]
+            if entry["status"] != "Pending":
+                position += 1
+                continue
+            size = self._size_estimate(entry)
+            if size is None and self._resolving(entry):
+                # The resolution tells the real size and wakes the scheduler
+                position += 1
+                continue
+            download_dir = config.get_download_dir(entry["format_type"])
+            needed = disk.required(size)
+            free = disk.available(download_dir, refresh=True)
+            if size is None or free >= needed:
+                disk.try_reserve(id(entry), download_dir, size, force=True)
+                del ready[position]
+                entry["scheduled"] = False
+                return entry
+            del ready[position]
+            entry["scheduled"] = False
+            self._drop_resolution(entry)
+            self._set_status(entry, "Failed")
+            batch["errors"].append((
+                entry["url"],
+                f"Not enough disk space: needs {format_bytes(needed)}, {format_bytes(max(0, free))} can be used",
+            ))
+        return None
+    
+    def _resolving(self, entry):
+        """Whether a lookahead resolution for an entry is running or about to start (engine thread only)."""
+        task = entry.get("resolution")
+        if task is not None:
+            return not task.done()
+        return (
+            bool(config.lookahead)
+            and len(entry.get("variants") or ()) <= 1
+            and self.download_manager.needs_resolution(entry["url"], entry["format_type"])
         )
-        worker.start()
     
-    def _process_downloads(self, entries, format_type, quality):
-        """Process downloads in background thread."""
-        total = len(entries)
-        errors = []
-        completed = []
+    @staticmethod
+    def _size_estimate(entry):
+        """Expected download size of an entry from its metadata, if known."""
+        metadata = entry.get("metadata")
+        return metadata.size if metadata else None
+    
+    def _look_ahead(self, ready):
+        """
+        Resolve formats for the next ``lookahead`` ready entries while slots are busy (engine thread only).
         
-        for index, entry in enumerate(entries, start=1):
-            url = entry["url"]
-            
-            # Update status to downloading
-            entry["status"] = "Downloading"
-            if self.status_callback:
-                self.status_callback("status_changed", entry)
-            
+        Finished resolutions that are about to expire are started again.
+        Multi-variant entries and URLs handled by a backend need none.
+        """
+        depth = config.lookahead
+        if not depth:
+            return
+        manager = self.download_manager
+        for entry in ready:
+            if depth <= 0:
+                break
+            if entry["status"] != "Pending" or len(entry.get("variants") or ()) > 1:
+                continue
+            if not manager.needs_resolution(entry["url"], entry["format_type"]):
+                continue
+            depth -= 1
+            task = entry.get("resolution")
+            if task is not None and task.done() and self._resolution_expired(task):
+                self._lookahead_counts["expired"] += 1
+                task = None
+            if task is None:
+                entry["resolution"] = self.engine.loop.create_task(self._resolve_ahead(entry))
+    
+    @staticmethod
+    def _resolution_expired(task):
+        """Whether a finished resolution's media URLs expire soon (failures are not retried)."""
+        if task.cancelled() or task.result() is None:
+            return False
+        return task.result()[1].is_expired(LOOKAHEAD_EXPIRY_MARGIN)
+    
+    async def _resolve_ahead(self, entry):
+        """
+        Resolve an entry's formats in a metadata slot.
+        
+        Returns:
+            tuple or None: (info dict, MediaInfo), or None if resolution failed
+        """
+        error = None
+        result = None
+        async with self._metadata_slots:
+            if entry["status"] != "Pending":
+                return None
             try:
-                self.download_manager.download_video(url, format_type, quality, index, total)
-                completed.append(url)
-                entry["status"] = "Completed"
-            except Exception as error:
-                errors.append((url, str(error)))
-                entry["status"] = "Failed"
+                result = await self.engine.run_blocking(
+                    self.download_manager.resolve, entry["url"], entry["format_type"], entry["quality"]
+                )
+            except Exception as exc:
+                error = exc
+                self._lookahead_counts["failed"] += 1
+        if self.controller:
+            self.controller.record("metadata", error)
+        if result is not None:
+            # The resolved record carries the size, which disk admission uses
+            entry["metadata"] = result[1]
+        if self._batch is not None:
+            # An entry waiting for disk space may fit with its real size, or
+            # start without one now that no resolution is coming
+            self._batch["wakeup"].set()
+        if result is None:
+            return None
+        if result[1].is_expired(LOOKAHEAD_EXPIRY_MARGIN):
+            # Too short-lived to keep; the download extracts again
+            self._lookahead_counts["expired"] += 1
+            return None
+        if entry["title"] in (None, "Title unavailable"):
+            entry["title"] = result[1].title
+            self._emit("title_updated", entry)
+        return result
+    
+    async def _take_resolution(self, entry, scheduled=True):
+        """
+        Claim an entry's lookahead resolution, waiting for it if it is still running.
+        
+        Args:
+            entry (dict): Queue entry
+            scheduled (bool): Whether a batch dispatched the entry; only those
+                could have been resolved ahead, so only they count as misses
+        
+        Returns:
+            dict or None: Info dict to download from, or None to extract as usual
+        """
+        task = entry.pop("resolution", None)
+        if task is None:
+            single = len(entry.get("variants") or ()) <= 1
+            if (
+                scheduled
+                and config.lookahead
+                and single
+                and self.download_manager.needs_resolution(entry["url"], entry["format_type"])
+            ):
+                self._lookahead_counts["missed"] += 1
+            return None
+        if not task.done():
+            self._lookahead_counts["waited"] += 1
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            return None
+        if result is None:
+            return None
+        if result[1].is_expired(LOOKAHEAD_EXPIRY_MARGIN):
+            self._lookahead_counts["expired"] += 1
+            return None
+        self._lookahead_counts["used"] += 1
+        return result[0]
+    
+    def _drop_resolution(self, entry):
+        """Discard an entry's lookahead resolution (engine thread only)."""
+        task = entry.pop("resolution", None)
+        if task is not None:
+            task.cancel()
+    
+    def _record_start_gap(self, entry, dispatched):
+        """Record how long a dispatched entry took to start transferring."""
+        started = self.download_manager.progress.job_started(id(entry))
+        if dispatched is not None and started is not None and started >= dispatched:
+            self._start_gaps.append(started - dispatched)
+    
+    def _report_disk_wait(self, batch, ready):
+        """Announce when entries start or stop waiting for disk space (engine thread only)."""
+        if ready is None:
+            if batch.get("disk_wait"):
+                batch["disk_wait"] = None
+                self._emit("disk_wait", None)
+            return
+        disk = self.download_manager.disk
+        waiting = [entry for entry in ready if entry["status"] == "Pending"]
+        needed = min(disk.required(self._size_estimate(entry)) for entry in waiting) if waiting else 0
+        free = disk.available(config.get_download_dir(batch["format_type"]))
+        wait = {"waiting": len(waiting), "needed": needed, "free": max(0, free)}
+        if wait != batch.get("disk_wait"):
+            batch["disk_wait"] = wait
+            self._emit("disk_wait", wait)
+    
+    async def _run_batch_entry(self, batch, entry, index):
+        """Run one batch entry and record its outcome."""
+        try:
+            error = await self.run_entry_async(
+                entry, entry["format_type"], entry["quality"], index, batch["total"]
+            )
+        finally:
+            self.download_manager.disk.release(id(entry))
+        if entry["status"] == "Completed":
+            batch["completed"].append(entry["url"])
+        elif entry["status"] == "Failed":
+            batch["errors"].append((entry["url"], error))
+    
+    async def run_entry_async(self, entry, format_type, quality, index=1, total=1, archive_path=None):
+        """
+        Download a single queue entry on the engine's executor.
+        
+        A paused or cancelled entry ends in the 'Paused' or 'Cancelled' status
+        with no error.
+        
+        Args:
+            entry (dict): Queue entry
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting
+            index (int): Current download index
+            total (int): Total downloads in the batch
+            archive_path (str): Optional yt-dlp download archive
             
-            # Notify status change
-            if self.status_callback:
-                self.status_callback("status_changed", entry)
+        Returns:
+            str or None: Error message, or None on success
+        """
+        control = JobControl()
+        entry["control"] = control
+        dispatched = entry.pop("dispatched", None)
+        self._set_status(entry, "Downloading")
         
-        self.is_downloading = False
+        error = None
+        failure = None
+        variants = entry.get("variants")
+        try:
+            info = await self._take_resolution(entry, scheduled=dispatched is not None)
+            try:
+                if variants and len(variants) > 1:
+                    await self.engine.run_blocking(
+                        self.download_manager.download_variants,
+                        entry["url"],
+                        variants,
+                        index,
+                        total,
+                        control=control,
+                        job_key=id(entry),
+                    )
+                else:
+                    await self.engine.run_blocking(
+                        self.download_manager.download_video,
+                        entry["url"],
+                        format_type,
+                        quality,
+                        index,
+                        total,
+                        archive_path=archive_path,
+                        control=control,
+                        job_key=id(entry),
+                        info=info,
+                    )
+            finally:
+                # Measured before a failure drops the job from the progress books
+                self._record_start_gap(entry, dispatched)
+            self._set_status(entry, "Completed")
+        except DownloadInterrupted as exc:
+            self._set_status(entry, exc.status)
+        except Exception as exc:
+            error = str(exc)
+            failure = exc
+            self._set_status(entry, "Failed")
+        finally:
+            entry["control"] = None
+        if self.controller and entry["status"] in ("Completed", "Failed"):
+            # The exception, so the controller can read an HTTP status from it
+            self.controller.record("download", failure)
+        return error
+    
+    def run_entry(self, entry, format_type, quality, index=1, total=1, archive_path=None):
+        """
+        Download a single queue entry, blocking the calling thread until done.
         
-        # Notify completion
-        if self.completion_callback:
-            self.completion_callback(format_type, errors, completed)
+        Must not be called from the engine thread; see :meth:`run_entry_async`.
+        
+        Returns:
+            str or None: Error message, or None on success
+        """
+        future = self.engine.submit(
+            self.run_entry_async(entry, format_type, quality, index, total, archive_path)
+        )
+        return future.result()
+    
+    def pause_entry(self, entry):
+        """Pause a pending or downloading entry, freeing its worker slot."""
+        self.engine.call_soon(self._interrupt, entry, "Paused")
+    
+    def cancel_entry(self, entry):
+        """Cancel a pending, paused or downloading entry, keeping partial data."""
+        self.engine.call_soon(self._interrupt, entry, "Cancelled")
+    
+    def resume_entry(self, entry):
+        """Queue a paused or cancelled entry again; it resumes from its partial data."""
+        self.engine.call_soon(self._resume, [entry])
+    
+    def pause_all(self):
+        """Pause every pending and downloading entry."""
+        self.engine.call_soon(self._interrupt_all, "Paused")
+    
+    def cancel_all(self):
+        """Cancel every pending, paused and downloading entry."""
+        self.engine.call_soon(self._interrupt_all, "Cancelled")
+    
+    def resume_all(self):
+        """Queue every paused entry again."""
+        self.engine.call_soon(
+            self._resume, [entry for entry in self.queue if entry["status"] == "Paused"]
+        )
+    
+    def _interrupt(self, entry, status):
+        """Stop an entry with the given status (engine thread only)."""
+        current = entry["status"]
+        if current == "Downloading":
+            control = entry.get("control")
+            if control:
+                control.interrupt(status)
+        elif current == "Pending" or (current == "Paused" and status == "Cancelled"):
+            self._drop_resolution(entry)
+            self._set_status(entry, status)
+    
+    def _interrupt_all(self, status):
+        """Stop every unfinished entry (engine thread only)."""
+        for entry in self.queue:
+            self._interrupt(entry, status)
+    
+    def _resume(self, entries):
+        """Reschedule stopped entries with their previous settings (engine thread only)."""
+        resumed = []
+        for entry in entries:
+            if entry["status"] in ("Paused", "Cancelled") and entry.get("format_type"):
+                self._set_status(entry, "Pending")
+                # Also for entries still in the ready deque, which _schedule skips
+                self.download_manager.progress.add(id(entry))
+                resumed.append(entry)
+        if resumed:
+            self.is_downloading = True
+            self._schedule(resumed, resumed[0]["format_type"])
+    
+    def remove_entry(self, entry):
+        """Forget a finished entry and its progress record (engine thread only)."""
+        for position, queued in enumerate(self.queue):
+            if queued is entry:
+                del self.queue[position]
+                break
+        self.download_manager.progress.remove(id(entry))
     
     def get_pending_count(self):
         """Get the number of pending items."""
         return sum(1 for entry in self.queue if entry["status"] == "Pending")
     
+    def get_metadata_memory(self):
+        """
+        Report memory held by the queue's metadata records.
+        
+        Returns:
+            tuple: (number of entries with a record, bytes per 1000 records)
+        """
+        records = [entry["metadata"] for entry in list(self.queue) if entry.get("metadata")]
+        return len(records), memory_per_thousand(records)
+    
+    def get_metrics(self):
+        """
+        Collect queue metrics for status displays and monitoring.
+        
+        Returns:
+            dict: status counts, progress snapshot, current concurrency limits
+                and the adaptive controller's state (None when it is off),
+                disk reservations with any jobs waiting for space, and
+                lookahead resolution counts with the slot-to-transfer start gap
+        """
+        batch = self._batch
+        return {
+            "status": self.get_status_counts(),
+            "progress": self.download_manager.progress.snapshot(),
+            "download_limit": self.max_workers,
+            "metadata_limit": self._metadata_slots.limit if self._metadata_slots else self.metadata_workers,
+            "adaptive": self.controller.metrics() if self.controller else None,
+            "disk": dict(
+                self.download_manager.disk.summary(),
+                waiting=batch.get("disk_wait") if batch else None,
+            ),
+            "lookahead": self.get_lookahead_metrics(),
+        }
+    
+    def get_lookahead_metrics(self):
+        """
+        Describe the lookahead stage.
+        
+        ``start_gap`` is the time from an entry taking a download slot to its
+        first transferred bytes, in seconds.
+        
+        Returns:
+            dict: depth, resolutions ready to use, outcome counts (used,
+                waited, missed, expired, failed) and start gap statistics
+        """
+        batch = self._batch
+        ready = 0
+        if batch:
+            ready = sum(
+                1 for entry in list(batch["ready"])
+                if entry.get("resolution") is not None and entry["resolution"].done()
+            )
+        gaps = list(self._start_gaps)
+        return dict(
+            self._lookahead_counts,
+            depth=config.lookahead,
+            ready=ready,
+            start_gap={
+                "last": gaps[-1] if gaps else None,
+                "mean": sum(gaps) / len(gaps) if gaps else None,
+                "max": max(gaps) if gaps else None,
+                "samples": len(gaps),
+            },
+        )
+    
     def get_status_counts(self):
         """Get counts for each status."""
-        counts = {"Pending": 0, "Downloading": 0, "Completed": 0, "Failed": 0}
+        counts = {
+            "Pending": 0,
+            "Downloading": 0,
+            "Paused": 0,
+            "Completed": 0,
+            "Failed": 0,
+            "Cancelled": 0,
+        }
         for entry in self.queue:
             status = entry.get("status", "Pending")
             counts[status] += 1
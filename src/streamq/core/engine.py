@@ -0,0 +1,66 @@
+"""Asyncio orchestration engine shared by the GUI and headless modes."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncEngine:
+    """
+    Runs an asyncio event loop in a background thread.
+
+    All queue bookkeeping happens on the loop thread, so entries are never
+    mutated from two threads at once. Blocking work (yt-dlp, SQLite) is sent
+    to a bounded thread pool and awaited from the loop.
+    """
+
+    def __init__(self, max_workers=8):
+        """
+        Initialize and start the engine.
+
+        Args:
+            max_workers (int): Size of the executor used for blocking calls
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="streamq-worker")
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="streamq-engine", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        """Run the event loop until :meth:`close` stops it."""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        """Return True when called from the engine's loop thread."""
+        return threading.get_ident() == self._thread.ident
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop from any thread.
+
+        Returns:
+            concurrent.futures.Future: Future for the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call_soon(self, callback, *args):
+        """Schedule a plain callback on the loop from any thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """
+        Run a blocking callable in the bounded executor.
+
+        Returns:
+            The callable's return value
+        """
+        return await self.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """Stop the loop and shut down the executor."""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
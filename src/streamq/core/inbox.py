@@ -0,0 +1,330 @@
+"""Watched inbox: pick up URL files dropped into a directory."""
+
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+from ..config import config
+
+STATE_FILE_NAME = ".streamq-inbox.json"
+
+URL_SCHEMES = ("http://", "https://")
+
+# Entry statuses after which an inbox URL is no longer queued again on start
+FINISHED_STATUSES = ("Completed", "Failed", "Cancelled")
+
+
+class _WakeHandler:
+    """Minimal watchdog event handler that wakes the scan loop on any change."""
+
+    def __init__(self, wake):
+        self.wake = wake
+
+    def dispatch(self, event):
+        self.wake.set()
+
+
+class InboxWatcher:
+    """
+    Feeds URLs from files in a directory into a :class:`DownloadQueue`.
+
+    Other tools drop or append to URL files (one URL per line, ``#``
+    comments allowed) in the inbox. Each file's read offset is persisted
+    after every batch, so lines already handed to the queue are not read
+    again, even after a restart; a file that shrinks or is replaced is read
+    again from the start. A final line without a newline is only taken once
+    the file has been quiet for ``settle`` seconds, so a half-written URL is
+    never queued.
+
+    The same state file lists the URLs handed to the queue whose entries
+    have not completed, failed or been cancelled yet. A watcher started on
+    the inbox again queues those first, so stopping or crashing with a
+    backlog loses nothing.
+
+    Change notifications come from the optional ``watchdog`` package
+    (inotify, FSEvents or ReadDirectoryChangesW). Without it, or if the
+    observer fails to start, the directory is polled.
+
+    When the queue already holds ``inbox_max_backlog`` pending entries,
+    reading pauses and the unread lines stay in their files until the
+    queue drains.
+    """
+
+    def __init__(
+        self,
+        directory,
+        download_queue,
+        format_type=None,
+        quality=None,
+        state_path=None,
+        fetch_titles=False,
+        on_queued=None,
+        poll_interval=1.0,
+        rescan_interval=30.0,
+        settle=2.0,
+    ):
+        """
+        Initialize the watcher.
+
+        Args:
+            directory (str): Inbox directory
+            download_queue (DownloadQueue): Queue receiving the URLs
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting; when None, entries are only
+                queued and wait for the user to start them
+            state_path (str): Offset file (default: hidden file in the inbox)
+            fetch_titles (bool): Fetch titles for new entries in the background
+            on_queued (callable): Called with each batch of new entries,
+                before downloads are started
+            poll_interval (float): Seconds between scans without notifications,
+                and while the queue is too deep to take more
+            rescan_interval (float): Seconds between safety scans when
+                notifications are available
+            settle (float): Quiet seconds before an unterminated last line is read
+        """
+        self.directory = os.path.abspath(directory)
+        self.download_queue = download_queue
+        self.format_type = format_type
+        self.quality = quality
+        self.state_path = state_path or os.path.join(self.directory, STATE_FILE_NAME)
+        self.fetch_titles = fetch_titles
+        self.on_queued = on_queued
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.settle = settle
+        # file name -> {"offset": int, "inode": int}; URLs queued but not finished
+        self.offsets, self.unfinished = self._load_state()
+        self._restore = list(self.unfinished)
+        self._entries = []  # entries queued by this watcher that are not finished yet
+        self.queued = 0
+        self._item_count = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        """Start watching in a background thread."""
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._observer = self._start_observer()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="streamq-inbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching without touching the queue.
+
+        Offsets and unfinished URLs are saved as they change; a watcher
+        started later queues the unfinished URLs again.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=1)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._forget_finished():
+            self._save_state()
+
+    @property
+    def notifications(self):
+        """Whether change notifications are in use instead of polling."""
+        return self._observer is not None
+
+    def _start_observer(self):
+        """Start a watchdog observer, or return None to fall back to polling."""
+        if Observer is None:
+            return None
+        observer = Observer()
+        try:
+            observer.schedule(_WakeHandler(self._wake), self.directory, recursive=False)
+            observer.start()
+        except OSError as error:
+            # e.g. the inotify watch limit is exhausted
+            print(f"StreamQ: inbox notifications unavailable, polling instead: {error}", file=sys.stderr)
+            return None
+        return observer
+
+    def _run(self):
+        """Scan whenever woken, then wait for the next change or poll."""
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                backlogged = self.scan()
+            except OSError as error:
+                print(f"StreamQ: inbox scan failed: {error}", file=sys.stderr)
+                backlogged = True
+            if backlogged or not self.notifications or self._entries:
+                # Unfinished entries are checked on every scan
+                timeout = self.poll_interval
+            else:
+                timeout = self.rescan_interval
+            self._wake.wait(timeout)
+
+    def scan(self):
+        """
+        Queue new lines from every inbox file, oldest file first.
+
+        Returns:
+            bool: True if unread input was left behind because the queue
+                is full or a last line is still settling
+        """
+        changed = self._forget_finished()
+        if self._restore:
+            # Queued before the last stop and never finished
+            restore, self._restore = self._restore, []
+            self._feed(restore, restored=True)
+        files = self._list_files()
+        names = {name for name, _ in files}
+        for name in [name for name in self.offsets if name not in names]:
+            # Removed files: forget their offsets
+            del self.offsets[name]
+            changed = True
+        if changed:
+            self._save_state()
+
+        backlogged = False
+        for name, stat in files:
+            state = self.offsets.get(name)
+            if state is None or state["inode"] != stat.st_ino or stat.st_size < state["offset"]:
+                state = self.offsets[name] = {"offset": 0, "inode": stat.st_ino}
+            if stat.st_size == state["offset"]:
+                continue
+            while True:
+                room = config.inbox_max_backlog - self.download_queue.get_pending_count()
+                if room <= 0:
+                    return True
+                urls, offset, more = self._read_lines(
+                    name, stat, state["offset"], min(room, config.inbox_batch_size)
+                )
+                if offset != state["offset"]:
+                    if urls:
+                        self._feed(urls)
+                    state["offset"] = offset
+                    self._save_state()
+                if not more:
+                    break
+            if state["offset"] < stat.st_size:
+                # An unterminated last line is still settling
+                backlogged = True
+        return backlogged
+
+    def _list_files(self):
+        """List inbox files (not hidden, not temporary) sorted by modification time."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or entry.name.endswith((".tmp", ".part")):
+                    continue
+                if not entry.is_file():
+                    continue
+                # DirEntry.stat() leaves st_ino at 0 on Windows
+                files.append((entry.name, os.stat(entry.path)))
+        files.sort(key=lambda item: (item[1].st_mtime, item[0]))
+        return files
+
+    def _read_lines(self, name, stat, offset, limit):
+        """
+        Read up to ``limit`` URLs starting at ``offset``.
+
+        Returns:
+            tuple: (urls, new offset, whether complete lines remain)
+        """
+        urls = []
+        quiet = time.time() - stat.st_mtime >= self.settle
+        with open(os.path.join(self.directory, name), "rb") as handle:
+            handle.seek(offset)
+            while len(urls) < limit:
+                line = handle.readline()
+                if not line:
+                    return urls, offset, False
+                if not line.endswith(b"\n") and not quiet:
+                    return urls, offset, False
+                offset += len(line)
+                url = line.decode("utf-8", "replace").strip().lstrip("\ufeff")
+                if url.startswith(URL_SCHEMES):
+                    urls.append(url)
+            return urls, offset, offset < stat.st_size
+
+    def _forget_finished(self):
+        """
+        Drop entries that completed, failed or were cancelled from the unfinished URLs.
+
+        Returns:
+            bool: True if any were dropped
+        """
+        finished = [entry for entry in self._entries if entry["status"] in FINISHED_STATUSES]
+        if not finished:
+            return False
+        for entry in finished:
+            self._entries.remove(entry)
+            if entry["url"] in self.unfinished:
+                self.unfinished.remove(entry["url"])
+        return True
+
+    def _feed(self, urls, restored=False):
+        """
+        Add a batch of URLs to the queue and start it if a quality is set.
+
+        Args:
+            urls (list): URLs to queue
+            restored (bool): The URLs are already listed as unfinished
+        """
+        entries = []
+        for url in urls:
+            self._item_count += 1
+            entries.append(
+                self.download_queue.add_to_queue(url, self._item_count, fetch_title=self.fetch_titles)
+            )
+        if not restored:
+            self.unfinished.extend(urls)
+        self._entries.extend(entries)
+        self.queued += len(entries)
+        if self.on_queued:
+            self.on_queued(entries)
+        if self.quality:
+            self.download_queue.process_queue(self.format_type, self.quality)
+
+    def _load_state(self):
+        """
+        Read saved offsets and unfinished URLs; a missing or unreadable file starts fresh.
+
+        Returns:
+            tuple: (offsets by file name, list of unfinished URLs)
+        """
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                data = json.load(state_file)
+        except (OSError, ValueError):
+            return {}, []
+        if not isinstance(data, dict):
+            return {}, []
+        # Older state files hold only the offsets
+        files = data["files"] if isinstance(data.get("files"), dict) else data
+        unfinished = data.get("unfinished") if isinstance(data.get("unfinished"), list) else []
+        offsets = {
+            name: {"offset": int(state["offset"]), "inode": int(state["inode"])}
+            for name, state in files.items()
+            if isinstance(state, dict) and "offset" in state and "inode" in state
+        }
+        return offsets, [url for url in unfinished if isinstance(url, str)]
+
+    def _save_state(self):
+        """Write offsets and unfinished URLs atomically so a crash never leaves a torn state file."""
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump({"files": self.offsets, "unfinished": self.unfinished}, state_file)
+        os.replace(temp_path, self.state_path)
@@ -0,0 +1,273 @@
+"""Shared SQLite job store for running StreamQ workers across processes and hosts."""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    format_type TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'Pending',
+    owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (url, format_type, quality)
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, lease_expires);
+"""
+
+
+class JobStore:
+    """
+    SQLite-backed job store shared by several StreamQ workers.
+
+    Workers claim jobs under a time-limited lease and renew it with
+    heartbeats. A job whose lease expires (for example because its worker
+    died) becomes claimable again. Every claim hands out a fresh lease token,
+    and completion is only accepted from the current token holder, so a
+    stale worker can never overwrite the result of the job's new owner.
+
+    The database uses the rollback journal rather than WAL so that it can
+    live on a shared network volume.
+    """
+
+    def __init__(self, path, max_attempts=3, timeout=30.0):
+        """
+        Initialize the job store.
+
+        Args:
+            path (str): Path to the SQLite database file
+            max_attempts (int): Claims allowed before a job is marked failed
+            timeout (float): Seconds to wait on a locked database
+        """
+        self.path = os.path.abspath(path)
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """Return the SQLite connection for the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+            )
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self, statements):
+        """
+        Run a callable inside an immediate (write-locked) transaction.
+
+        Args:
+            statements (callable): Receives the connection, returns a result
+
+        Returns:
+            The value returned by ``statements``
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(connection)
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def get_archive_path(self, format_type, quality):
+        """
+        Get the shared yt-dlp download archive for an output profile.
+
+        Args:
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting
+
+        Returns:
+            str: Archive file path next to the database
+        """
+        directory = os.path.dirname(self.path)
+        return os.path.join(directory, f"archive-{format_type}-{quality}.txt")
+
+    def enqueue(self, url, format_type, quality):
+        """
+        Add a job unless the same URL and output profile is already stored.
+
+        Args:
+            url (str): Video URL
+            format_type (str): 'audio' or 'video'
+            quality (str): Quality setting
+
+        Returns:
+            int: ID of the new or existing job
+        """
+        now = time.time()
+
+        def statements(connection):
+            connection.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(url, format_type, quality, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, format_type, quality, now, now),
+            )
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE url = ? AND format_type = ? AND quality = ?",
+                (url, format_type, quality),
+            ).fetchone()
+            return row["id"]
+
+        return self._transaction(statements)
+
+    def claim(self, worker_id, lease_seconds=60.0):
+        """
+        Claim the oldest pending job, reclaiming expired leases first.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (float): Lease duration
+
+        Returns:
+            dict or None: The claimed job including its ``lease_token``
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+
+        def statements(connection):
+            # Expired leases whose attempts are exhausted are failed for good
+            connection.execute(
+                "UPDATE jobs SET status = 'Failed', owner = NULL, lease_token = NULL, "
+                "error = COALESCE(error, 'Lease expired too many times'), updated_at = ? "
+                "WHERE status = 'Downloading' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = connection.execute(
+                "SELECT id FROM jobs "
+                "WHERE status = 'Pending' "
+                "OR (status = 'Downloading' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'Downloading', owner = ?, lease_token = ?, "
+                "lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, token, now + lease_seconds, now, row["id"]),
+            )
+            return dict(connection.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+        return self._transaction(statements)
+
+    def heartbeat(self, job_id, lease_token, lease_seconds=60.0):
+        """
+        Extend the lease on a claimed job.
+
+        Args:
+            job_id (int): Job ID
+            lease_token (str): Token returned by :meth:`claim`
+            lease_seconds (float): New lease duration from now
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND lease_token = ? AND status = 'Downloading'",
+            (now + lease_seconds, now, job_id, lease_token),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, lease_token):
+        """
+        Mark a job completed if the caller still holds its lease.
+
+        Returns:
+            bool: Whether the update was accepted
+        """
+        return self._finish(job_id, lease_token, "Completed", None)
+
+    def fail(self, job_id, lease_token, error, retry=True):
+        """
+        Record a failed attempt for a job.
+
+        The job returns to ``Pending`` while attempts remain and ``retry`` is set.
+
+        Args:
+            job_id (int): Job ID
+            lease_token (str): Token returned by :meth:`claim`
+            error (str): Error description
+            retry (bool): Whether another worker may try again
+
+        Returns:
+            bool: Whether the update was accepted
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = CASE WHEN ? AND attempts < ? THEN 'Pending' ELSE 'Failed' END, "
+            "owner = NULL, lease_token = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+            "WHERE id = ? AND lease_token = ?",
+            (1 if retry else 0, self.max_attempts, error, now, job_id, lease_token),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, job_id, lease_token):
+        """
+        Give a claimed job back without counting the attempt.
+
+        Returns:
+            bool: Whether the update was accepted
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'Pending', owner = NULL, lease_token = NULL, "
+            "lease_expires = NULL, attempts = MAX(attempts - 1, 0), updated_at = ? "
+            "WHERE id = ? AND lease_token = ?",
+            (now, job_id, lease_token),
+        )
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id, lease_token, status, error):
+        """Move a leased job into a terminal status."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_token = NULL, "
+            "lease_expires = NULL, error = ?, updated_at = ? "
+            "WHERE id = ? AND lease_token = ?",
+            (status, error, now, job_id, lease_token),
+        )
+        return cursor.rowcount == 1
+
+    def get_status_counts(self):
+        """Get counts for each job status."""
+        counts = {"Pending": 0, "Downloading": 0, "Completed": 0, "Failed": 0}
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) AS total FROM jobs GROUP BY status"
+        ).fetchall()
+        for row in rows:
+            counts[row["status"]] = row["total"]
+        return counts
+
+    def close(self):
+        """Close the connection owned by the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
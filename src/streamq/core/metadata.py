@@ -0,0 +1,132 @@
+"""Compact metadata records reduced from yt-dlp info dicts."""
+
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+class MediaInfo:
+    """
+    The parts of a yt-dlp info dict StreamQ uses.
+
+    A full info dict carries every format, thumbnail and subtitle track and
+    is often hundreds of KB. Info dicts are reduced to this record as soon
+    as extraction returns, so queued entries never keep them alive.
+    """
+
+    __slots__ = ("id", "title", "duration", "size", "format_ids", "expires")
+
+    def __init__(self, id, title, duration=None, size=None, format_ids=(), expires=None):
+        """
+        Initialize the record.
+
+        Args:
+            id (str): Extractor video ID
+            title (str): Display title
+            duration (int): Length in seconds, if known
+            size (int): Estimated download size in bytes, if known
+            format_ids (tuple): Format IDs yt-dlp selected; None for a
+                title-only record
+            expires (int): Unix time at which the resolved media URLs expire
+        """
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.size = size
+        self.format_ids = format_ids
+        self.expires = expires
+
+    @classmethod
+    def from_info(cls, info):
+        """
+        Reduce an info dict to a record.
+
+        Args:
+            info (dict): yt-dlp info dict after format selection
+
+        Returns:
+            MediaInfo: The compact record
+        """
+        formats = info.get("requested_formats") or [info]
+        sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in formats]
+        format_id = info.get("format_id")
+        title = (info.get("title") or "Unknown title").replace("\n", " ").strip() or "Unknown title"
+        duration = info.get("duration")
+        return cls(
+            # Interned: IDs and format codes repeat across entries and profiles
+            sys.intern(str(info.get("id") or "")),
+            title,
+            int(duration) if duration else None,
+            int(sum(sizes)) if sizes and all(sizes) else None,
+            tuple(sys.intern(part) for part in format_id.split("+")) if format_id else (),
+            _url_expiry(fmt.get("url") for fmt in formats),
+        )
+
+    @classmethod
+    def title_only(cls, title, id=None):
+        """
+        Build a display record from a cheap title lookup, with formats unresolved.
+
+        Returns:
+            MediaInfo: Record whose :attr:`resolved` is False
+        """
+        return cls(sys.intern(str(id or "")), title, format_ids=None)
+
+    @property
+    def resolved(self):
+        """Whether the record comes from a full extraction with format selection."""
+        return self.format_ids is not None
+
+    def is_expired(self, margin=0):
+        """Whether the resolved media URLs expire within ``margin`` seconds."""
+        return self.expires is not None and self.expires - margin <= time.time()
+
+    def __repr__(self):
+        return f"MediaInfo(id={self.id!r}, title={self.title!r}, format_ids={self.format_ids!r})"
+
+
+def _url_expiry(urls):
+    """Earliest ``expire`` query parameter among media URLs (as used by YouTube)."""
+    expiry = None
+    for url in urls:
+        if not url:
+            continue
+        values = parse_qs(urlparse(url).query).get("expire")
+        if values and values[0].isdigit():
+            value = int(values[0])
+            expiry = value if expiry is None else min(expiry, value)
+    return expiry
+
+
+def record_size(record):
+    """
+    Bytes held by a record, including its field values.
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    size = sys.getsizeof(record)
+    for name in MediaInfo.__slots__:
+        value = getattr(record, name)
+        size += sys.getsizeof(value)
+        if isinstance(value, tuple):
+            size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+def memory_per_thousand(records):
+    """
+    Average memory of a thousand records.
+
+    Args:
+        records (iterable): MediaInfo records
+
+    Returns:
+        int: Bytes per 1000 records (0 when there are none)
+    """
+    count = 0
+    total = 0
+    for record in records:
+        count += 1
+        total += record_size(record)
+    return total * 1000 // count if count else 0
@@ -0,0 +1,287 @@
+"""Queue-wide progress, throughput and ETA estimation from raw byte counters."""
+
+import threading
+import time
+
+
+def format_bytes(value):
+    """Format a byte count for display, e.g. ``12.3 MiB``."""
+    value = float(value)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def format_duration(seconds):
+    """Format a duration in seconds as ``1h 02m``, ``3m 05s`` or ``12s``."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class _JobProgress:
+    """Byte counters for one queued job."""
+
+    __slots__ = ("streams", "expected", "done", "size", "state", "started")
+
+    def __init__(self):
+        self.streams = {}  # filename -> [downloaded, total]
+        self.expected = None  # size announced up front by the extractor
+        self.done = 0
+        self.size = None
+        self.state = "pending"  # pending, active, stopped or finished
+        self.started = None  # monotonic time of the first report of the current run
+
+
+class ProgressAggregator:
+    """
+    Tracks byte progress across every active and pending job.
+
+    Jobs whose size is not known yet are weighted by the average size of the
+    jobs that are known, so the queue total is an estimate until every job
+    has started. Running totals are kept incrementally, which makes a
+    snapshot O(1) no matter how many jobs are queued.
+    """
+
+    def __init__(self, smoothing=0.3, sample_interval=0.5):
+        """
+        Initialize the aggregator.
+
+        Args:
+            smoothing (float): Weight of the newest throughput sample (EWMA)
+            sample_interval (float): Minimum seconds between throughput samples
+        """
+        self.smoothing = smoothing
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every job, e.g. when a new batch starts."""
+        with self._lock:
+            self._jobs = {}
+            self._states = {"pending": 0, "active": 0, "stopped": 0, "finished": 0}
+            self._done = 0
+            self._known_size = 0
+            self._known_count = 0
+            self._transferred = 0
+            self._sample_time = None
+            self._sample_bytes = 0
+            self._speed = 0.0
+
+    def add(self, key, size=None):
+        """
+        Register a job before it starts.
+
+        Args:
+            key: Job identifier
+            size (int): Size estimate in bytes, if known
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._new_job(key)
+            elif job.state == "stopped":
+                # A paused job queued again; its partial bytes stay counted
+                self._move(job, "pending")
+                job.started = None
+            if size and job.size is None:
+                job.expected = size
+                self._set_size(job, size)
+
+    def update(self, key, data):
+        """
+        Apply a raw yt-dlp progress hook payload.
+
+        yt-dlp reports ``downloaded_bytes`` per stream including any resumed
+        partial data, so only the difference to the last report is added.
+
+        Args:
+            key: Job identifier
+            data (dict): Progress hook data
+        """
+        status = data.get("status")
+        stream = data.get("filename") or ""
+        downloaded = data.get("downloaded_bytes") or 0
+        total = data.get("total_bytes") or data.get("total_bytes_estimate")
+        if status == "finished":
+            total = total or downloaded
+
+        with self._lock:
+            job = self._jobs.get(key) or self._new_job(key)
+            if job.state != "active":
+                self._move(job, "active")
+            if job.started is None:
+                job.started = time.monotonic()
+            if job.expected is None:
+                job.expected = self._expected_size(data.get("info_dict") or {}) or 0
+                if job.expected:
+                    self._set_size(job, job.expected)
+
+            counters = job.streams.setdefault(stream, [0, None])
+            delta = downloaded - counters[0]
+            counters[0] = downloaded
+            if total:
+                counters[1] = total
+            job.done += delta
+            self._done += delta
+            if delta > 0:
+                self._transferred += delta
+
+            if not job.expected:
+                self._set_size(job, sum(value[1] or value[0] for value in job.streams.values()))
+            self._sample_speed()
+
+    def complete(self, key):
+        """Mark a job finished; its size becomes whatever was downloaded."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.state == "finished":
+                return
+            self._move(job, "finished")
+            if job.done:
+                self._set_size(job, job.done)
+
+    def stop(self, key):
+        """Mark a paused job inactive while keeping its bytes on the books."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != "finished":
+                self._move(job, "stopped")
+
+    def remove(self, key):
+        """Drop a cancelled or failed job from the totals."""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            if job is None:
+                return
+            self._states[job.state] -= 1
+            self._done -= job.done
+            if job.size is not None:
+                self._known_size -= job.size
+                self._known_count -= 1
+
+    def job_bytes(self, key):
+        """
+        Get one job's byte counters.
+
+        Returns:
+            tuple: (size or None, downloaded bytes)
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return None, 0
+            return job.size, job.done
+
+    def job_started(self, key):
+        """
+        Get when a job's current run reported its first progress.
+
+        Returns:
+            float or None: ``time.monotonic()`` timestamp
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            return job.started if job is not None else None
+
+    def _new_job(self, key):
+        """Create a pending job (lock held)."""
+        job = self._jobs[key] = _JobProgress()
+        self._states["pending"] += 1
+        return job
+
+    def _move(self, job, state):
+        """Change a job's state and keep the state counts in sync (lock held)."""
+        self._states[job.state] -= 1
+        self._states[state] += 1
+        job.state = state
+
+    def _set_size(self, job, size):
+        """Record a job's size and keep the known-size totals in sync (lock held)."""
+        if job.size is None:
+            self._known_count += 1
+        else:
+            self._known_size -= job.size
+        job.size = size
+        self._known_size += size
+
+    @staticmethod
+    def _expected_size(info):
+        """Sum the announced sizes of every requested format, if all are known."""
+        formats = info.get("requested_formats") or [info]
+        sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in formats]
+        if sizes and all(sizes):
+            return int(sum(sizes))
+        return None
+
+    def _sample_speed(self):
+        """Fold the bytes since the last sample into the smoothed throughput (lock held)."""
+        now = time.monotonic()
+        if self._sample_time is None:
+            self._sample_time = now
+            self._sample_bytes = self._transferred
+            return
+        elapsed = now - self._sample_time
+        if elapsed < self.sample_interval:
+            return
+        rate = (self._transferred - self._sample_bytes) / elapsed
+        if self._speed:
+            self._speed = self.smoothing * rate + (1 - self.smoothing) * self._speed
+        else:
+            self._speed = rate
+        self._sample_time = now
+        self._sample_bytes = self._transferred
+
+    def snapshot(self):
+        """
+        Summarize queue-wide progress.
+
+        Returns:
+            dict: done, total, remaining (bytes), percent, speed (bytes/s),
+                eta (seconds or None), active, pending and jobs counts
+        """
+        with self._lock:
+            unknown = len(self._jobs) - self._known_count
+            average = self._known_size / self._known_count if self._known_count else 0
+            total = self._known_size + unknown * average
+            done = max(0, self._done)
+            # Estimates can lag behind what has actually arrived
+            total = max(total, done)
+            remaining = total - done
+            speed = self._speed
+            return {
+                "done": done,
+                "total": total,
+                "remaining": remaining,
+                "percent": done / total * 100 if total else 0.0,
+                "speed": speed,
+                "eta": remaining / speed if speed > 0 and unknown < len(self._jobs) else None,
+                "active": self._states["active"],
+                "pending": self._states["pending"],
+                "jobs": len(self._jobs),
+            }
+
+    @staticmethod
+    def describe(snapshot):
+        """
+        Build a one-line status message from a snapshot.
+
+        Returns:
+            str: e.g. ``120.3 MiB of 1.2 GiB | 1.1 GiB left | 5.2 MiB/s | ETA 3m 40s``
+        """
+        parts = [
+            f"{format_bytes(snapshot['done'])} of {format_bytes(snapshot['total'])}",
+            f"{format_bytes(snapshot['remaining'])} left",
+        ]
+        if snapshot["speed"]:
+            parts.append(f"{format_bytes(snapshot['speed'])}/s")
+        if snapshot["eta"] is not None:
+            parts.append(f"ETA {format_duration(snapshot['eta'])}")
+        parts.append(f"Active {snapshot['active']} | Pending {snapshot['pending']}")
+        return " | ".join(parts)
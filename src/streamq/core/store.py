@@ -0,0 +1,131 @@
+"""Content-addressed output store with hardlink/reflink deduplication."""
+
+import hashlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Linux ioctl that clones a file's extents (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+OBJECTS_DIR_NAME = ".objects"
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Hash a file with SHA-256.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source, target):
+    """Clone ``source`` into a new file ``target`` without copying data."""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source, "rb") as source_file, open(target, "xb") as target_file:
+        try:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+        except OSError:
+            target_file.close()
+            os.remove(target)
+            raise
+
+
+def _share(source, target):
+    """
+    Create ``target`` sharing ``source``'s data: a hardlink, else a reflink.
+
+    Raises:
+        OSError: If the file system supports neither
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        _reflink(source, target)
+
+
+class ContentStore:
+    """
+    Stores finished outputs by SHA-256 under ``.objects/``.
+
+    Every output keeps its human-readable name in the output folders, but
+    the name is a hardlink (or a reflink where hardlinks are unavailable)
+    to the object for its content. When identical media arrives under
+    another URL or title, the new file is replaced by a link to the
+    existing object, so the bytes are stored once.
+
+    Hardlinked names share one file: editing one of them in place changes
+    every other name for the same content.
+    """
+
+    def __init__(self, root):
+        """
+        Initialize the store.
+
+        Args:
+            root (str): Directory that holds the objects
+        """
+        self.root = root
+        self.deduplicated = 0
+        self.saved_bytes = 0
+        self._lock = threading.Lock()
+
+    def object_path(self, digest, extension):
+        """Path of the object for a digest."""
+        return os.path.join(self.root, digest[:2], digest + extension)
+
+    def ingest(self, path):
+        """
+        Move a finished output into the store, deduplicating it.
+
+        Args:
+            path (str): Finished output file
+
+        Returns:
+            str or None: The content digest, or None if the file system can
+                neither hardlink nor reflink (the file is left as it is)
+        """
+        digest = hash_file(path)
+        extension = os.path.splitext(path)[1].lower()
+        object_path = self.object_path(digest, extension)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        try:
+            # New content: the object and the readable name share one inode
+            _share(path, object_path)
+            return digest
+        except FileExistsError:
+            pass
+        except OSError:
+            return None
+
+        if os.path.samefile(object_path, path):
+            return digest
+        size = os.path.getsize(path)
+        temp_path = path + ".link"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        try:
+            _share(object_path, temp_path)
+        except OSError:
+            return None
+        os.replace(temp_path, path)
+        with self._lock:
+            self.deduplicated += 1
+            self.saved_bytes += size
+        return digest
@@ -0,0 +1,238 @@
+"""Streaming audio transcode: pipe downloaded bytes straight into FFmpeg."""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, RequestError
+
+# Fragmented protocols (HLS, DASH segments) need yt-dlp's own downloaders
+STREAMABLE_PROTOCOLS = ("http", "https")
+
+# Range size for sources that throttle long unranged reads (yt-dlp uses the same idea)
+DEFAULT_RANGE_SIZE = 10 * 1024 * 1024
+
+
+def find_ffmpeg(ffmpeg_dir):
+    """
+    Locate the FFmpeg binary.
+
+    Args:
+        ffmpeg_dir (str): Directory that may contain the binary
+
+    Returns:
+        str or None: Path to FFmpeg
+    """
+    binary = "ffmpeg.exe" if os.name == "nt" else "ffmpeg"
+    if ffmpeg_dir:
+        candidate = os.path.join(ffmpeg_dir, binary)
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which(binary)
+
+
+def can_stream(info):
+    """
+    Check whether a resolved yt-dlp format can be piped into FFmpeg.
+
+    Args:
+        info (dict): Info dict after format selection
+
+    Returns:
+        bool: True for a single plain HTTP(S) format
+    """
+    if info.get("requested_formats") or info.get("_type", "video") != "video":
+        return False
+    return bool(info.get("url")) and info.get("protocol") in STREAMABLE_PROTOCOLS
+
+
+class StreamingFailed(RuntimeError):
+    """The source could not be streamed; nothing was written to the output path."""
+
+
+class StreamingTranscoder:
+    """
+    Encodes audio to MP3 while it downloads.
+
+    Bytes are fetched in ranged HTTP requests and written to FFmpeg's stdin as
+    they arrive, so encoding overlaps the transfer and the source file never
+    touches the disk. The MP3 is written to a temporary name and moved into
+    place only after FFmpeg exits cleanly.
+
+    Requests go through yt-dlp's ``urlopen``, so cookies, proxies and the
+    extractor's headers apply as they would to a regular download, and the
+    transfer keeps to the job's share of ``rate_limit``.
+
+    Interrupting a streamed download discards the partial encode; resuming
+    it starts that item over, because encoder state cannot be resumed.
+    """
+
+    def __init__(self, ffmpeg_path, urlopen, chunk_size=256 * 1024, rate_limit=0):
+        """
+        Initialize the transcoder.
+
+        Args:
+            ffmpeg_path (str): Path to the FFmpeg binary
+            urlopen (callable): ``YoutubeDL.urlopen`` of the instance that
+                extracted the info dict
+            chunk_size (int): Bytes read from the network per write to FFmpeg
+            rate_limit (int): Bandwidth cap in bytes/s (0 = unlimited)
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.urlopen = urlopen
+        self.chunk_size = chunk_size
+        self.rate_limit = rate_limit
+
+    def transcode(self, info, output_path, quality, progress_hook):
+        """
+        Stream a resolved format into an MP3 file.
+
+        Args:
+            info (dict): Info dict after format selection (see :func:`can_stream`)
+            output_path (str): Final MP3 path
+            quality (str): Target bitrate in kbit/s
+            progress_hook (callable): Receives yt-dlp style progress dicts; may
+                raise to abort the transfer
+
+        Raises:
+            StreamingFailed: If the source could not be fetched or FFmpeg
+                could not decode it from a pipe (e.g. an MP4 whose index is
+                at the end); the caller can still download the file normally
+        """
+        directory = os.path.dirname(output_path) or "."
+        handle, temp_path = tempfile.mkstemp(suffix=".mp3.part", dir=directory)
+        os.close(handle)
+        command = [
+            self.ffmpeg_path,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-y",
+            "-i", "pipe:0",
+            "-vn",
+            "-codec:a", "libmp3lame",
+            "-b:a", f"{quality}k",
+            "-f", "mp3",
+            temp_path,
+        ]
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=errors)
+            try:
+                try:
+                    self._pump(info, process.stdin, output_path, progress_hook)
+                    process.stdin.close()
+                except BrokenPipeError:
+                    # FFmpeg stopped reading its input; its exit status says why
+                    pass
+                return_code = process.wait()
+            except (RequestError, OSError) as error:
+                process.kill()
+                process.wait()
+                _remove(temp_path)
+                raise StreamingFailed(f"Streaming failed: {error}") from error
+            except BaseException:
+                process.kill()
+                process.wait()
+                _remove(temp_path)
+                raise
+            if return_code != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", "replace").strip()
+                _remove(temp_path)
+                raise StreamingFailed(f"FFmpeg failed: {message or return_code}")
+        os.replace(temp_path, output_path)
+
+    def _pump(self, info, sink, output_path, progress_hook):
+        """Copy the source into ``sink`` range by range, reporting progress."""
+        headers = dict(info.get("http_headers") or {})
+        total = info.get("filesize") or info.get("filesize_approx")
+        range_size = (info.get("downloader_options") or {}).get("http_chunk_size") or DEFAULT_RANGE_SIZE
+        downloaded = 0
+        started = time.monotonic()
+
+        while total is None or downloaded < total:
+            end = downloaded + range_size - 1
+            if total:
+                end = min(end, int(total) - 1)
+            headers["Range"] = f"bytes={downloaded}-{end}"
+            received = 0
+            try:
+                response = self.urlopen(Request(info["url"], headers=headers))
+            except HTTPError as error:
+                # 416: the size was unknown and everything has been read
+                if error.status == 416 and downloaded:
+                    break
+                raise
+            with response:
+                if downloaded and self._range_start(response) != downloaded:
+                    # The body would repeat bytes FFmpeg already has
+                    raise StreamingFailed(f"Server ignored the range request (HTTP {response.status})")
+                total = total or self._total_from_response(response)
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    sink.write(chunk)
+                    received += len(chunk)
+                    downloaded += len(chunk)
+                    progress_hook({
+                        "status": "downloading",
+                        "downloaded_bytes": downloaded,
+                        "total_bytes": total,
+                        "filename": output_path,
+                        "info_dict": info,
+                    })
+                    if self.rate_limit:
+                        delay = downloaded / self.rate_limit - (time.monotonic() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+                # Servers that ignore Range send everything in one response
+                if response.status == 200:
+                    total = downloaded
+            if not received:
+                break
+
+        progress_hook({
+            "status": "finished",
+            "downloaded_bytes": downloaded,
+            "total_bytes": downloaded,
+            "filename": output_path,
+            "info_dict": info,
+        })
+
+    @staticmethod
+    def _range_start(response):
+        """
+        First byte a response carries.
+
+        Returns:
+            int or None: The Content-Range start of a 206, 0 for a full
+                response, or None if a 206 does not say
+        """
+        if response.status != 206:
+            return 0
+        match = re.match(r"\s*bytes\s+(\d+)-", response.headers.get("Content-Range") or "")
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _total_from_response(response):
+        """Read the full size from a Content-Range or Content-Length header."""
+        content_range = response.headers.get("Content-Range") or ""
+        if "/" in content_range:
+            size = content_range.rsplit("/", 1)[1]
+            if size.isdigit():
+                return int(size)
+        if response.status == 200 and response.headers.get("Content-Length", "").isdigit():
+            return int(response.headers["Content-Length"])
+        return None
+
+
+def _remove(path):
+    """Delete a file if it exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,107 @@
+"""Output variants: several formats produced from one set of downloaded streams."""
+
+import os
+import subprocess
+import tempfile
+
+FORMAT_TYPES = ("audio", "video")
+
+
+def format_selector(format_type, quality):
+    """
+    Build the yt-dlp format selection for an output.
+
+    Args:
+        format_type (str): 'audio' or 'video'
+        quality (str): Audio bitrate or video height
+
+    Returns:
+        str: yt-dlp format specification
+    """
+    if format_type == "audio":
+        return f"bestaudio[abr<={quality}]/best"
+    return f"bestvideo[height<={quality}]+bestaudio/best[height<={quality}]"
+
+
+def parse_variant(text):
+    """
+    Parse a ``format:quality`` variant such as ``audio:192`` or ``video:720``.
+
+    Returns:
+        tuple: (format_type, quality)
+
+    Raises:
+        ValueError: If the text is not a valid variant
+    """
+    format_type, separator, quality = str(text).strip().partition(":")
+    format_type = format_type.strip().lower()
+    quality = quality.strip().rstrip("pk")
+    if not separator or format_type not in FORMAT_TYPES or not quality.isdigit():
+        raise ValueError(f"invalid variant {text!r}: expected audio:BITRATE or video:HEIGHT")
+    return format_type, quality
+
+
+def output_name(title, format_type, quality, variants):
+    """
+    Name an output file after the title, adding the quality when several
+    variants of the same format type would otherwise share one name.
+
+    Returns:
+        str: File name including the extension
+    """
+    siblings = sum(1 for other_type, _ in variants if other_type == format_type)
+    if format_type == "audio":
+        suffix = f" ({quality}k)" if siblings > 1 else ""
+        return f"{title}{suffix}.mp3"
+    suffix = f" ({quality}p)" if siblings > 1 else ""
+    return f"{title}{suffix}.mp4"
+
+
+def ffmpeg_arguments(format_type, quality, inputs):
+    """
+    Build FFmpeg arguments that turn downloaded streams into one output.
+
+    Audio is encoded to MP3 from the audio track; video streams are
+    remuxed into MP4 without re-encoding.
+
+    Args:
+        format_type (str): 'audio' or 'video'
+        quality (str): Audio bitrate or video height
+        inputs (list): Stream files, video first when there are two
+
+    Returns:
+        list: Arguments between the binary and the output path
+    """
+    arguments = []
+    for path in inputs:
+        arguments += ["-i", path]
+    if format_type == "audio":
+        # The last input carries the audio when video and audio are separate
+        arguments += ["-map", f"{len(inputs) - 1}:a:0", "-vn", "-codec:a", "libmp3lame", "-b:a", f"{quality}k", "-f", "mp3"]
+    elif len(inputs) > 1:
+        arguments += ["-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-f", "mp4"]
+    else:
+        arguments += ["-c", "copy", "-f", "mp4"]
+    return arguments
+
+
+def run_ffmpeg(ffmpeg_path, arguments, output_path):
+    """
+    Run FFmpeg into a temporary file and move it into place on success.
+
+    Raises:
+        RuntimeError: If FFmpeg fails
+    """
+    directory = os.path.dirname(output_path) or "."
+    handle, temp_path = tempfile.mkstemp(suffix=".part", dir=directory)
+    os.close(handle)
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"] + arguments + [temp_path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            message = result.stderr.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"FFmpeg failed: {message or result.returncode}")
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,154 @@
+"""Headless workers that pull jobs from a shared :class:`JobStore`."""
+
+import asyncio
+import os
+import socket
+
+from .adapters import HeadlessReporter
+from .downloader import DownloadManager, DownloadQueue
+from .jobstore import JobStore
+
+
+def default_worker_id(number=0):
+    """Build a worker identifier that is unique across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{number}"
+
+
+class StoreWorker:
+    """Claims jobs from a job store and runs them through a DownloadQueue."""
+
+    def __init__(self, store, download_queue, worker_id=None, lease_seconds=60.0, poll_interval=2.0):
+        """
+        Initialize the worker.
+
+        Args:
+            store (JobStore): Shared job store
+            download_queue (DownloadQueue): Queue used to run the downloads
+            worker_id (str): Identifier recorded as the lease owner
+            lease_seconds (float): Lease duration; heartbeats renew it every third
+            poll_interval (float): Seconds to sleep when no job is claimable
+        """
+        self.store = store
+        self.download_queue = download_queue
+        self.engine = download_queue.engine
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    async def run(self, stop_event, exit_when_idle=False):
+        """
+        Process jobs until stopped.
+
+        Args:
+            stop_event (asyncio.Event): Set to stop after the current job
+            exit_when_idle (bool): Return once no job is pending or leased
+        """
+        while not stop_event.is_set():
+            if await self.run_once():
+                continue
+            if exit_when_idle:
+                counts = await self.engine.run_blocking(self.store.get_status_counts)
+                if not counts["Pending"] and not counts["Downloading"]:
+                    return
+            try:
+                await asyncio.wait_for(stop_event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self):
+        """
+        Claim and run a single job.
+
+        Returns:
+            bool: Whether a job was claimed
+        """
+        job = await self.engine.run_blocking(self.store.claim, self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+
+        job_id = job["id"]
+        token = job["lease_token"]
+        entry = self.download_queue.add_to_queue(job["url"], job_id, fetch_title=False)
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id, token, entry))
+        try:
+            error = await self.download_queue.run_entry_async(
+                entry,
+                job["format_type"],
+                job["quality"],
+                archive_path=self.store.get_archive_path(job["format_type"], job["quality"]),
+            )
+        finally:
+            heartbeat.cancel()
+            # A long-running worker must not accumulate finished entries
+            self.download_queue.remove_entry(entry)
+
+        lost = heartbeat.done() and not heartbeat.cancelled() and heartbeat.exception() is None and not heartbeat.result()
+        if lost:
+            # Another worker owns the job now; its result wins
+            return True
+        if entry["status"] in ("Paused", "Cancelled"):
+            await self.engine.run_blocking(self.store.release, job_id, token)
+        elif error is None:
+            await self.engine.run_blocking(self.store.complete, job_id, token)
+        else:
+            await self.engine.run_blocking(self.store.fail, job_id, token, error)
+        return True
+
+    async def _heartbeat(self, job_id, token, entry):
+        """
+        Renew the lease until the job finishes; stop the download if the lease is lost.
+
+        Returns:
+            bool: False once the lease was lost
+        """
+        interval = max(self.lease_seconds / 3.0, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            renewed = await self.engine.run_blocking(
+                self.store.heartbeat, job_id, token, self.lease_seconds
+            )
+            if not renewed:
+                # The job was reclaimed; two workers must never write the same files
+                control = entry.get("control")
+                if control:
+                    control.interrupt("Cancelled")
+                return False
+
+
+def run_workers(store_path, ffmpeg_dir, workers=1, lease_seconds=60.0, exit_when_idle=False):
+    """
+    Run several store workers on one event loop until interrupted.
+
+    Args:
+        store_path (str): Path to the shared SQLite job store
+        ffmpeg_dir (str): Path to the FFmpeg bin directory
+        workers (int): Number of concurrent workers
+        lease_seconds (float): Lease duration for claimed jobs
+        exit_when_idle (bool): Stop once the store has no outstanding jobs
+    """
+    workers = max(1, workers)
+    store = JobStore(store_path)
+    download_queue = DownloadQueue(DownloadManager(ffmpeg_dir), max_workers=workers)
+    HeadlessReporter().attach(download_queue)
+    engine = download_queue.engine
+    stop_events = []
+
+    async def run_all():
+        stop_event = asyncio.Event()
+        stop_events.append(stop_event)
+        await asyncio.gather(*(
+            StoreWorker(store, download_queue, default_worker_id(number), lease_seconds).run(
+                stop_event, exit_when_idle
+            )
+            for number in range(workers)
+        ))
+
+    future = engine.submit(run_all())
+    try:
+        future.result()
+    except KeyboardInterrupt:
+        # Leases of interrupted jobs expire and are reclaimed by other workers
+        for stop_event in stop_events:
+            engine.call_soon(stop_event.set)
+    finally:
+        engine.close()
@@ -0,0 +1,169 @@
+"""Pool of long-lived yt-dlp instances keyed by option profile."""
+
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import yt_dlp
+
+from ..config import config
+
+
+class PooledYoutubeDL:
+    """
+    A reusable YoutubeDL instance with swappable per-job hooks.
+
+    The instance registers one forwarding hook of each kind when it is
+    created. Jobs attach their own hooks by setting the forwarding targets,
+    so nothing is ever added to or removed from yt-dlp's hook lists.
+    """
+
+    def __init__(self, options):
+        """
+        Create the underlying YoutubeDL instance.
+
+        Args:
+            options (dict): yt-dlp options without hooks
+        """
+        # YoutubeDL normalizes its params in place; keep the caller's dict intact
+        self.ydl = yt_dlp.YoutubeDL(copy.deepcopy(options))
+        self.progress_hook = None
+        self.postprocessor_hook = None
+        self.archive_mtime = None
+        archive = options.get("download_archive")
+        if archive and os.path.exists(archive):
+            # YoutubeDL just loaded it
+            self.archive_mtime = os.path.getmtime(archive)
+        self.ydl.add_progress_hook(self._forward_progress)
+        self.ydl.add_postprocessor_hook(self._forward_postprocessor)
+
+    def _forward_progress(self, data):
+        """Pass download progress to the current job's hook."""
+        if self.progress_hook:
+            self.progress_hook(data)
+
+    def _forward_postprocessor(self, data):
+        """Pass postprocessor progress to the current job's hook."""
+        if self.postprocessor_hook:
+            self.postprocessor_hook(data)
+
+    def refresh_archive(self):
+        """Reload the download archive if another worker or process appended to it."""
+        path = self.ydl.params.get("download_archive")
+        if not path:
+            return
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime == self.archive_mtime:
+            return
+        with open(path, "r", encoding="utf-8") as archive_file:
+            self.ydl.archive = {line.strip() for line in archive_file if line.strip()}
+        self.archive_mtime = mtime
+
+    def reset(self):
+        """Clear per-run counters before the instance is reused."""
+        # yt-dlp accumulates these across download() calls on one instance
+        self.ydl._download_retcode = 0
+        self.ydl._num_downloads = 0
+
+    def close(self):
+        """Close connections and save cookies."""
+        self.ydl.close()
+
+
+class YoutubeDLPool:
+    """
+    Keeps warm YoutubeDL instances per option profile.
+
+    Building a YoutubeDL instance initializes every extractor, the HTTP
+    handlers and the cookie jar, and a new instance starts with cold
+    connections and player caches. The pool hands each caller an instance
+    for its exclusive use and takes it back afterwards. Instances that saw an
+    exception are closed instead of reused.
+    """
+
+    def __init__(self, max_profiles=8):
+        """
+        Initialize the pool.
+
+        Args:
+            max_profiles (int): Option profiles kept warm; the least recently
+                used profile is closed beyond this
+        """
+        self.max_profiles = max_profiles
+        self._idle = OrderedDict()  # profile key -> list of idle PooledYoutubeDL
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_key(options):
+        """Build a stable key for a set of yt-dlp options."""
+        return json.dumps(options, sort_keys=True, default=repr)
+
+    @contextmanager
+    def checkout(self, options, progress_hook=None, postprocessor_hook=None):
+        """
+        Borrow an instance configured with ``options``.
+
+        Args:
+            options (dict): yt-dlp options without hooks
+            progress_hook (callable): Progress hook for this job
+            postprocessor_hook (callable): Postprocessor hook for this job
+
+        Yields:
+            yt_dlp.YoutubeDL: Instance reserved for the caller
+        """
+        key = self.profile_key(options)
+        pooled = self._take(key) or PooledYoutubeDL(options)
+        pooled.reset()
+        pooled.refresh_archive()
+        pooled.progress_hook = progress_hook
+        pooled.postprocessor_hook = postprocessor_hook
+        healthy = False
+        try:
+            yield pooled.ydl
+            healthy = True
+        finally:
+            pooled.progress_hook = None
+            pooled.postprocessor_hook = None
+            if healthy:
+                self._give_back(key, pooled)
+            else:
+                pooled.close()
+
+    def _take(self, key):
+        """Pop an idle instance for a profile, if any."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._idle.move_to_end(key)
+                return idle.pop()
+        return None
+
+    def _give_back(self, key, pooled):
+        """Return an instance to its profile, closing what no longer fits."""
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < config.ydl_pool_size:
+                idle.append(pooled)
+            else:
+                evicted.append(pooled)
+            while len(self._idle) > self.max_profiles:
+                _, stale = self._idle.popitem(last=False)
+                evicted.extend(stale)
+        for instance in evicted:
+            instance.close()
+
+    def close(self):
+        """Close every idle instance."""
+        with self._lock:
+            idle, self._idle = self._idle, OrderedDict()
+        for instances in idle.values():
+            for instance in instances:
+                instance.close()
@@ -0,0 +1,278 @@
+"""Opt-in profiling of StreamQ hot paths.
+
+Profiling is enabled with the ``STREAMQ_PROFILE`` environment variable or the
+``--profile`` command line flag. While disabled, every wrapped function costs
+a single attribute check.
+
+Two kinds of sections are recorded:
+
+- ``job`` sections (downloads, title fetches) each get their own report with
+  sampled CPU stacks and a tracemalloc snapshot comparison.
+- ``tick`` sections (progress hooks, Tk callbacks) are aggregated per
+  callback: call count, wall time, traced memory growth and sampled stacks.
+"""
+
+import atexit
+import functools
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+ENV_VAR = "STREAMQ_PROFILE"
+
+
+class _Section:
+    """Bookkeeping for one active profiled call."""
+
+    __slots__ = ("kind", "label", "detail", "started", "samples", "snapshot", "memory")
+
+    def __init__(self, kind, label, detail):
+        self.kind = kind
+        self.label = label
+        self.detail = detail
+        self.started = time.perf_counter()
+        self.samples = Counter()
+        self.snapshot = None
+        self.memory = 0
+
+
+class Profiler:
+    """Sampling CPU profiler with per-job and per-tick tracemalloc accounting."""
+
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = None
+        self.interval = 0.005
+        self.stack_depth = 12
+        self._active = {}  # thread id -> list of active sections
+        self._ticks = {}  # label -> aggregated tick statistics
+        self._lock = threading.Lock()
+        self._job_count = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def enable(self, output_dir, interval=0.005):
+        """
+        Start profiling and write reports into ``output_dir``.
+
+        Args:
+            output_dir (str): Directory for profile reports
+            interval (float): Seconds between stack samples
+        """
+        if self.enabled:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.interval = interval
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.stack_depth)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="streamq-profiler", daemon=True)
+        self._sampler.start()
+        self.enabled = True
+        atexit.register(self.disable)
+
+    def disable(self):
+        """Stop profiling and write the aggregated tick report."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._sampler.join(timeout=1)
+        self._write_tick_report()
+        tracemalloc.stop()
+
+    def _sample_loop(self):
+        """Periodically attribute every thread's current stack to its active sections."""
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, sections in list(self._active.items()):
+                if ident == own_ident or not sections:
+                    continue
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                for section in list(sections):
+                    section.samples[stack] += 1
+
+    def _collapse(self, frame):
+        """Turn a frame into a tuple of ``file:function:line`` entries, outermost first."""
+        stack = []
+        while frame is not None and len(stack) < self.stack_depth:
+            code = frame.f_code
+            # Leave the profiler's own wrapper frames out of the report
+            if code.co_filename == __file__:
+                frame = frame.f_back
+                continue
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def run(self, kind, label, detail, func, *args, **kwargs):
+        """
+        Call ``func`` inside a profiled section.
+
+        Args:
+            kind (str): 'job' or 'tick'
+            label (str): Section name, usually the function's qualified name
+            detail (str): Extra context such as the URL being processed
+            func (callable): Function to call
+
+        Returns:
+            The function's return value
+        """
+        section = _Section(kind, label, detail)
+        if kind == "job":
+            section.snapshot = self._snapshot()
+        else:
+            section.memory = tracemalloc.get_traced_memory()[0]
+        sections = self._active.setdefault(threading.get_ident(), [])
+        sections.append(section)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sections.remove(section)
+            elapsed = time.perf_counter() - section.started
+            if not tracemalloc.is_tracing():
+                # Profiling was disabled while the section was running
+                pass
+            elif kind == "job":
+                self._write_job_report(section, elapsed)
+            else:
+                self._record_tick(section, elapsed)
+
+    @staticmethod
+    def _snapshot():
+        """Take a tracemalloc snapshot without the profiler's own allocations."""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+
+    def _record_tick(self, section, elapsed):
+        """Fold a finished tick section into the per-label statistics."""
+        growth = tracemalloc.get_traced_memory()[0] - section.memory
+        with self._lock:
+            stats = self._ticks.setdefault(section.label, {
+                "calls": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "memory": 0,
+                "samples": Counter(),
+            })
+            stats["calls"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["memory"] += growth
+            stats["samples"].update(section.samples)
+
+    def _write_job_report(self, section, elapsed):
+        """Write the CPU and memory report for a finished job section."""
+        with self._lock:
+            self._job_count += 1
+            number = self._job_count
+        memory = self._snapshot().compare_to(section.snapshot, "lineno")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", section.label).strip("-")
+        path = os.path.join(self.output_dir, f"job-{number:05d}-{slug}.txt")
+        lines = [
+            f"Section: {section.label}",
+            f"Detail: {section.detail}",
+            f"Wall time: {elapsed:.3f}s",
+        ]
+        lines.extend(self._format_samples(section.samples))
+        lines.append("")
+        lines.append("Top memory growth (tracemalloc):")
+        for stat in memory[:15]:
+            lines.append(f"  {stat}")
+        self._write(path, lines)
+
+    def _write_tick_report(self):
+        """Write aggregated statistics for every tick label."""
+        with self._lock:
+            ticks = sorted(self._ticks.items(), key=lambda item: item[1]["total"], reverse=True)
+        lines = []
+        for label, stats in ticks:
+            average = stats["total"] / stats["calls"] * 1000
+            lines.append(
+                f"{label}: calls={stats['calls']} total={stats['total']:.3f}s "
+                f"avg={average:.3f}ms max={stats['max'] * 1000:.3f}ms "
+                f"memory={stats['memory'] / 1024:.1f}KiB"
+            )
+            lines.extend(f"  {line}" for line in self._format_samples(stats["samples"], limit=5))
+            lines.append("")
+        self._write(os.path.join(self.output_dir, "ticks.txt"), lines)
+
+    def _format_samples(self, samples, limit=15):
+        """Summarize sampled stacks by leaf function and by full stack."""
+        total = sum(samples.values())
+        lines = [f"Samples: {total} (every {self.interval * 1000:.1f}ms)"]
+        if not total:
+            return lines
+        leaves = Counter()
+        for stack, count in samples.items():
+            leaves[stack[-1]] += count
+        lines.append("Top functions (self):")
+        for leaf, count in leaves.most_common(limit):
+            lines.append(f"  {count / total:6.1%}  {leaf}")
+        lines.append("Top stacks:")
+        for stack, count in samples.most_common(max(1, limit // 3)):
+            lines.append(f"  {count / total:6.1%}  " + " > ".join(stack[-6:]))
+        return lines
+
+    @staticmethod
+    def _write(path, lines):
+        """Write report lines to a file."""
+        with open(path, "w", encoding="utf-8") as report:
+            report.write("\n".join(lines) + "\n")
+
+
+profiler = Profiler()
+
+
+def profiled(kind):
+    """
+    Decorate a function so it is profiled while profiling is enabled.
+
+    Args:
+        kind (str): 'job' for per-call reports, 'tick' for aggregated callbacks
+
+    Returns:
+        callable: Decorator
+    """
+    def decorator(func):
+        label = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            # Methods are wrapped, so the first interesting argument follows self
+            detail = next((arg for arg in args[1:] if isinstance(arg, str)), "")
+            return profiler.run(kind, label, detail, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_from_environment(default_dir):
+    """
+    Enable profiling when ``STREAMQ_PROFILE`` is set.
+
+    The variable may be ``1`` to use ``default_dir`` or a directory path.
+
+    Args:
+        default_dir (str): Report directory used when the variable is ``1``
+    """
+    value = os.environ.get(ENV_VAR, "").strip()
+    if not value or value.lower() in ("0", "false", "no", "off"):
+        return
+    if value.lower() in ("1", "true", "yes", "on"):
+        value = default_dir
+    profiler.enable(value)
@@ -0,0 +1,326 @@
+"""Tk main-thread stall detection.
+
+A heartbeat is scheduled with ``after`` on a fixed interval. How late each
+beat fires is the event-loop latency the user feels: while a callback runs,
+a Treeview is rebuilt or a blocking dialog is open, beats cannot fire. A
+watchdog thread samples the main thread's stack while a beat is overdue, so
+every stall above the threshold is recorded with the callback that caused it.
+
+Latencies are counted in fixed histogram buckets, which makes reports from
+different runs directly comparable (``streamq stalls NEW.json OLD.json``).
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ENV_VAR = "STREAMQ_STALLS"
+
+# Upper bucket bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (5, 10, 20, 35, 50, 75, 100, 150, 250, 500, 1000, 2500, 5000)
+
+# Stalls kept in the report, longest first
+MAX_STALLS = 200
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallMonitor:
+    """Measures Tk event-loop latency and records stalls with their culprit."""
+
+    def __init__(self):
+        self.enabled = False
+        self.interval_ms = 20
+        self.threshold_ms = 100
+        self.output_dir = None
+        self.stack_depth = 20
+        self.master = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog = None
+        self._main_ident = None
+        self._expected = None
+        self._started = None
+        self._counts = [0] * (len(BUCKETS_MS) + 1)
+        self._beats = 0
+        self._max_ms = 0.0
+        self._samples = Counter()  # main-thread stacks seen during the current delay
+        self._stalls = []
+        self._culprits = {}
+
+    def start(self, master, output_dir, interval_ms=20, threshold_ms=100):
+        """
+        Start the heartbeat on ``master``; must be called on the Tk thread.
+
+        Args:
+            master: The root Tkinter window
+            output_dir (str): Directory for the report
+            interval_ms (int): Heartbeat interval
+            threshold_ms (int): Latency recorded as a stall
+        """
+        if self.enabled:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        self.master = master
+        self.output_dir = output_dir
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self._main_ident = threading.get_ident()
+        self._started = time.time()
+        self._expected = time.perf_counter() + interval_ms / 1000
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="streamq-stalls", daemon=True)
+        self._watchdog.start()
+        self.enabled = True
+        master.after(interval_ms, self._beat)
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Stop measuring and write the report.
+
+        Returns:
+            str or None: Path of the JSON report
+        """
+        if not self.enabled:
+            return None
+        self.enabled = False
+        self._stop.set()
+        self._watchdog.join(timeout=1)
+        return self._write_report()
+
+    def _beat(self):
+        """Heartbeat callback: record how late it ran and reschedule."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        latency_ms = max(0.0, (now - self._expected) * 1000)
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+            self._beats += 1
+            self._counts[self._bucket(latency_ms)] += 1
+            self._max_ms = max(self._max_ms, latency_ms)
+            if latency_ms >= self.threshold_ms:
+                self._record_stall(latency_ms, samples)
+        self._expected = now + self.interval_ms / 1000
+        self.master.after(self.interval_ms, self._beat)
+
+    def _watch(self):
+        """Sample the main thread's stack while a heartbeat is overdue."""
+        poll = max(0.002, self.interval_ms / 2000)
+        while not self._stop.wait(poll):
+            overdue_ms = (time.perf_counter() - self._expected) * 1000
+            if overdue_ms < self.threshold_ms / 2:
+                continue
+            frame = sys._current_frames().get(self._main_ident)
+            if frame is None:
+                continue
+            stack = self._collapse(frame)
+            with self._lock:
+                self._samples[stack] += 1
+
+    def _collapse(self, frame):
+        """Turn a frame into a tuple of (path, function, line), outermost first."""
+        stack = []
+        while frame is not None and len(stack) < self.stack_depth:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    @staticmethod
+    def _culprit(stack):
+        """Name the innermost StreamQ function on a stack, or its innermost frame."""
+        if stack and stack[-1][1] == "mainloop":
+            # No Python code running: Tk itself is redrawing or handling events
+            return "tkinter:mainloop (Tk redraw or event handling)"
+        for path, function, line in reversed(stack):
+            if path.startswith(_PACKAGE_DIR) and os.path.abspath(path) != os.path.abspath(__file__):
+                return f"{os.path.relpath(path, _PACKAGE_DIR)}:{function}:{line}"
+        if stack:
+            path, function, line = stack[-1]
+            return f"{os.path.basename(path)}:{function}:{line}"
+        return "unknown (between samples)"
+
+    @staticmethod
+    def _bucket(latency_ms):
+        """Index of the histogram bucket for a latency."""
+        for index, bound in enumerate(BUCKETS_MS):
+            if latency_ms <= bound:
+                return index
+        return len(BUCKETS_MS)
+
+    def _record_stall(self, latency_ms, samples):
+        """Store a stall and charge it to its most sampled culprit (lock held)."""
+        if samples:
+            stack = samples.most_common(1)[0][0]
+            culprit = self._culprit(stack)
+            leaf = " > ".join(f"{os.path.basename(path)}:{function}:{line}" for path, function, line in stack[-8:])
+        else:
+            culprit = self._culprit(())
+            leaf = ""
+        self._stalls.append({
+            "at": round(time.time() - self._started, 3),
+            "ms": round(latency_ms, 1),
+            "culprit": culprit,
+            "stack": leaf,
+        })
+        if len(self._stalls) > MAX_STALLS * 2:
+            self._stalls.sort(key=lambda stall: stall["ms"], reverse=True)
+            del self._stalls[MAX_STALLS:]
+        stats = self._culprits.setdefault(culprit, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + latency_ms, 1)
+        stats["max_ms"] = round(max(stats["max_ms"], latency_ms), 1)
+
+    def report(self):
+        """
+        Build the report data.
+
+        Returns:
+            dict: Run settings, histogram buckets, percentiles, culprits and
+                the longest stalls
+        """
+        with self._lock:
+            counts = list(self._counts)
+            stalls = sorted(self._stalls, key=lambda stall: stall["ms"], reverse=True)[:MAX_STALLS]
+            culprits = dict(sorted(self._culprits.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+            beats = self._beats
+            max_ms = self._max_ms
+        return {
+            "started": datetime.fromtimestamp(self._started).isoformat(timespec="seconds"),
+            "duration_s": round(time.time() - self._started, 1),
+            "interval_ms": self.interval_ms,
+            "threshold_ms": self.threshold_ms,
+            "beats": beats,
+            "buckets": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(list(BUCKETS_MS) + [None], counts)
+            ],
+            "percentiles_ms": {
+                name: _percentile(counts, beats, fraction)
+                for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))
+            },
+            "max_ms": round(max_ms, 1),
+            "stall_count": sum(stats["count"] for stats in culprits.values()),
+            "culprits": culprits,
+            "stalls": stalls,
+        }
+
+    def _write_report(self):
+        """Write the JSON report and a readable summary next to it."""
+        report = self.report()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"stalls-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as summary:
+            summary.write(format_report(report) + "\n")
+        return path
+
+
+def _percentile(counts, total, fraction):
+    """Upper bucket bound below which ``fraction`` of the beats fell."""
+    if not total:
+        return 0
+    needed = total * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS_MS, counts):
+        seen += count
+        if seen >= needed:
+            return bound
+    return None  # beyond the last bound
+
+
+def _format_bound(bound):
+    """Label for a percentile or bucket bound."""
+    return f"<={bound}ms" if bound is not None else f">{BUCKETS_MS[-1]}ms"
+
+
+def format_report(report, baseline=None):
+    """
+    Render a stall report, optionally next to a baseline run.
+
+    Args:
+        report (dict): Report loaded from a ``stalls-*.json`` file
+        baseline (dict): Earlier report to compare against
+
+    Returns:
+        str: Multi-line summary
+    """
+    def share(data, index):
+        beats = data["beats"] or 1
+        return data["buckets"][index]["count"] / beats
+
+    lines = [
+        f"Run: {report['started']}, {report['duration_s']}s, {report['beats']} heartbeats "
+        f"every {report['interval_ms']}ms, stalls >= {report['threshold_ms']}ms: {report['stall_count']}",
+    ]
+    if baseline:
+        lines.append(
+            f"Baseline: {baseline['started']}, {baseline['duration_s']}s, {baseline['beats']} heartbeats, "
+            f"stalls: {baseline['stall_count']}"
+        )
+    lines.append("")
+    lines.append("Latency histogram (share of heartbeats):")
+    for index, bucket in enumerate(report["buckets"]):
+        label = _format_bound(bucket["le_ms"])
+        line = f"  {label:>10}  {share(report, index):7.2%}  {'#' * round(share(report, index) * 50)}"
+        if baseline:
+            delta = share(report, index) - share(baseline, index)
+            line = f"  {label:>10}  {share(report, index):7.2%}  (was {share(baseline, index):7.2%}, {delta:+.2%})"
+        lines.append(line)
+    lines.append("")
+    for name, bound in report["percentiles_ms"].items():
+        line = f"  {name}: {_format_bound(bound)}"
+        if baseline:
+            line += f" (was {_format_bound(baseline['percentiles_ms'].get(name))})"
+        lines.append(line)
+    lines.append(f"  max: {report['max_ms']}ms" + (f" (was {baseline['max_ms']}ms)" if baseline else ""))
+    if report["culprits"]:
+        lines.append("")
+        lines.append("Stalls by culprit:")
+        for culprit, stats in list(report["culprits"].items())[:15]:
+            lines.append(
+                f"  {stats['count']:5d}x  total {stats['total_ms']:9.1f}ms  max {stats['max_ms']:8.1f}ms  {culprit}"
+            )
+    if report["stalls"]:
+        lines.append("")
+        lines.append("Longest stalls:")
+        for stall in report["stalls"][:10]:
+            lines.append(f"  {stall['ms']:8.1f}ms at {stall['at']:.1f}s  {stall['culprit']}")
+            if stall["stack"]:
+                lines.append(f"      {stall['stack']}")
+    return "\n".join(lines)
+
+
+def load_report(path):
+    """Read a ``stalls-*.json`` report."""
+    with open(path, "r", encoding="utf-8") as report_file:
+        return json.load(report_file)
+
+
+monitor = StallMonitor()
+
+
+def start_from_environment(master, default_dir):
+    """
+    Start the stall monitor when ``STREAMQ_STALLS`` is set.
+
+    The variable may be ``1`` to use ``default_dir`` or a directory path.
+
+    Args:
+        master: The root Tkinter window
+        default_dir (str): Report directory used when the variable is ``1``
+    """
+    value = os.environ.get(ENV_VAR, "").strip()
+    if not value or value.lower() in ("0", "false", "no", "off"):
+        return
+    if value.lower() in ("1", "true", "yes", "on"):
+        value = default_dir
+    monitor.start(master, value)
@@ -0,0 +1,72 @@
+"""Local oEmbed stub for exercising title lookups without network access.
+
+Run it and point ``title_endpoint`` at it::
+
+    python -m streamq.utils.title_stub --port 8765 --delay 0.05
+    streamq --set title_endpoint="http://127.0.0.1:8765/oembed?url={url}" titles URL ...
+
+Every request for ``/oembed?url=...`` is answered with a title derived from
+the URL after ``--delay`` seconds; URLs containing ``missing`` get a 404,
+like private or deleted videos.
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers oEmbed requests with generated titles."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, as real endpoints allow
+    delay = 0.0
+
+    def do_GET(self):
+        request = urlparse(self.path)
+        media_url = (parse_qs(request.query).get("url") or [""])[0]
+        time.sleep(self.delay)
+        if request.path != "/oembed" or not media_url or "missing" in media_url:
+            self._reply(404, {"error": "Not Found"})
+            return
+        name = urlparse(media_url).query or urlparse(media_url).path.rstrip("/").rpartition("/")[2]
+        self._reply(200, {"version": "1.0", "type": "video", "title": f"Stub video {name}"})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, delay=0.0):
+    """
+    Run the stub until interrupted.
+
+    Args:
+        port (int): Port on 127.0.0.1 (0 picks a free one)
+        delay (float): Seconds to wait before each response
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    print(f"oEmbed stub on http://127.0.0.1:{server.server_address[1]}/oembed?url={{url}}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local oEmbed stub for StreamQ title lookups.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before each response")
+    args = parser.parse_args()
+    serve(args.port, args.delay)
@@ -0,0 +1,90 @@
+"""Shared fixtures for the StreamQ test suite."""
+
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from streamq.config import ENV_PREFIX, config
+
+
+@pytest.fixture
+def knobs(tmp_path, monkeypatch):
+    """
+    Run a test on default settings with output under ``tmp_path``.
+
+    Call the fixture with knob values to override them, e.g.
+    ``knobs(rate_limit="8M")``.
+    """
+    for name in list(os.environ):
+        if name.startswith(ENV_PREFIX):
+            monkeypatch.delenv(name)
+    previous = (config.config_file, config.overrides)
+    values = {"download_dir": str(tmp_path / "Output")}
+
+    def apply(**changes):
+        values.update(changes)
+        config.load(str(tmp_path / "streamq.json"), [f"{name}={value}" for name, value in values.items()])
+        return config
+
+    apply()
+    yield apply
+    config.config_file, config.overrides = previous
+    config.load()
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` with Range and ETag support; paths in ``server.denied`` get a 403."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body):
+        data = self.server.files.get(self.path)
+        self.server.requests.append((self.command, self.path, self.headers.get("Range")))
+        if data is None or self.path in self.server.denied:
+            self.send_response(404 if data is None else 403)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = 0, len(data) - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{len(data)}"')
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if body:
+            self.wfile.write(data[start:end + 1])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Local media server; tests put bytes in ``server.files`` by path."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+    httpd.files = {}
+    httpd.denied = set()
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,83 @@
+"""Tests for the direct-HTTP download backend against a local server."""
+
+import os
+import re
+
+import pytest
+
+from streamq.core.backends import DirectHTTPBackend
+
+
+def payload(size, seed):
+    return bytes((index * seed) % 251 for index in range(size))
+
+
+def download(backend, url, output_dir, hook=None):
+    return backend.download(url, "video", "720", str(output_dir), hook or (lambda data: None))
+
+
+def test_same_file_name_from_different_urls_is_kept_apart(knobs, server, tmp_path):
+    knobs()
+    server.files["/a/clip.mp4"] = payload(5000, 3)
+    server.files["/b/clip.mp4"] = payload(7000, 7)
+    backend = DirectHTTPBackend()
+
+    first = download(backend, server.base + "/a/clip.mp4", tmp_path)
+    second = download(backend, server.base + "/b/clip.mp4", tmp_path)
+
+    assert first != second
+    with open(first, "rb") as handle:
+        assert handle.read() == server.files["/a/clip.mp4"]
+    with open(second, "rb") as handle:
+        assert handle.read() == server.files["/b/clip.mp4"]
+
+
+def test_rerun_skips_a_file_from_the_same_source(knobs, server, tmp_path):
+    knobs()
+    server.files["/clip.mp4"] = payload(5000, 3)
+    backend = DirectHTTPBackend()
+
+    first = download(backend, server.base + "/clip.mp4", tmp_path)
+    server.requests.clear()
+    second = download(backend, server.base + "/clip.mp4", tmp_path)
+
+    assert second == first
+    assert [request[0] for request in server.requests] == ["HEAD"]
+
+
+def test_changed_remote_file_is_downloaded_again(knobs, server, tmp_path):
+    knobs()
+    server.files["/clip.mp4"] = payload(5000, 3)
+    backend = DirectHTTPBackend()
+    download(backend, server.base + "/clip.mp4", tmp_path)
+
+    server.files["/clip.mp4"] = payload(6000, 5)
+    path = download(backend, server.base + "/clip.mp4", tmp_path)
+
+    with open(path, "rb") as handle:
+        assert handle.read() == server.files["/clip.mp4"]
+
+
+def test_interrupted_download_resumes_from_part_state(knobs, server, tmp_path):
+    knobs(http_connections=2)
+    server.files["/big.mp4"] = data = payload(40000, 11)
+    backend = DirectHTTPBackend(chunk_size=1000, min_split_size=10000)
+
+    def stop_midway(progress):
+        if progress["downloaded_bytes"] >= 6000:
+            raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        download(backend, server.base + "/big.mp4", tmp_path, stop_midway)
+    states = [name for name in os.listdir(tmp_path) if name.endswith(".part.state")]
+    assert len(states) == 1
+
+    server.requests.clear()
+    path = download(backend, server.base + "/big.mp4", tmp_path)
+
+    with open(path, "rb") as handle:
+        assert handle.read() == data
+    ranges = [re.fullmatch(r"bytes=(\d+)-(\d+)", request[2]) for request in server.requests if request[0] == "GET"]
+    requested = sum(int(match.group(2)) - int(match.group(1)) + 1 for match in ranges)
+    assert requested <= len(data) - 6000
+    assert not any(name.endswith((".part", ".part.state")) for name in os.listdir(tmp_path))
@@ -0,0 +1,161 @@
+"""Tests for adaptive (AIMD) concurrency."""
+
+import asyncio
+import urllib.error
+
+import pytest
+import yt_dlp
+
+from streamq.core.concurrency import AdaptiveController, is_rate_limited
+
+
+class FakeQueue:
+    """The parts of DownloadQueue the controller reads and adjusts."""
+
+    def __init__(self, max_workers=4, metadata_limit=4):
+        self.max_workers = max_workers
+        self.metadata_limit = metadata_limit
+        self.speed = 0.0
+        self.waiting_downloads = False
+        self.waiting_metadata = False
+        self.applied = []
+        self.download_manager = self
+
+    @property
+    def progress(self):
+        return self
+
+    def snapshot(self):
+        return {"speed": self.speed}
+
+    def metadata_slots_limit(self):
+        return self.metadata_limit
+
+    def has_waiting_downloads(self):
+        return self.waiting_downloads
+
+    def has_waiting_metadata(self):
+        return self.waiting_metadata
+
+    async def apply_limits(self, download_limit, metadata_limit, decision):
+        self.max_workers = download_limit
+        self.metadata_limit = metadata_limit
+        self.applied.append(decision)
+
+
+@pytest.fixture
+def controlled(knobs):
+    """A controller on a fake queue with an idle CPU."""
+    knobs(adaptive_min_workers=1, adaptive_max_workers=8, metadata_workers=4)
+    queue = FakeQueue()
+    controller = AdaptiveController(queue)
+    controller.cpu_load = lambda: 0.1
+    return queue, controller
+
+
+def step(controller):
+    asyncio.run(controller.step())
+
+
+@pytest.mark.parametrize("error", [
+    "ERROR: [youtube] abc: Unable to download webpage: HTTP Error 429: Too Many Requests",
+    "Too Many Requests",
+    urllib.error.HTTPError("https://example.com", 429, "Too Many Requests", {}, None),
+])
+def test_rate_limited(error):
+    assert is_rate_limited(error)
+
+
+def test_rate_limited_reads_the_status_yt_dlp_wrapped():
+    cause = urllib.error.HTTPError("https://example.com", 429, "Slow down", {}, None)
+    error = yt_dlp.utils.DownloadError("ERROR: unable to download", exc_info=(type(cause), cause, None))
+
+    assert is_rate_limited(error)
+
+
+@pytest.mark.parametrize("error", [
+    "ERROR: [youtube] xA429bQ: Video unavailable",
+    "Got 14290 bytes, expected 20000",
+    "Failed to connect to 127.0.0.1:4290",
+    urllib.error.HTTPError("https://example.com/429", 404, "Not Found", {}, None),
+    None,
+])
+def test_not_rate_limited(error):
+    assert not is_rate_limited(error)
+
+
+def test_rate_limiting_halves_both_limits(controlled):
+    queue, controller = controlled
+    controller.record("download", "HTTP Error 429: Too Many Requests")
+
+    step(controller)
+
+    assert (queue.max_workers, queue.metadata_limit) == (2, 2)
+    assert queue.applied[-1]["action"] == "decrease"
+
+
+def test_error_rate_halves_downloads(controlled):
+    queue, controller = controlled
+    for error in (None, None, None, "HTTP Error 500", "HTTP Error 503"):
+        controller.record("download", error)
+
+    step(controller)
+
+    assert (queue.max_workers, queue.metadata_limit) == (2, 4)
+    assert queue.applied[-1]["reason"] == "error rate 40%"
+
+
+def test_saturated_cpu_halves_downloads(controlled):
+    queue, controller = controlled
+    controller.cpu_load = lambda: 0.95
+
+    step(controller)
+
+    assert queue.max_workers == 2
+    assert queue.applied[-1]["reason"] == "CPU load 95%"
+
+
+def test_busy_slots_grow_the_limit_by_one(controlled):
+    queue, controller = controlled
+    queue.waiting_downloads = queue.waiting_metadata = True
+
+    step(controller)
+    queue.speed = 200.0
+    step(controller)
+
+    assert (queue.max_workers, queue.metadata_limit) == (6, 4)
+
+
+def test_unproductive_increase_is_undone_and_held(controlled):
+    queue, controller = controlled
+    queue.waiting_downloads = True
+    queue.speed = 100.0
+    step(controller)
+    assert queue.max_workers == 5
+
+    # Less than 5% faster: back to 4, then hold for 6 intervals (30 s at the default 5 s)
+    queue.speed = 103.0
+    step(controller)
+    assert queue.max_workers == 4
+    for _ in range(controller.hold_intervals):
+        step(controller)
+        assert queue.max_workers == 4
+        assert controller.metrics()["last"]["reason"] == "holding after an unproductive increase"
+
+    step(controller)
+    assert queue.max_workers == 5
+
+
+def test_limits_stay_within_the_configured_range(controlled, knobs):
+    queue, controller = controlled
+    knobs(adaptive_min_workers=3, adaptive_max_workers=4)
+    controller.record("download", "HTTP Error 429")
+    step(controller)
+    assert queue.max_workers == 3
+
+    queue.waiting_downloads = True
+    step(controller)
+    queue.speed = 500.0
+    step(controller)
+    assert queue.max_workers == 4
+    assert controller.metrics()["last"]["reason"] == "at the maximum"
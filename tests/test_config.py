@@ -0,0 +1,151 @@
+"""Tests for configuration layering and validation."""
+
+import json
+import os
+
+import pytest
+
+from streamq.config import ENV_PREFIX, Config, ConfigError, parse_bool, parse_bytes
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """A fresh Config reading ``tmp_path/streamq.json``, with no STREAMQ_* variables set."""
+    for name in list(os.environ):
+        if name.startswith(ENV_PREFIX):
+            monkeypatch.delenv(name)
+    instance = Config()
+    instance.config_file = str(tmp_path / "streamq.json")
+    return instance
+
+
+def write(settings, **values):
+    with open(settings.config_file, "w", encoding="utf-8") as config_file:
+        json.dump(values, config_file)
+
+
+def test_defaults_apply_without_a_config_file(settings):
+    settings.load()
+
+    assert settings.download_workers == 1
+    assert settings.rate_limit == 0
+    assert settings.disk_min_free == 512 * 1024 ** 2
+
+
+def test_file_then_environment_then_command_line(settings, monkeypatch):
+    write(settings, download_workers=2, lookahead=5, rate_limit="1M")
+    monkeypatch.setenv("STREAMQ_DOWNLOAD_WORKERS", "3")
+    monkeypatch.setenv("STREAMQ_LOOKAHEAD", "6")
+
+    settings.load(overrides=["download-workers=4"])
+
+    assert settings.download_workers == 4
+    assert settings.lookahead == 6
+    assert settings.rate_limit == 1024 ** 2
+
+
+def test_download_dir_moves_the_output_folders(settings, tmp_path):
+    settings.load(overrides=[f"download_dir={tmp_path / 'media'}"])
+
+    assert settings.get_download_dir("audio") == str(tmp_path / "media" / "audio")
+    assert settings.get_download_dir("video") == str(tmp_path / "media" / "video")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("500K", 500 * 1024),
+    ("2.5M", int(2.5 * 1024 ** 2)),
+    ("1GiB", 1024 ** 3),
+    (" 64 kb ", 64 * 1024),
+    ("100", 100),
+    (4096, 4096),
+])
+def test_parse_bytes(text, expected):
+    assert parse_bytes(text) == expected
+
+
+@pytest.mark.parametrize("text", ["fast", "-1M", "1T", True])
+def test_parse_bytes_rejects(text):
+    with pytest.raises(ValueError):
+        parse_bytes(text)
+
+
+def test_parse_bool():
+    assert parse_bool("Yes") is True
+    assert parse_bool("off") is False
+    with pytest.raises(ValueError, match="true or false"):
+        parse_bool("maybe")
+
+
+def test_error_names_the_setting_and_its_source(settings, monkeypatch):
+    monkeypatch.setenv("STREAMQ_DOWNLOAD_WORKERS", "64")
+
+    with pytest.raises(ConfigError, match=r"'download_workers' from \$STREAMQ_DOWNLOAD_WORKERS: must be at most 32"):
+        settings.load()
+
+
+def test_malformed_file_value_is_rejected(settings):
+    write(settings, stream_transcode="sometimes")
+
+    with pytest.raises(ConfigError, match=r"'stream_transcode' from .*streamq\.json: expected true or false"):
+        settings.load()
+
+
+def test_unknown_file_setting_is_rejected(settings):
+    write(settings, download_worker=2)
+
+    with pytest.raises(ConfigError, match="Unknown setting.*download_worker"):
+        settings.load()
+
+
+@pytest.mark.parametrize("override, message", [
+    ("download_workers", "expected name=value"),
+    ("workers=2", "Unknown setting 'workers'"),
+    ("lookahead=-1", "must be at least 0"),
+])
+def test_bad_override_is_rejected(settings, override, message):
+    with pytest.raises(ConfigError, match=message):
+        settings.load(overrides=[override])
+
+
+def test_adaptive_minimum_above_maximum_is_rejected(settings):
+    write(settings, adaptive_max_workers=4)
+
+    with pytest.raises(ConfigError, match=r"'adaptive_min_workers' \(6\) exceeds 'adaptive_max_workers' \(4\)"):
+        settings.load(overrides=["adaptive_min_workers=6"])
+
+
+def test_failed_load_keeps_the_previous_values_and_layers(settings):
+    settings.load(overrides=["download_workers=3"])
+
+    with pytest.raises(ConfigError):
+        settings.load(overrides=["download_workers=0"])
+
+    assert settings.download_workers == 3
+    assert settings.overrides == {"download_workers": "3"}
+
+
+def test_reload_applies_hot_settings_and_reports_the_rest(settings):
+    write(settings, download_workers=2)
+    settings.load()
+    received = []
+    settings.add_listener(received.append)
+
+    write(settings, download_workers=5, metadata_workers=8)
+    changes, restart = settings.reload()
+
+    assert changes == {"download_workers": 5}
+    assert restart == ["metadata_workers"]
+    assert received == [{"download_workers": 5}]
+    assert settings.download_workers == 5
+    assert settings.metadata_workers == 4
+
+
+def test_rejected_reload_keeps_the_old_values(settings):
+    write(settings, download_workers=2)
+    settings.load()
+
+    write(settings, download_workers="many")
+    with pytest.raises(ConfigError):
+        settings.reload()
+
+    assert settings.download_workers == 2
@@ -0,0 +1,97 @@
+"""Tests for disk-space reservations."""
+
+from collections import namedtuple
+
+import pytest
+
+from streamq.core import diskspace
+from streamq.core.diskspace import DiskReservations
+
+Usage = namedtuple("Usage", "total used free")
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def volume(monkeypatch):
+    """Fake free space on every volume; set ``volume.free`` to change it."""
+
+    class Volume:
+        free = 1000 * MIB
+        readings = 0
+
+    def disk_usage(path):
+        Volume.readings += 1
+        return Usage(2 * Volume.free, Volume.free, Volume.free)
+
+    monkeypatch.setattr(diskspace.shutil, "disk_usage", disk_usage)
+    return Volume
+
+
+@pytest.fixture
+def disk(knobs):
+    knobs(disk_min_free="100M", disk_headroom_percent=0, disk_default_estimate="50M")
+    return DiskReservations(refresh_interval=60)
+
+
+def test_reserves_while_space_is_left(volume, disk, tmp_path):
+    assert disk.try_reserve("a", tmp_path, 500 * MIB)
+    assert disk.available(tmp_path) == 400 * MIB
+    assert not disk.try_reserve("b", tmp_path, 450 * MIB)
+    assert disk.try_reserve("c", tmp_path, 400 * MIB)
+    assert disk.available(tmp_path) == 0
+
+
+def test_reserving_the_same_job_again_holds_no_extra_space(volume, disk, tmp_path):
+    assert disk.try_reserve("a", tmp_path, 300 * MIB)
+    assert disk.try_reserve("a", tmp_path, 300 * MIB)
+    assert disk.summary() == {"jobs": 1, "reserved": 300 * MIB}
+
+
+def test_unknown_size_uses_the_default_estimate_and_headroom(volume, knobs, tmp_path):
+    knobs(disk_min_free="100M", disk_headroom_percent=100, disk_default_estimate="50M")
+    disk = DiskReservations()
+
+    assert disk.try_reserve("a", tmp_path, None)
+    assert disk.available(tmp_path) == 800 * MIB
+
+
+def test_adjust_follows_the_real_size(volume, disk, tmp_path):
+    disk.try_reserve("a", tmp_path, None)
+
+    disk.adjust("a", 300 * MIB, 100 * MIB)
+
+    assert disk.available(tmp_path) == 600 * MIB
+    assert disk.summary() == {"jobs": 1, "reserved": 200 * MIB}
+
+
+def test_release_frees_the_space(volume, disk, tmp_path):
+    disk.try_reserve("a", tmp_path, 500 * MIB)
+    disk.release("a")
+    disk.adjust("a", 900 * MIB, 0)
+
+    assert disk.available(tmp_path) == 900 * MIB
+    assert disk.summary() == {"jobs": 0, "reserved": 0}
+
+
+def test_free_space_is_read_once_per_refresh_interval(volume, disk, tmp_path):
+    for _ in range(5):
+        disk.available(tmp_path)
+    assert volume.readings == 1
+
+    disk.available(tmp_path, refresh=True)
+    assert volume.readings == 2
+
+
+def test_bytes_written_before_a_refresh_are_not_counted_twice(volume, disk, tmp_path):
+    disk.try_reserve("a", tmp_path, 500 * MIB)
+    disk.adjust("a", 500 * MIB, 200 * MIB)
+    # The cached reading predates the writes, so the whole reservation is outstanding
+    assert disk.available(tmp_path) == 400 * MIB
+
+    volume.free -= 200 * MIB
+    assert disk.available(tmp_path, refresh=True) == 400 * MIB
+
+    disk.adjust("a", 500 * MIB, 300 * MIB)
+    volume.free -= 100 * MIB
+    assert disk.available(tmp_path, refresh=True) == 400 * MIB
@@ -0,0 +1,471 @@
+"""Tests for how the download queue drives the download manager."""
+
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from streamq.config import config
+from streamq.core import diskspace, metadata
+from streamq.core.downloader import DownloadManager, DownloadQueue
+from streamq.core.metadata import MediaInfo
+
+MIB = 1024 * 1024
+
+Usage = namedtuple("Usage", "total used free")
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(**kwargs):
+        download_queue = DownloadQueue(DownloadManager(None), **kwargs)
+        queues.append(download_queue)
+        return download_queue
+
+    yield make
+    for download_queue in queues:
+        config.remove_listener(download_queue._on_config_changed)
+        download_queue.engine.submit(cancel_tasks()).result(timeout=5)
+        download_queue.engine.close()
+
+
+class Events:
+    """Records what a queue reports through its callbacks."""
+
+    def __init__(self, download_queue):
+        self.statuses = []
+        self.results = []
+        self.finished = threading.Event()
+        download_queue.set_status_callback(lambda kind, *args: self.statuses.append((kind, args)))
+        download_queue.set_completion_callback(self._completed)
+
+    def _completed(self, *args):
+        self.results.append(args)
+        self.finished.set()
+
+    def disk_waits(self):
+        return [args[0] for kind, args in self.statuses if kind == "disk_wait"]
+
+
+class FakeDownloads:
+    """
+    Stands in for ``DownloadManager.download_video``.
+
+    Writes ``size`` bytes into ``NAME.mp4.part`` chunk by chunk, reporting
+    progress like yt-dlp and resuming from an existing part file. Downloads
+    whose URL is in ``held`` stop after each chunk until ``release`` is set.
+    """
+
+    def __init__(self, manager, size=64 * 1024, chunk=8 * 1024):
+        self.manager = manager
+        self.size = size
+        self.chunk = chunk
+        self.calls = []
+        self.held = set()
+        self.release = threading.Event()
+        self.running = {}  # url -> threading.Event set once the download writes
+        manager.download_video = self.download_video
+
+    def started(self, url):
+        return self.running.setdefault(url, threading.Event())
+
+    def download_video(self, url, format_type, quality, index=1, total=1, archive_path=None,
+                       control=None, job_key=None, info=None):
+        self.calls.append((url, info))
+        download_dir = config.get_download_dir(format_type)
+        os.makedirs(download_dir, exist_ok=True)
+        path = os.path.join(download_dir, url.rpartition("=")[2] + ".mp4")
+        size = (info or {}).get("filesize") or self.size
+        with open(path + ".part", "ab") as part_file:
+            done = part_file.tell()
+            while done < size:
+                control.check()
+                written = min(self.chunk, size - done)
+                part_file.write(b"x" * written)
+                part_file.flush()
+                done += written
+                self.manager._handle_progress(
+                    {"status": "downloading", "downloaded_bytes": done, "total_bytes": size,
+                     "filename": path, "info_dict": info or {}},
+                    url, index, total, job_key,
+                )
+                self.started(url).set()
+                while url in self.held and not self.release.is_set():
+                    control.check()
+                    time.sleep(0.005)
+        os.replace(path + ".part", path)
+        return path
+
+
+class FakeResolver:
+    """
+    Stands in for ``DownloadManager.resolve``.
+
+    Media URLs expire ``lifetime`` seconds after ``clock()``. Resolutions of
+    URLs in ``held`` wait until ``release`` is set.
+    """
+
+    def __init__(self, manager, size=64 * 1024, lifetime=6 * 3600, clock=time.time):
+        self.size = size
+        self.lifetime = lifetime
+        self.clock = clock
+        self.calls = []
+        self.held = set()
+        self.release = threading.Event()
+        manager.resolve = self.resolve
+
+    def resolve(self, url, format_type, quality):
+        self.calls.append(url)
+        if url in self.held:
+            self.release.wait(5)
+        video_id = url.rpartition("=")[2]
+        info = {
+            "id": video_id,
+            "title": f"Video {video_id}",
+            "format_id": "18",
+            "filesize": self.size,
+            "url": f"https://media.example.com/{video_id}?expire={int(self.clock() + self.lifetime)}",
+            "resolution_number": len(self.calls),
+        }
+        return info, MediaInfo.from_info(info)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+async def cancel_tasks():
+    """Stop the queue's background tasks so the engine closes cleanly."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_rate_limit_is_split_across_the_queue_slots(knobs, make_queue):
+    knobs(rate_limit="8M", download_workers=1)
+    download_queue = make_queue(max_workers=4)
+    ydl_opts = {}
+
+    download_queue.download_manager._apply_transfer_options(ydl_opts)
+
+    assert ydl_opts["ratelimit"] == 2 * 1024 * 1024
+
+
+def test_rate_limit_follows_a_resized_queue(knobs, make_queue):
+    knobs(rate_limit="8M")
+    download_queue = make_queue(max_workers=4)
+
+    async def resize():
+        download_queue._set_max_workers(2)
+
+    download_queue.engine.submit(resize()).result(timeout=5)
+
+    assert download_queue.download_manager.job_rate_limit() == 4 * 1024 * 1024
+
+
+def test_no_rate_limit_by_default(knobs, make_queue):
+    knobs()
+    ydl_opts = {}
+
+    make_queue(max_workers=4).download_manager._apply_transfer_options(ydl_opts)
+
+    assert "ratelimit" not in ydl_opts
+
+
+def test_entry_too_large_for_an_idle_volume_fails_instead_of_waiting(knobs, make_queue, monkeypatch):
+    knobs(lookahead=0)
+    monkeypatch.setattr(diskspace.shutil, "disk_usage", lambda path: Usage(900 * MIB, 0, 900 * MIB))
+    download_queue = make_queue(max_workers=2)
+    downloads = FakeDownloads(download_queue.download_manager)
+    events = Events(download_queue)
+
+    entry = download_queue.add_to_queue("https://example.com/watch?v=large", "item", fetch_title=False)
+    # A resolved size the volume cannot hold even with nothing else running
+    entry["metadata"] = MediaInfo("large", "Large", size=300 * MIB, format_ids=("18",))
+    download_queue.process_queue("video", "720")
+
+    assert events.finished.wait(5)
+    assert entry["status"] == "Failed"
+    (url, error), = events.results[0][1]
+    assert url == entry["url"]
+    assert error == "Not enough disk space: needs 600.0 MiB, 388.0 MiB can be used"
+    assert downloads.calls == []
+
+
+def test_small_entry_of_unknown_size_runs_on_a_nearly_full_volume(knobs, make_queue, monkeypatch):
+    knobs()
+    monkeypatch.setattr(diskspace.shutil, "disk_usage", lambda path: Usage(900 * MIB, 0, 900 * MIB))
+    download_queue = make_queue(max_workers=2)
+    manager = download_queue.download_manager
+    info = {"id": "small", "title": "Small", "format_id": "18", "filesize": 5 * MIB}
+    monkeypatch.setattr(manager, "resolve", lambda url, format_type, quality: (info, MediaInfo.from_info(info)))
+    downloads = FakeDownloads(manager)
+    events = Events(download_queue)
+
+    entry = download_queue.add_to_queue("https://example.com/watch?v=small", "item", fetch_title=False)
+    download_queue.process_queue("video", "720")
+
+    assert events.finished.wait(5)
+    assert entry["status"] == "Completed"
+    assert downloads.calls == [(entry["url"], info)]
+    assert os.path.getsize(os.path.join(config.video_dir, "small.mp4")) == 5 * MIB
+    assert manager.disk.summary() == {"jobs": 0, "reserved": 0}
+
+
+def test_pause_all_ends_the_batch_without_a_disk_wait(knobs, make_queue):
+    knobs(lookahead=0)
+    download_queue = make_queue(max_workers=1)
+    downloads = FakeDownloads(download_queue.download_manager)
+    events = Events(download_queue)
+    first = download_queue.add_to_queue("https://example.com/watch?v=first", "1", fetch_title=False)
+    second = download_queue.add_to_queue("https://example.com/watch?v=second", "2", fetch_title=False)
+    downloads.held.add(first["url"])
+    download_queue.process_queue("video", "720")
+    assert downloads.started(first["url"]).wait(5)
+
+    paused = time.monotonic()
+    download_queue.pause_all()
+
+    assert events.finished.wait(5)
+    assert time.monotonic() - paused < 1
+    assert (first["status"], second["status"]) == ("Paused", "Paused")
+    assert events.disk_waits() == []
+
+
+def run_behind(download_queue, downloads, first_url, *urls, format_type="video"):
+    """Start a batch whose first download is held, so the others wait in ``ready``."""
+    downloads.held.add(first_url)
+    entries = [download_queue.add_to_queue(url, str(index), fetch_title=False)
+               for index, url in enumerate((first_url,) + urls)]
+    download_queue.process_queue(format_type, "720")
+    assert downloads.started(first_url).wait(5)
+    return entries
+
+
+def test_ready_resolution_is_used(knobs, make_queue):
+    knobs(lookahead=2)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    resolver = FakeResolver(manager)
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+    wait_for(lambda: download_queue.get_lookahead_metrics()["ready"] == 1)
+
+    downloads.release.set()
+
+    assert events.finished.wait(5)
+    assert (first["status"], second["status"]) == ("Completed", "Completed")
+    assert [info["id"] for url, info in downloads.calls if info] == ["b"]
+    assert second["metadata"].size == 64 * 1024
+    counts = download_queue.get_lookahead_metrics()
+    assert (counts["used"], counts["waited"], counts["missed"]) == (1, 0, 1)
+
+
+def test_resolution_in_flight_is_waited_for(knobs, make_queue):
+    knobs(lookahead=2)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    resolver = FakeResolver(manager)
+    resolver.held.add("https://example.com/watch?v=b")
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+    wait_for(lambda: resolver.calls == [second["url"]])
+
+    downloads.release.set()
+    wait_for(lambda: download_queue.get_lookahead_metrics()["waited"] == 1)
+    resolver.release.set()
+
+    assert events.finished.wait(5)
+    url, info = downloads.calls[-1]
+    assert (url, info["id"]) == (second["url"], "b")
+    assert download_queue.get_lookahead_metrics()["used"] == 1
+
+
+def test_resolution_close_to_expiry_is_resolved_again(knobs, make_queue, monkeypatch):
+    knobs(lookahead=2)
+    now = [time.time()]
+    monkeypatch.setattr(metadata, "time", type("Clock", (), {"time": staticmethod(lambda: now[0])}))
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    resolver = FakeResolver(manager, lifetime=400, clock=lambda: now[0])
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+    wait_for(lambda: download_queue.get_lookahead_metrics()["ready"] == 1)
+
+    # Four minutes from expiry, inside the 5-minute margin; a new entry wakes the scheduler
+    now[0] += 160
+    download_queue.add_to_queue("https://example.com/watch?v=c", "c", fetch_title=False)
+    download_queue.process_queue("video", "720")
+    wait_for(lambda: resolver.calls.count(second["url"]) == 2)
+    downloads.release.set()
+
+    assert events.finished.wait(5)
+    used = {url: info for url, info in downloads.calls}
+    assert used[second["url"]]["resolution_number"] == 2
+    assert download_queue.get_lookahead_metrics()["expired"] == 1
+
+
+def test_variant_and_direct_http_entries_are_not_resolved(knobs, make_queue):
+    knobs(lookahead=4)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    resolver = FakeResolver(manager)
+    events = Events(download_queue)
+    downloads.held.add("https://example.com/watch?v=a")
+    download_queue.add_to_queue("https://example.com/watch?v=a", "a", fetch_title=False)
+    download_queue.add_to_queue("https://example.com/watch?v=v", "v", fetch_title=False,
+                                variants=[("audio", "192"), ("video", "720")])
+    download_queue.add_to_queue("https://cdn.example.com/clip.mp4", "d", fetch_title=False)
+    download_queue.add_to_queue("https://example.com/watch?v=b", "b", fetch_title=False)
+    download_queue.process_queue("video", "720")
+    assert downloads.started("https://example.com/watch?v=a").wait(5)
+
+    wait_for(lambda: resolver.calls == ["https://example.com/watch?v=b"])
+    download_queue.cancel_all()
+    assert events.finished.wait(5)
+    assert resolver.calls == ["https://example.com/watch?v=b"]
+
+
+def test_resolved_size_admits_an_entry_the_default_estimate_held_back(knobs, make_queue, monkeypatch):
+    knobs(lookahead=2)
+    monkeypatch.setattr(diskspace.shutil, "disk_usage", lambda path: Usage(900 * MIB, 0, 900 * MIB))
+    download_queue = make_queue(max_workers=2)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    resolver = FakeResolver(manager, size=5 * MIB)
+    resolver.held.add("https://example.com/watch?v=b")
+    events = Events(download_queue)
+    first = download_queue.add_to_queue("https://example.com/watch?v=a", "a", fetch_title=False)
+    first["metadata"] = MediaInfo("a", "A", size=MIB, format_ids=("18",))
+    downloads.held.add(first["url"])
+    second = download_queue.add_to_queue("https://example.com/watch?v=b", "b", fetch_title=False)
+    download_queue.process_queue("video", "720")
+    assert downloads.started(first["url"]).wait(5)
+
+    # 512 MiB for an unknown size does not fit next to the running download
+    wait_for(lambda: events.disk_waits() and events.disk_waits()[-1]["waiting"] == 1)
+    assert second["status"] == "Pending"
+
+    resolver.release.set()
+    assert downloads.started(second["url"]).wait(5)
+    assert first["status"] == "Downloading"
+    downloads.release.set()
+    assert events.finished.wait(5)
+    assert (first["status"], second["status"]) == ("Completed", "Completed")
+
+
+def test_store_worker_jobs_are_not_counted_as_missed(knobs, make_queue):
+    knobs(lookahead=2)
+    download_queue = make_queue(max_workers=1)
+    FakeDownloads(download_queue.download_manager)
+    entry = download_queue.add_to_queue("https://example.com/watch?v=w", "w", fetch_title=False)
+
+    assert download_queue.run_entry(entry, "video", "720") is None
+
+    assert entry["status"] == "Completed"
+    assert download_queue.get_lookahead_metrics()["missed"] == 0
+
+
+def test_pausing_a_running_entry_frees_its_slot_and_keeps_the_part_file(knobs, make_queue):
+    knobs(lookahead=0)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+    downloads.held.add(second["url"])
+
+    download_queue.pause_entry(first)
+
+    assert downloads.started(second["url"]).wait(5)
+    assert first["status"] == "Paused"
+    part_path = os.path.join(config.video_dir, "a.mp4.part")
+    assert os.path.getsize(part_path) == 8 * 1024
+    assert manager.progress.job_bytes(id(first)) == (64 * 1024, 8 * 1024)
+    assert manager.disk.summary()["jobs"] == 1
+    snapshot = manager.progress.snapshot()
+    assert (snapshot["active"], snapshot["pending"]) == (1, 0)
+
+    download_queue.cancel_all()
+    assert events.finished.wait(5)
+
+
+def test_resumed_entry_joins_the_running_batch_and_continues_its_part_file(knobs, make_queue):
+    knobs(lookahead=0)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+    downloads.held.add(second["url"])
+    download_queue.pause_entry(first)
+    assert downloads.started(second["url"]).wait(5)
+
+    download_queue.resume_entry(first)
+    wait_for(lambda: first["status"] == "Pending")
+    assert manager.progress.snapshot()["pending"] == 1
+    downloads.release.set()
+
+    assert events.finished.wait(5)
+    assert len(events.results) == 1
+    assert (first["status"], second["status"]) == ("Completed", "Completed")
+    assert os.path.getsize(os.path.join(config.video_dir, "a.mp4")) == 64 * 1024
+    snapshot = manager.progress.snapshot()
+    assert (snapshot["done"], snapshot["total"]) == (128 * 1024, 128 * 1024)
+    assert manager.disk.summary() == {"jobs": 0, "reserved": 0}
+
+
+def test_entry_resumed_before_it_left_the_ready_deque_counts_as_pending(knobs, make_queue):
+    knobs(lookahead=0)
+    download_queue = make_queue(max_workers=1)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    events = Events(download_queue)
+    first, second = run_behind(download_queue, downloads, "https://example.com/watch?v=a", "https://example.com/watch?v=b")
+
+    download_queue.pause_entry(second)
+    download_queue.resume_entry(second)
+    wait_for(lambda: second["status"] == "Pending")
+
+    snapshot = manager.progress.snapshot()
+    assert (snapshot["active"], snapshot["pending"]) == (1, 1)
+    downloads.release.set()
+    assert events.finished.wait(5)
+    assert second["status"] == "Completed"
+
+
+def test_cancel_all_stops_every_entry_and_clears_the_books(knobs, make_queue):
+    knobs(lookahead=0)
+    download_queue = make_queue(max_workers=2)
+    manager = download_queue.download_manager
+    downloads = FakeDownloads(manager)
+    events = Events(download_queue)
+    downloads.held.add("https://example.com/watch?v=b")
+    entries = run_behind(
+        download_queue, downloads,
+        "https://example.com/watch?v=a", "https://example.com/watch?v=b", "https://example.com/watch?v=c",
+    )
+    assert downloads.started("https://example.com/watch?v=b").wait(5)
+
+    download_queue.cancel_all()
+
+    assert events.finished.wait(5)
+    assert [entry["status"] for entry in entries] == ["Cancelled"] * 3
+    assert manager.progress.snapshot()["jobs"] == 0
+    assert manager.disk.summary() == {"jobs": 0, "reserved": 0}
+    # Partial data is kept for a later resume
+    assert os.path.exists(os.path.join(config.video_dir, "a.mp4.part"))
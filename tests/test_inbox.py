@@ -0,0 +1,106 @@
+"""Tests for the watched inbox."""
+
+import os
+
+from streamq.core.inbox import InboxWatcher
+
+
+class FakeQueue:
+    """Records queued URLs the way DownloadQueue hands out entries."""
+
+    def __init__(self):
+        self.entries = []
+
+    def add_to_queue(self, url, item_id, fetch_title=True, variants=None):
+        entry = {"url": url, "item_id": item_id, "status": "Pending"}
+        self.entries.append(entry)
+        return entry
+
+    def get_pending_count(self):
+        return sum(1 for entry in self.entries if entry["status"] == "Pending")
+
+    def process_queue(self, format_type, quality):
+        pass
+
+
+def write_urls(path, urls):
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.writelines(url + "\n" for url in urls)
+
+
+def watcher(inbox, download_queue):
+    return InboxWatcher(str(inbox), download_queue, "audio", "192", settle=0)
+
+
+def test_lines_are_read_once(knobs, tmp_path):
+    knobs()
+    write_urls(tmp_path / "urls.txt", ["https://example.com/1", "https://example.com/2"])
+    download_queue = FakeQueue()
+    inbox = watcher(tmp_path, download_queue)
+
+    inbox.scan()
+    inbox.scan()
+
+    assert [entry["url"] for entry in download_queue.entries] == ["https://example.com/1", "https://example.com/2"]
+
+
+def test_restart_queues_unfinished_urls_again(knobs, tmp_path):
+    knobs()
+    urls = ["https://example.com/1", "https://example.com/2", "https://example.com/3"]
+    write_urls(tmp_path / "urls.txt", urls)
+    first_queue = FakeQueue()
+    first = watcher(tmp_path, first_queue)
+    first.scan()
+    first_queue.entries[0]["status"] = "Completed"
+    first_queue.entries[1]["status"] = "Downloading"
+    first.stop()
+
+    second_queue = FakeQueue()
+    second = watcher(tmp_path, second_queue)
+    second.scan()
+
+    assert [entry["url"] for entry in second_queue.entries] == urls[1:]
+    assert second.unfinished == urls[1:]
+
+
+def test_finished_urls_leave_the_state(knobs, tmp_path):
+    knobs()
+    write_urls(tmp_path / "urls.txt", ["https://example.com/1", "https://example.com/2"])
+    download_queue = FakeQueue()
+    inbox = watcher(tmp_path, download_queue)
+    inbox.scan()
+    for entry, status in zip(download_queue.entries, ("Failed", "Cancelled")):
+        entry["status"] = status
+    inbox.stop()
+
+    restarted_queue = FakeQueue()
+    watcher(tmp_path, restarted_queue).scan()
+
+    assert restarted_queue.entries == []
+
+
+def test_backlog_limit_leaves_lines_unread(knobs, tmp_path):
+    knobs(inbox_max_backlog=2)
+    write_urls(tmp_path / "urls.txt", [f"https://example.com/{number}" for number in range(5)])
+    download_queue = FakeQueue()
+    inbox = watcher(tmp_path, download_queue)
+
+    assert inbox.scan() is True
+    assert len(download_queue.entries) == 2
+    for entry in download_queue.entries:
+        entry["status"] = "Completed"
+    inbox.scan()
+    assert len(download_queue.entries) == 4
+
+
+def test_older_state_files_keep_their_offsets(knobs, tmp_path):
+    knobs()
+    write_urls(tmp_path / "urls.txt", ["https://example.com/1"])
+    stat = os.stat(tmp_path / "urls.txt")
+    with open(tmp_path / ".streamq-inbox.json", "w", encoding="utf-8") as handle:
+        handle.write(f'{{"urls.txt": {{"offset": {stat.st_size}, "inode": {stat.st_ino}}}}}')
+    download_queue = FakeQueue()
+
+    watcher(tmp_path, download_queue).scan()
+
+    assert download_queue.entries == []
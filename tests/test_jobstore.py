@@ -0,0 +1,103 @@
+"""Tests for the shared SQLite job store."""
+
+import time
+
+import pytest
+
+from streamq.core.jobstore import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = JobStore(str(tmp_path / "jobs.db"), max_attempts=2)
+    yield job_store
+    job_store.close()
+
+
+def expire(store, job_id):
+    store._connection().execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_enqueue_ignores_duplicates(store):
+    first = store.enqueue("https://example.com/1", "audio", "192")
+    assert store.enqueue("https://example.com/1", "audio", "192") == first
+    assert store.enqueue("https://example.com/1", "video", "720") != first
+
+
+def test_claim_leases_the_oldest_pending_job(store):
+    first = store.enqueue("https://example.com/1", "audio", "192")
+    store.enqueue("https://example.com/2", "audio", "192")
+
+    job = store.claim("worker-a")
+
+    assert job["id"] == first
+    assert job["status"] == "Downloading"
+    assert job["owner"] == "worker-a"
+    assert job["attempts"] == 1
+    assert store.claim("worker-b")["id"] != first
+    assert store.claim("worker-c") is None
+
+
+def test_heartbeat_keeps_the_lease(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    job = store.claim("worker-a", lease_seconds=60)
+
+    assert store.heartbeat(job["id"], job["lease_token"])
+    assert store.claim("worker-b") is None
+
+
+def test_expired_lease_is_reclaimed(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    job = store.claim("worker-a")
+    expire(store, job["id"])
+
+    reclaimed = store.claim("worker-b")
+
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["owner"] == "worker-b"
+    assert reclaimed["lease_token"] != job["lease_token"]
+    assert not store.heartbeat(job["id"], job["lease_token"])
+
+
+def test_stale_owner_cannot_complete(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    stale = store.claim("worker-a")
+    expire(store, stale["id"])
+    current = store.claim("worker-b")
+
+    assert not store.complete(stale["id"], stale["lease_token"])
+    assert not store.fail(stale["id"], stale["lease_token"], "late error")
+    assert store.complete(current["id"], current["lease_token"])
+    assert store.get_status_counts()["Completed"] == 1
+
+
+def test_failed_job_is_retried_until_max_attempts(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    job = store.claim("worker-a")
+    assert store.fail(job["id"], job["lease_token"], "HTTP 500")
+    assert store.get_status_counts()["Pending"] == 1
+
+    job = store.claim("worker-a")
+    assert store.fail(job["id"], job["lease_token"], "HTTP 500")
+
+    assert store.get_status_counts()["Failed"] == 1
+    assert store.claim("worker-a") is None
+
+
+def test_expired_lease_after_max_attempts_fails_for_good(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    for _ in range(2):
+        job = store.claim("worker-a")
+        expire(store, job["id"])
+
+    assert store.claim("worker-b") is None
+    assert store.get_status_counts()["Failed"] == 1
+
+
+def test_release_does_not_count_the_attempt(store):
+    store.enqueue("https://example.com/1", "audio", "192")
+    job = store.claim("worker-a")
+
+    assert store.release(job["id"], job["lease_token"])
+
+    assert store.claim("worker-b")["attempts"] == 1
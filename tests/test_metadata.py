@@ -0,0 +1,71 @@
+"""Tests for reducing yt-dlp info dicts to compact records."""
+
+import gc
+
+import pytest
+
+from streamq.core.metadata import MediaInfo, memory_per_thousand, record_size
+
+
+def info_dict():
+    """A yt-dlp info dict after format selection, with the usual bulk."""
+    return {
+        "id": "abc123",
+        "title": "A clip\nwith a line break",
+        "duration": 212.6,
+        "format_id": "137+140",
+        "requested_formats": [
+            {"format_id": "137", "filesize": 9000, "url": "https://media.example.com/v?expire=1700000500"},
+            {"format_id": "140", "filesize_approx": 1000, "url": "https://media.example.com/a?expire=1700000200"},
+        ],
+        "formats": [{"format_id": str(index), "url": f"https://media.example.com/{index}"} for index in range(200)],
+        "thumbnails": [{"url": f"https://img.example.com/{index}.jpg"} for index in range(40)],
+        "subtitles": {"en": [{"ext": "vtt", "data": "x" * 10000}]},
+        "description": "Long description " * 200,
+    }
+
+
+def test_info_dict_is_reduced_to_the_documented_fields():
+    record = MediaInfo.from_info(info_dict())
+
+    assert MediaInfo.__slots__ == ("id", "title", "duration", "size", "format_ids", "expires")
+    assert (record.id, record.title, record.duration) == ("abc123", "A clip with a line break", 212)
+    assert record.size == 10000
+    assert record.format_ids == ("137", "140")
+    assert record.expires == 1700000200
+    assert record.resolved
+
+
+def test_record_keeps_nothing_else_of_the_info_dict():
+    info = info_dict()
+    record = MediaInfo.from_info(info)
+
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.formats = info["formats"]
+    assert not any(referrer is record for referrer in gc.get_referrers(info))
+    assert record_size(record) < 1024
+
+
+@pytest.mark.parametrize("info, size", [
+    ({"id": "a", "filesize": 500}, 500),
+    ({"id": "a", "requested_formats": [{"filesize": 500}, {}]}, None),
+    ({"id": "a"}, None),
+])
+def test_size_is_known_only_when_every_stream_has_one(info, size):
+    assert MediaInfo.from_info(info).size == size
+
+
+def test_title_only_record_is_not_resolved():
+    record = MediaInfo.title_only("Clip", "abc")
+
+    assert (record.id, record.title, record.format_ids) == ("abc", "Clip", None)
+    assert not record.resolved
+    assert not record.is_expired()
+
+
+def test_memory_per_thousand():
+    records = [MediaInfo.from_info(info_dict()) for _ in range(10)]
+
+    assert memory_per_thousand(records) == record_size(records[0]) * 1000
+    assert memory_per_thousand([]) == 0
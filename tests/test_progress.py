@@ -0,0 +1,113 @@
+"""Tests for queue-wide progress aggregation."""
+
+from streamq.core.progress import ProgressAggregator
+
+
+def report(progress, key, downloaded, total=None, stream="clip.mp4", status="downloading", info=None):
+    progress.update(key, {
+        "status": status,
+        "filename": stream,
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "info_dict": info or {},
+    })
+
+
+def test_unknown_sizes_are_weighted_by_the_known_average():
+    progress = ProgressAggregator()
+    progress.add("a", 100)
+    progress.add("b")
+    progress.add("c", 300)
+
+    snapshot = progress.snapshot()
+
+    assert snapshot["total"] == 600
+    assert (snapshot["pending"], snapshot["active"], snapshot["jobs"]) == (3, 0, 3)
+
+
+def test_states_follow_the_job_lifecycle():
+    progress = ProgressAggregator()
+    progress.add("a", 100)
+    progress.add("b", 100)
+
+    report(progress, "a", 10, 100)
+    assert (progress.snapshot()["active"], progress.snapshot()["pending"]) == (1, 1)
+
+    progress.stop("a")
+    assert (progress.snapshot()["active"], progress.snapshot()["pending"]) == (0, 1)
+
+    progress.add("a")
+    assert progress.snapshot()["pending"] == 2
+
+    report(progress, "a", 100, 100, status="finished")
+    progress.complete("a")
+    progress.complete("a")
+    assert (progress.snapshot()["active"], progress.snapshot()["pending"]) == (0, 1)
+
+
+def test_resumed_download_adds_only_new_bytes():
+    progress = ProgressAggregator()
+    progress.add("a", 1000)
+    report(progress, "a", 400, 1000)
+    progress.stop("a")
+    progress.add("a")
+
+    # yt-dlp counts the partial file again when it resumes
+    report(progress, "a", 400, 1000)
+    report(progress, "a", 700, 1000)
+
+    assert progress.job_bytes("a") == (1000, 700)
+    assert progress.snapshot()["done"] == 700
+
+
+def test_restarted_stream_takes_its_bytes_back():
+    progress = ProgressAggregator()
+    report(progress, "a", 500, 1000)
+
+    report(progress, "a", 100, 1000)
+
+    assert progress.job_bytes("a") == (1000, 100)
+    assert progress.snapshot()["done"] == 100
+
+
+def test_separate_streams_add_up():
+    progress = ProgressAggregator()
+    report(progress, "a", 50, 200, stream="clip.f137.mp4")
+    report(progress, "a", 10, 40, stream="clip.f140.m4a")
+
+    assert progress.job_bytes("a") == (240, 60)
+
+
+def test_announced_size_wins_over_stream_totals():
+    progress = ProgressAggregator()
+    info = {"requested_formats": [{"filesize": 800}, {"filesize_approx": 200}]}
+
+    report(progress, "a", 50, 90, info=info)
+
+    assert progress.job_bytes("a") == (1000, 50)
+
+
+def test_completed_job_size_becomes_what_was_downloaded():
+    progress = ProgressAggregator()
+    progress.add("a", 1000)
+    report(progress, "a", 900, None, status="finished")
+
+    progress.complete("a")
+
+    assert progress.job_bytes("a") == (900, 900)
+    assert progress.snapshot()["total"] == 900
+
+
+def test_remove_drops_the_job_from_every_total():
+    progress = ProgressAggregator()
+    progress.add("a", 100)
+    progress.add("b", 300)
+    report(progress, "b", 120, 300)
+
+    progress.remove("b")
+    progress.remove("b")
+
+    snapshot = progress.snapshot()
+    assert (snapshot["done"], snapshot["total"], snapshot["jobs"]) == (0, 100, 1)
+    assert (snapshot["active"], snapshot["pending"]) == (0, 1)
+    assert progress.job_bytes("b") == (None, 0)
@@ -0,0 +1,95 @@
+"""Tests for the content-addressed output store."""
+
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from streamq.core import store
+from streamq.core.store import OBJECTS_DIR_NAME, ContentStore
+
+
+@pytest.fixture
+def content(tmp_path):
+    return ContentStore(str(tmp_path / OBJECTS_DIR_NAME))
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_first_output_becomes_an_object_linked_to_its_name(content, tmp_path):
+    path = write(tmp_path / "Clip.mp4", b"first clip")
+
+    digest = content.ingest(path)
+
+    assert digest == hashlib.sha256(b"first clip").hexdigest()
+    object_path = content.object_path(digest, ".mp4")
+    assert object_path == str(tmp_path / OBJECTS_DIR_NAME / digest[:2] / (digest + ".mp4"))
+    assert os.path.samefile(object_path, path)
+    assert os.stat(path).st_nlink == 2
+    assert content.deduplicated == 0
+
+
+def test_identical_content_under_another_name_shares_the_object(content, tmp_path):
+    first = write(tmp_path / "Clip.mp4", b"same bytes")
+    second = write(tmp_path / "Clip (mirror).mp4", b"same bytes")
+
+    assert content.ingest(first) == content.ingest(second)
+
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert os.stat(first).st_nlink == 3
+    assert (content.deduplicated, content.saved_bytes) == (1, len(b"same bytes"))
+    assert not os.path.exists(second + ".link")
+
+
+def test_different_content_keeps_separate_objects(content, tmp_path):
+    first = write(tmp_path / "One.mp4", b"one")
+    second = write(tmp_path / "Two.mp4", b"two")
+
+    digests = {content.ingest(first), content.ingest(second)}
+
+    assert len(digests) == 2
+    assert os.stat(first).st_ino != os.stat(second).st_ino
+    assert content.deduplicated == 0
+
+
+def fail_link(source, target):
+    raise OSError("hardlinks are not supported")
+
+
+def copy_exclusively(source, target):
+    """Stands in for a reflink: a new inode with the same bytes, never overwriting."""
+    with open(source, "rb") as source_file, open(target, "xb") as target_file:
+        shutil.copyfileobj(source_file, target_file)
+
+
+def test_reflink_is_used_when_hardlinks_fail(content, tmp_path, monkeypatch):
+    monkeypatch.setattr(store.os, "link", fail_link)
+    monkeypatch.setattr(store, "_reflink", copy_exclusively)
+    first = write(tmp_path / "Clip.mp4", b"same bytes")
+    second = write(tmp_path / "Clip (mirror).mp4", b"same bytes")
+
+    digest = content.ingest(first)
+    assert content.ingest(second) == digest
+
+    object_path = content.object_path(digest, ".mp4")
+    with open(object_path, "rb") as object_file:
+        assert object_file.read() == b"same bytes"
+    assert not os.path.samefile(object_path, first)
+    assert content.deduplicated == 1
+
+
+def test_output_is_left_alone_without_hardlinks_or_reflinks(content, tmp_path, monkeypatch):
+    monkeypatch.setattr(store.os, "link", fail_link)
+    monkeypatch.setattr(store, "_reflink", fail_link)
+    path = write(tmp_path / "Clip.mp4", b"clip")
+
+    assert content.ingest(path) is None
+
+    with open(path, "rb") as output:
+        assert output.read() == b"clip"
+    assert os.stat(path).st_nlink == 1
+    assert content.deduplicated == 0
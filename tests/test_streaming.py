@@ -0,0 +1,121 @@
+"""Tests for the streaming audio transcoder."""
+
+import os
+import stat
+import time
+
+import pytest
+from yt_dlp import YoutubeDL
+
+from streamq.core.downloader import DownloadInterrupted, JobControl
+from streamq.core.streaming import StreamingFailed, StreamingTranscoder
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """
+    Write a stand-in FFmpeg that copies stdin to its output path.
+
+    ``fake_ffmpeg(fail="...")`` makes it print the message and exit 1
+    instead, the way FFmpeg rejects an MP4 it cannot read from a pipe.
+    """
+
+    def make(fail=None):
+        path = tmp_path / "ffmpeg"
+        if fail:
+            body = f'cat > /dev/null\necho "{fail}" >&2\nexit 1\n'
+        else:
+            body = 'for last; do :; done\ncat > "$last"\n'
+        path.write_text("#!/bin/sh\n" + body)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+        return str(path)
+
+    return make
+
+
+@pytest.fixture
+def ydl():
+    with YoutubeDL({"quiet": True, "no_warnings": True}) as instance:
+        yield instance
+
+
+def transcode(ffmpeg_path, urlopen, url, output_path, reports=None, rate_limit=0):
+    info = {"url": url, "protocol": "http", "downloader_options": {"http_chunk_size": 4000}}
+    hook = reports.append if reports is not None else (lambda data: None)
+    transcoder = StreamingTranscoder(ffmpeg_path, urlopen, chunk_size=1000, rate_limit=rate_limit)
+    transcoder.transcode(info, str(output_path), "192", hook)
+
+
+def test_streams_the_source_in_ranges(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.webm"] = data = bytes(range(256)) * 50
+    output_path = tmp_path / "song.mp3"
+    reports = []
+
+    transcode(fake_ffmpeg(), ydl.urlopen, server.base + "/song.webm", output_path, reports)
+
+    assert output_path.read_bytes() == data
+    assert [request[2] for request in server.requests][:2] == ["bytes=0-3999", "bytes=4000-7999"]
+    assert reports[-1]["status"] == "finished"
+    assert reports[-1]["downloaded_bytes"] == len(data)
+
+
+def test_http_error_is_reported_as_a_streaming_failure(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.m4a"] = b"x" * 100
+    server.denied.add("/song.m4a")
+    output_path = tmp_path / "song.mp3"
+
+    with pytest.raises(StreamingFailed, match="403"):
+        transcode(fake_ffmpeg(), ydl.urlopen, server.base + "/song.m4a", output_path)
+
+    assert os.listdir(tmp_path) == ["ffmpeg"]
+
+
+def test_unreadable_source_is_reported_as_a_streaming_failure(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.m4a"] = b"x" * 10000
+    output_path = tmp_path / "song.mp3"
+
+    with pytest.raises(StreamingFailed, match="moov atom not found"):
+        transcode(fake_ffmpeg(fail="moov atom not found"), ydl.urlopen, server.base + "/song.m4a", output_path)
+
+    assert os.listdir(tmp_path) == ["ffmpeg"]
+
+
+def test_interrupt_is_not_turned_into_a_fallback(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.webm"] = b"x" * 10000
+    control = JobControl()
+    control.interrupt("Cancelled")
+
+    with pytest.raises(DownloadInterrupted):
+        StreamingTranscoder(fake_ffmpeg(), ydl.urlopen).transcode(
+            {"url": server.base + "/song.webm", "protocol": "http"},
+            str(tmp_path / "song.mp3"),
+            "192",
+            lambda data: control.check(),
+        )
+    assert os.listdir(tmp_path) == ["ffmpeg"]
+
+
+def test_transfer_keeps_to_the_rate_limit(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.webm"] = data = b"x" * 20000
+    output_path = tmp_path / "song.mp3"
+
+    started = time.monotonic()
+    transcode(fake_ffmpeg(), ydl.urlopen, server.base + "/song.webm", output_path, rate_limit=50000)
+
+    assert time.monotonic() - started >= 0.35
+    assert output_path.read_bytes() == data
+
+
+def test_server_ignoring_follow_up_ranges_is_a_streaming_failure(server, fake_ffmpeg, ydl, tmp_path):
+    server.files["/song.webm"] = b"x" * 10000
+
+    def first_range_only(request):
+        # Like a server that answers later ranges with the whole file
+        if not request.headers["Range"].startswith("bytes=0-"):
+            del request.headers["Range"]
+        return ydl.urlopen(request)
+
+    with pytest.raises(StreamingFailed, match="ignored the range request"):
+        transcode(fake_ffmpeg(), first_range_only, server.base + "/song.webm", tmp_path / "song.mp3")
+
+    assert os.listdir(tmp_path) == ["ffmpeg"]
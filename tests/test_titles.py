@@ -0,0 +1,77 @@
+"""Tests for title lookups against the local oEmbed stub."""
+
+import contextlib
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from streamq.core.titles import TitleFetcher
+from streamq.utils.title_stub import StubHandler
+
+
+class CountingHandler(StubHandler):
+    """The stub handler, counting connections on ``server.connections``."""
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+
+class FakeYdlPool:
+    """Stands in for the yt-dlp pool; flat extraction returns ``info``."""
+
+    def __init__(self, info):
+        self.info = info
+        self.extracted = []
+
+    @contextlib.contextmanager
+    def checkout(self, options, progress_hook=None, postprocessor_hook=None):
+        yield self
+
+    def extract_info(self, url, download=False, process=True):
+        self.extracted.append((url, process))
+        return self.info
+
+
+@pytest.fixture
+def stub(knobs):
+    """The oEmbed stub on a free port, set as ``title_endpoint``."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    httpd.connections = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    knobs(title_endpoint=f"http://127.0.0.1:{httpd.server_address[1]}/oembed?url={{url}}")
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_oembed_title_is_returned(stub):
+    ydl_pool = FakeYdlPool({"id": "x", "title": "Extracted"})
+    fetcher = TitleFetcher(ydl_pool)
+
+    info = fetcher.fetch("https://example.com/watch?v=abc")
+
+    assert info.title == "Stub video v=abc"
+    assert not info.resolved
+    assert ydl_pool.extracted == []
+
+
+def test_oembed_failure_falls_back_to_flat_extraction(stub):
+    ydl_pool = FakeYdlPool({"id": "gone1", "title": "  Extracted \n title "})
+    fetcher = TitleFetcher(ydl_pool)
+
+    info = fetcher.fetch("https://example.com/missing")
+
+    assert (info.id, info.title) == ("gone1", "Extracted title")
+    assert ydl_pool.extracted == [("https://example.com/missing", False)]
+
+
+def test_lookups_reuse_the_keep_alive_connection(stub):
+    fetcher = TitleFetcher(FakeYdlPool(None))
+
+    titles = [fetcher.fetch(f"https://example.com/watch?v={index}").title for index in range(3)]
+
+    assert titles == ["Stub video v=0", "Stub video v=1", "Stub video v=2"]
+    assert stub.connections == 1
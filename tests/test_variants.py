@@ -0,0 +1,54 @@
+"""Tests for output variant parsing and FFmpeg argument building."""
+
+import pytest
+
+from streamq.core.variants import ffmpeg_arguments, output_name, parse_variant
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("audio:192", ("audio", "192")),
+    ("video:720", ("video", "720")),
+    (" Video : 1080p ", ("video", "1080")),
+    ("audio:320k", ("audio", "320")),
+])
+def test_parse_variant(text, expected):
+    assert parse_variant(text) == expected
+
+
+@pytest.mark.parametrize("text", ["audio", "audio:", "mp3:192", "video:hd", ":720", "video:-1"])
+def test_parse_variant_rejects(text):
+    with pytest.raises(ValueError, match="expected audio:BITRATE or video:HEIGHT"):
+        parse_variant(text)
+
+
+def test_audio_is_encoded_from_the_only_stream():
+    assert ffmpeg_arguments("audio", "192", ["a.webm"]) == [
+        "-i", "a.webm",
+        "-map", "0:a:0", "-vn", "-codec:a", "libmp3lame", "-b:a", "192k", "-f", "mp3",
+    ]
+
+
+def test_audio_is_taken_from_the_last_of_separate_streams():
+    arguments = ffmpeg_arguments("audio", "128", ["v.mp4", "a.m4a"])
+
+    assert arguments[:4] == ["-i", "v.mp4", "-i", "a.m4a"]
+    assert arguments[arguments.index("-map") + 1] == "1:a:0"
+
+
+def test_separate_video_and_audio_are_remuxed():
+    assert ffmpeg_arguments("video", "720", ["v.mp4", "a.m4a"]) == [
+        "-i", "v.mp4", "-i", "a.m4a",
+        "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-f", "mp4",
+    ]
+
+
+def test_single_video_stream_is_copied():
+    assert ffmpeg_arguments("video", "360", ["av.mp4"]) == ["-i", "av.mp4", "-c", "copy", "-f", "mp4"]
+
+
+def test_output_name_adds_the_quality_only_between_siblings():
+    variants = [("audio", "192"), ("video", "720"), ("video", "1080")]
+
+    assert output_name("Clip", "audio", "192", variants) == "Clip.mp3"
+    assert output_name("Clip", "video", "720", variants) == "Clip (720p).mp4"
+    assert output_name("Clip", "video", "1080", variants) == "Clip (1080p).mp4"
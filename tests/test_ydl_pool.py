@@ -0,0 +1,91 @@
+"""Tests for reusing yt-dlp instances across jobs."""
+
+from contextlib import ExitStack
+
+import pytest
+
+from streamq.core.ydl_pool import YoutubeDLPool
+
+QUIET = {"quiet": True, "no_warnings": True}
+
+
+@pytest.fixture
+def pool(knobs):
+    ydl_pool = YoutubeDLPool()
+    yield ydl_pool
+    ydl_pool.close()
+
+
+def fire(ydl, data):
+    """Report progress the way yt-dlp does, through every registered hook."""
+    for hook in ydl._progress_hooks:
+        hook(data)
+    for hook in ydl._postprocessor_hooks:
+        hook(data)
+
+
+def checkout_many(pool, options, count):
+    """Check out ``count`` instances at once and return them all."""
+    with ExitStack() as stack:
+        return [stack.enter_context(pool.checkout(options)) for _ in range(count)]
+
+
+def test_instance_is_reused_per_option_profile(pool):
+    with pool.checkout(QUIET) as first:
+        pass
+    with pool.checkout(dict(QUIET)) as again:
+        pass
+    with pool.checkout({**QUIET, "format": "bestaudio"}) as other:
+        pass
+
+    assert again is first
+    assert other is not first
+
+
+def test_idle_instances_are_capped_per_profile(pool, knobs):
+    knobs(ydl_pool_size=2)
+
+    first = checkout_many(pool, QUIET, 3)
+    second = checkout_many(pool, QUIET, 3)
+
+    # Two came back warm; the third was closed and replaced
+    assert len({id(ydl) for ydl in first} & {id(ydl) for ydl in second}) == 2
+
+
+def test_size_zero_disables_reuse(pool, knobs):
+    knobs(ydl_pool_size=0)
+
+    with pool.checkout(QUIET) as first:
+        pass
+    with pool.checkout(QUIET) as second:
+        pass
+
+    assert second is not first
+
+
+def test_hooks_belong_only_to_the_current_checkout(pool):
+    first_job, second_job = [], []
+    with pool.checkout(QUIET, first_job.append, first_job.append) as ydl:
+        fire(ydl, {"status": "downloading", "job": 1})
+        ydl._num_downloads = 3
+    # Between checkouts the instance reports to nobody
+    fire(ydl, {"status": "downloading", "job": None})
+
+    with pool.checkout(QUIET, second_job.append) as again:
+        assert again is ydl
+        assert again._num_downloads == 0
+        fire(again, {"status": "finished", "job": 2})
+
+    assert [data["job"] for data in first_job] == [1, 1]
+    assert [data["job"] for data in second_job] == [2]
+    assert len(ydl._progress_hooks) == 1
+
+
+def test_failed_job_instance_is_not_reused(pool):
+    with pytest.raises(RuntimeError):
+        with pool.checkout(QUIET) as first:
+            raise RuntimeError("extractor crashed")
+    with pool.checkout(QUIET) as second:
+        pass
+
+    assert second is not first